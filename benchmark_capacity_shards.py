@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark for sharded show capacity in SmartShow Ultimate
+Compares booking throughput of the single-row counter against sharded counters
+when many buyers hit the same concert show at once
+"""
+
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+import smartshow_ultimate_complete as app
+
+BUYERS = 64              # concurrent buyer threads
+TICKETS_PER_BUYER = 25   # bookings attempted by each buyer
+BOOKING_TXN_SECONDS = 0.005  # rest of the booking transaction (booking + payment inserts) while the lock is held
+SHARD_MODES = [1, 4, 8, 16]
+
+BENCH_SHOW_ID = 9999
+BENCH_DATE = date.today() + timedelta(days=365)
+BENCH_TIME = "7:00 PM"
+
+def setup_show(cursor, venue_id, capacity, shards):
+    """Create the benchmark show with `capacity` seats in the requested mode
+    
+    capacity None leaves the show unbooked, so the buyers race to create it (at the venue's capacity).
+    """
+    cursor.execute("DELETE FROM show_capacity WHERE show_id = %s AND show_date = %s", (BENCH_SHOW_ID, BENCH_DATE))
+    if capacity is None:
+        app.set_venue_capacity_shards(cursor, venue_id, shards)
+        return
+    cursor.execute("""
+        INSERT INTO show_capacity (venue_id, event_type, show_id, show_date, show_time, capacity, available_capacity)
+        VALUES (%s, 'concert', %s, %s, %s, %s, %s)
+    """, (venue_id, BENCH_SHOW_ID, BENCH_DATE, BENCH_TIME, capacity, capacity))
+    app.set_venue_capacity_shards(cursor, venue_id, shards)
+
+def run_mode(venue_id, shards, capacity):
+    """Run all buyers against one show and return (bookings, rejected, seconds, seats_left)
+    
+    capacity None starts from a show nobody has booked yet.
+    """
+    with app.db_pool.cursor(commit=True) as cursor:
+        setup_show(cursor, venue_id, capacity, shards)
+
+    booked = [0]
+    rejected = [0]
+    lock = threading.Lock()
+    barrier = threading.Barrier(BUYERS)
+
+    def buyer():
+        barrier.wait()
+        for _ in range(TICKETS_PER_BUYER):
+            with app.db_pool.cursor(commit=True, timeout=120) as cursor:
+                ok = app.reserve_show_capacity(cursor, 'concert', venue_id, BENCH_SHOW_ID,
+                                               BENCH_DATE, BENCH_TIME, 1)
+                cursor.execute("SELECT pg_sleep(%s)", (BOOKING_TXN_SECONDS,))
+            with lock:
+                if ok:
+                    booked[0] += 1
+                else:
+                    rejected[0] += 1
+
+    threads = [threading.Thread(target=buyer) for _ in range(BUYERS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    with app.db_pool.cursor() as cursor:
+        cursor.execute("""
+            SELECT available_capacity FROM show_availability
+            WHERE show_id = %s AND show_date = %s AND show_time = %s
+        """, (BENCH_SHOW_ID, BENCH_DATE, BENCH_TIME))
+        seats_left = cursor.fetchone()['available_capacity']
+
+    return booked[0], rejected[0], seconds, seats_left
+
+def main():
+    """Benchmark every shard mode against the first concert venue"""
+    print("🎵 SmartShow Ultimate - Sharded Capacity Benchmark")
+    print("=" * 50)
+
+    password = sys.argv[1] if len(sys.argv) > 1 else input("Enter PostgreSQL password for 'postgres' user: ")
+    app.db_pool.max_size = BUYERS + 4
+    if not app.db_pool.connect(password):
+        print("❌ Could not connect to the 'cinebook' database")
+        return
+
+    with app.db_pool.cursor() as cursor:
+        cursor.execute("""
+            SELECT venue_id, name, capacity, capacity_shards FROM venues
+            WHERE venue_type LIKE '%Concert%' OR venue_type LIKE '%Music%'
+            ORDER BY venue_id LIMIT 1
+        """)
+        venue = cursor.fetchone()
+    if not venue:
+        print("❌ No concert venue found - run the app's database setup first")
+        return
+
+    attempts = BUYERS * TICKETS_PER_BUYER
+    print(f"Venue: {venue['name']} | {BUYERS} buyers x {TICKETS_PER_BUYER} tickets")
+    print(f"{'mode':<12}{'booked':>8}{'sold out':>10}{'seconds':>10}{'bookings/s':>12}{'left':>8}")
+
+    try:
+        # Ample seats measures pure contention; a tight show also exercises rebalancing and the sell-out;
+        # a cold show makes every buyer race to create the show row and its shards on first booking
+        for label, capacity in (("ample", attempts * 2), ("tight", attempts * 3 // 4), ("cold", None)):
+            print(f"-- {label} show: {capacity or venue['capacity']} seats")
+            for shards in SHARD_MODES:
+                booked, rejected, seconds, seats_left = run_mode(venue['venue_id'], shards, capacity)
+                mode = "single row" if shards == 1 else f"{shards} shards"
+                oversold = "" if booked + seats_left == (capacity or venue['capacity']) else "  ❌ COUNT MISMATCH"
+                print(f"{mode:<12}{booked:>8}{rejected:>10}{seconds:>10.2f}{booked / seconds:>12.0f}{seats_left:>8}{oversold}")
+    finally:
+        with app.db_pool.cursor(commit=True) as cursor:
+            cursor.execute("DELETE FROM show_capacity WHERE show_id = %s AND show_date = %s", (BENCH_SHOW_ID, BENCH_DATE))
+            app.set_venue_capacity_shards(cursor, venue['venue_id'], venue['capacity_shards'])
+        app.db_pool.close_all()
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,12 @@
 
 import streamlit as st
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 import psycopg2.errors
+from psycopg2.pool import ThreadedConnectionPool
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 import random
+import threading
 import time
 from datetime import datetime, timedelta
 import pandas as pd
@@ -195,30 +198,140 @@ def get_movie_show_times(movie_id):
     
     return movie_show_times.get(movie_id, ["2:00 PM", "6:00 PM", "9:00 PM"])
 
+def build_movie_theater_assignments(cursor):
+    """Precompute the 3 theaters showing each movie in every area from MOVIE_THEATER_MAPPING"""
+    cursor.execute("SELECT theater_id, area FROM theatres ORDER BY area, theater_id")
+    theaters_by_area = {}
+    for row in cursor.fetchall():
+        theaters_by_area.setdefault(row['area'], []).append(row['theater_id'])
+    cursor.execute("SELECT id FROM movies ORDER BY id")
+    movie_ids = [row['id'] for row in cursor.fetchall()]
+    
+    assignments = []
+    for area, area_theaters in theaters_by_area.items():
+        for movie_id in movie_ids:
+            if len(area_theaters) < 3:
+                selected = area_theaters
+            else:
+                # Convert to 0-based index and ensure it's within bounds
+                theater_indices = MOVIE_THEATER_MAPPING.get(movie_id, [1, 2, 3])
+                selected = [area_theaters[(idx - 1) % len(area_theaters)] for idx in theater_indices]
+            for slot, theater_id in enumerate(selected):
+                assignments.append((area, movie_id, slot, theater_id))
+    
+    cursor.execute("DELETE FROM movie_theater_assignments")
+    execute_values(cursor, """
+        INSERT INTO movie_theater_assignments (area, movie_id, slot, theater_id) VALUES %s
+    """, assignments)
+
+def ensure_movie_theater_assignments(cursor, conn):
+    """Create and fill the movie-theater assignment table on databases that predate it"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS movie_theater_assignments (
+            area VARCHAR(100) NOT NULL,
+            movie_id INTEGER NOT NULL REFERENCES movies(id),
+            slot INTEGER NOT NULL,
+            theater_id INTEGER NOT NULL REFERENCES theatres(theater_id),
+            PRIMARY KEY (area, movie_id, slot)
+        )
+    """)
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM movie_theater_assignments) AS built")
+    if not cursor.fetchone()['built']:
+        build_movie_theater_assignments(cursor)
+    conn.commit()
+
+BOOKING_ROLLUP_INSERT = """
+    INSERT INTO booking_daily_rollup (day, event_type, venue_id, area, bookings, tickets, revenue,
+                                      base_amount, gst_amount, platform_fee, theatre_share, profit_amount)
+    SELECT b.booking_date::date, b.event_type, b.venue_id,
+           COALESCE(CASE WHEN b.event_type = 'movie' THEN t.area ELSE v.area END, 'Unknown'),
+           COUNT(*), SUM(b.booked_seats), SUM(b.total_amount), SUM(b.base_amount), SUM(b.gst_amount),
+           SUM(b.platform_fee), SUM(b.theatre_share), SUM(b.profit_amount)
+    FROM bookings b
+    LEFT JOIN theatres t ON b.event_type = 'movie' AND t.theater_id = b.venue_id
+    LEFT JOIN venues v ON b.event_type <> 'movie' AND v.venue_id = b.venue_id
+    WHERE b.payment_status = 'COMPLETED'
+"""
+
+def record_booking_rollup(cursor, booking_id):
+    """Add one booking to the daily rollup; runs inside the booking transaction"""
+    cursor.execute(BOOKING_ROLLUP_INSERT + """
+          AND b.booking_id = %s
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (day, event_type, venue_id, area) DO UPDATE SET
+            bookings = booking_daily_rollup.bookings + EXCLUDED.bookings,
+            tickets = booking_daily_rollup.tickets + EXCLUDED.tickets,
+            revenue = booking_daily_rollup.revenue + EXCLUDED.revenue,
+            base_amount = booking_daily_rollup.base_amount + EXCLUDED.base_amount,
+            gst_amount = booking_daily_rollup.gst_amount + EXCLUDED.gst_amount,
+            platform_fee = booking_daily_rollup.platform_fee + EXCLUDED.platform_fee,
+            theatre_share = booking_daily_rollup.theatre_share + EXCLUDED.theatre_share,
+            profit_amount = booking_daily_rollup.profit_amount + EXCLUDED.profit_amount
+    """, (booking_id,))
+
+def rebuild_booking_rollup(cursor):
+    """Recompute the daily rollup from bookings; returns the number of rollup rows"""
+    cursor.execute("LOCK TABLE booking_daily_rollup IN SHARE ROW EXCLUSIVE MODE")
+    cursor.execute("DELETE FROM booking_daily_rollup")
+    cursor.execute(BOOKING_ROLLUP_INSERT + " GROUP BY 1, 2, 3, 4 ORDER BY 1, 2, 3, 4")
+    return cursor.rowcount
+
+def ensure_booking_rollup(cursor, conn):
+    """Create and fill the daily booking rollup on databases that predate it"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS booking_daily_rollup (
+            day DATE NOT NULL,
+            event_type VARCHAR(20) NOT NULL,
+            venue_id INTEGER NOT NULL,
+            area VARCHAR(100) NOT NULL,
+            bookings INTEGER NOT NULL DEFAULT 0,
+            tickets INTEGER NOT NULL DEFAULT 0,
+            revenue BIGINT NOT NULL DEFAULT 0,
+            base_amount BIGINT NOT NULL DEFAULT 0,
+            gst_amount BIGINT NOT NULL DEFAULT 0,
+            platform_fee BIGINT NOT NULL DEFAULT 0,
+            theatre_share BIGINT NOT NULL DEFAULT 0,
+            profit_amount BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, event_type, venue_id, area)
+        )
+    """)
+    cursor.execute("""
+        SELECT NOT EXISTS (SELECT 1 FROM booking_daily_rollup)
+               AND EXISTS (SELECT 1 FROM bookings) AS needs_rollup
+    """)
+    if cursor.fetchone()['needs_rollup']:
+        rebuild_booking_rollup(cursor)
+    conn.commit()
+
 def get_movie_specific_theaters(movie_id, user_area, cursor):
-    """Get 3 specific theaters for each movie from the 7 available in user's area"""
-    # Get all theaters in user's area
+    """Get the 3 specific theaters for a movie in user's area from the precomputed assignments"""
     cursor.execute("""
-        SELECT theater_id, name, area, theater_type, base_price, total_seats, available_seats, address
-        FROM theatres WHERE area = %s
-        ORDER BY theater_id
-    """, (user_area,))
-    all_theaters = cursor.fetchall()
-    
-    if len(all_theaters) < 3:
-        return all_theaters
-    
-    # Get the specific theater indices for this movie
-    theater_indices = MOVIE_THEATER_MAPPING.get(movie_id, [1, 2, 3])
-    
-    # Select the specific theaters
-    selected_theaters = []
-    for idx in theater_indices:
-        # Convert to 0-based index and ensure it's within bounds
-        array_idx = (idx - 1) % len(all_theaters)
-        selected_theaters.append(all_theaters[array_idx])
-    
-    return selected_theaters
+        SELECT t.theater_id, t.name, t.area, t.theater_type, t.base_price, t.total_seats, t.available_seats, t.address
+        FROM movie_theater_assignments a
+        JOIN theatres t ON t.theater_id = a.theater_id
+        WHERE a.area = %s AND a.movie_id = %s
+        ORDER BY a.slot
+    """, (user_area, movie_id))
+    return cursor.fetchall()
+
+def get_movie_theater_counts(movie_ids, user_area, cursor):
+    """Number of theaters showing each movie in user's area, in one query"""
+    cursor.execute("""
+        SELECT movie_id, COUNT(*) AS theater_count
+        FROM movie_theater_assignments
+        WHERE area = %s AND movie_id = ANY(%s)
+        GROUP BY movie_id
+    """, (user_area, list(movie_ids)))
+    return {row['movie_id']: row['theater_count'] for row in cursor.fetchall()}
+
+def get_venue_availability(venue_ids, cursor):
+    """Real-time available capacity for a set of venues, in one query"""
+    cursor.execute("""
+        SELECT venue_id, available_capacity
+        FROM venues
+        WHERE venue_id = ANY(%s)
+    """, (list(venue_ids),))
+    return {row['venue_id']: row['available_capacity'] for row in cursor.fetchall()}
 
 def valid_email(email):
     """Email validation"""
@@ -340,6 +453,103 @@ Booking Date: {booking_details['booking_date']}
     except Exception as e:
         st.error(f"❌ Error writing to file: {e}")
         return False
+# Dashboard Query Executor - independent read-only admin queries run side by side
+DASHBOARD_QUERY_WORKERS = 4
+DASHBOARD_QUERY_TIMEOUT_SECONDS = 10
+
+@st.cache_resource
+def get_dashboard_query_pools():
+    """This process's dashboard connection pools by password, with the lock that guards them"""
+    return threading.Lock(), {}
+
+def get_dashboard_query_pool(password):
+    """Connection pool for dashboard queries, one per process and password"""
+    lock, pools = get_dashboard_query_pools()
+    with lock:
+        if password not in pools:
+            pools[password] = ThreadedConnectionPool(1, DASHBOARD_QUERY_WORKERS, host='localhost', user='postgres',
+                                                     password=password, database='cinebook', port=5432)
+        return pools[password]
+
+def close_dashboard_query_pools():
+    """Close every dashboard pool and its connections; the next dashboard opens a fresh pool"""
+    lock, pools = get_dashboard_query_pools()
+    with lock:
+        for pool in pools.values():
+            pool.closeall()
+        pools.clear()
+
+@st.cache_resource
+def get_dashboard_query_executor():
+    """Worker threads for dashboard queries; never more than the pool has connections"""
+    return ThreadPoolExecutor(max_workers=DASHBOARD_QUERY_WORKERS, thread_name_prefix="dashboard-query")
+
+def run_dashboard_query(pool, sql, params, timeout):
+    """Run one read-only query on a pooled connection; the server cancels it after `timeout` seconds"""
+    conn = pool.getconn()
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute("SET TRANSACTION READ ONLY")
+            cursor.execute("SET LOCAL statement_timeout = %s", (int(timeout * 1000),))
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+    finally:
+        if not conn.closed:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                pass  # connection died mid-query; conn.closed is now set
+        # Connections dropped by the server (e.g. a database reset) are discarded, not reused
+        pool.putconn(conn, close=bool(conn.closed))
+
+def dashboard_query_outcome(future, timeout):
+    """(rows, error message) of a finished dashboard query; exactly one of them is None"""
+    error = future.exception()
+    if error is None:
+        return future.result(), None
+    if isinstance(error, psycopg2.errors.QueryCanceled):
+        return None, f"timed out after {timeout}s"
+    return None, str(error).strip().split('\n')[0]
+
+def iter_dashboard_queries(queries, timeout=DASHBOARD_QUERY_TIMEOUT_SECONDS):
+    """Run independent read-only queries concurrently; yields (name, rows, error) as each one finishes
+    
+    `queries` maps a name to (sql, params). Every query gets `timeout` seconds; queries still
+    running after that are yielded last with a timeout error.
+    """
+    pool = get_dashboard_query_pool(st.session_state.db_password)
+    executor = get_dashboard_query_executor()
+    futures = {executor.submit(run_dashboard_query, pool, sql, params, timeout): name
+               for name, (sql, params) in queries.items()}
+    pending = set(futures)
+    try:
+        # The server cancels slow statements; the extra second covers waiting for a free connection
+        for future in as_completed(futures, timeout=timeout + 1):
+            pending.discard(future)
+            yield (futures[future],) + dashboard_query_outcome(future, timeout)
+    except FuturesTimeoutError:
+        for future in pending:
+            if future.done():
+                yield (futures[future],) + dashboard_query_outcome(future, timeout)
+            else:
+                future.cancel()
+                yield futures[future], None, f"timed out after {timeout}s"
+
+def render_dashboard_sections(queries, sections, timeout=DASHBOARD_QUERY_TIMEOUT_SECONDS):
+    """Run dashboard queries concurrently and fill in each section as soon as its own result arrives
+    
+    `sections` maps a query name to (placeholder, render): the caller lays the placeholders
+    out first, so sections land in page order whatever order their queries finish in.
+    render(rows) draws inside its placeholder; a failed query gets a warning there instead.
+    """
+    for name, rows, error in iter_dashboard_queries(queries, timeout):
+        placeholder, render = sections[name]
+        with placeholder:
+            if error is None:
+                render(rows)
+            else:
+                st.warning(f"⚠️ {name.replace('_', ' ').title()} unavailable: {error}")
+
 # Database Connection Functions
 def reset_and_create_database():
     """Completely reset and create database with correct structure"""
@@ -358,6 +568,8 @@ def reset_and_create_database():
         
         # Force drop and recreate database
         server_cursor.execute("SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname = 'cinebook'")
+        # The dashboard pools' connections were just terminated; close them rather than leak the clients
+        close_dashboard_query_pools()
         server_cursor.execute("DROP DATABASE IF EXISTS cinebook")
         server_cursor.execute("CREATE DATABASE cinebook")
         server_cursor.close()
@@ -437,6 +649,9 @@ def connect_to_existing_database():
             st.warning("⚠️ Database structure incomplete. Creating missing tables...")
             create_all_tables(cursor, conn)
             insert_all_sample_data(cursor, conn)
+        else:
+            ensure_movie_theater_assignments(cursor, conn)
+            ensure_booking_rollup(cursor, conn)
         
         st.session_state.conn = conn
         st.session_state.cursor = cursor
@@ -452,6 +667,8 @@ def create_all_tables(cursor, conn):
     """Create all tables with correct structure"""
     # Drop all tables first
     drop_tables = [
+        "DROP TABLE IF EXISTS booking_daily_rollup CASCADE",
+        "DROP TABLE IF EXISTS movie_theater_assignments CASCADE",
         "DROP TABLE IF EXISTS payment_transactions CASCADE",
         "DROP TABLE IF EXISTS bookings CASCADE", 
         "DROP TABLE IF EXISTS venues CASCADE",
@@ -596,6 +813,32 @@ def create_all_tables(cursor, conn):
             upi_id VARCHAR(100),
             failure_reason TEXT,
             FOREIGN KEY (booking_id) REFERENCES bookings(booking_id)
+        )""",
+        
+        # Precomputed movie -> theater assignments per area
+        """CREATE TABLE movie_theater_assignments (
+            area VARCHAR(100) NOT NULL,
+            movie_id INTEGER NOT NULL REFERENCES movies(id),
+            slot INTEGER NOT NULL,
+            theater_id INTEGER NOT NULL REFERENCES theatres(theater_id),
+            PRIMARY KEY (area, movie_id, slot)
+        )""",
+        
+        # Daily booking totals per event type, venue and area for admin analytics
+        """CREATE TABLE booking_daily_rollup (
+            day DATE NOT NULL,
+            event_type VARCHAR(20) NOT NULL,
+            venue_id INTEGER NOT NULL,
+            area VARCHAR(100) NOT NULL,
+            bookings INTEGER NOT NULL DEFAULT 0,
+            tickets INTEGER NOT NULL DEFAULT 0,
+            revenue BIGINT NOT NULL DEFAULT 0,
+            base_amount BIGINT NOT NULL DEFAULT 0,
+            gst_amount BIGINT NOT NULL DEFAULT 0,
+            platform_fee BIGINT NOT NULL DEFAULT 0,
+            theatre_share BIGINT NOT NULL DEFAULT 0,
+            profit_amount BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, event_type, venue_id, area)
         )"""
     ]
     
@@ -807,6 +1050,7 @@ def insert_all_sample_data(cursor, conn):
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
             """, concert)
         
+        build_movie_theater_assignments(cursor)
         conn.commit()
         
     except psycopg2.Error as e:
@@ -988,6 +1232,7 @@ def verify_otp():
                             
                             st.success("✅ Account verified successfully!")
                             st.session_state.logged_in_user = st.session_state.pending_email
+                            load_user_profile(cursor, st.session_state.pending_email)
                             st.session_state.pending_email = None
                             
                             # Clear the stored OTP and area selection
@@ -1041,6 +1286,7 @@ def login_user():
                         else:
                             st.success(f"✅ Welcome back, {user['name']}!")
                             st.session_state.logged_in_user = email
+                            load_user_profile(cursor, email)
                             st.session_state.current_step = "main_menu"
                             st.rerun()
                     else:
@@ -1104,14 +1350,35 @@ def admin_login():
     
     st.info("💡 Default admin credentials: **admin** / **Admin@123**")
 
+# User profile cached in the session from login until logout or the next profile change
+def load_user_profile(cursor, email):
+    """Read a user's profile from the database and cache it in the session"""
+    cursor.execute("SELECT email, name, area FROM users WHERE email = %s", (email,))
+    profile = cursor.fetchone()
+    st.session_state.user_profile = dict(profile) if profile else None
+    return st.session_state.user_profile
+
+def get_user_profile():
+    """The session's cached profile; loaded on first use after login or invalidation"""
+    profile = st.session_state.get('user_profile')
+    if profile is None or profile['email'] != st.session_state.logged_in_user:
+        profile = load_user_profile(st.session_state.cursor, st.session_state.logged_in_user)
+    return profile
+
+def invalidate_user_profile():
+    """Drop the cached profile; call whenever the user's row changes and on logout"""
+    st.session_state.pop('user_profile', None)
+
+def get_user_area():
+    """Logged-in user's area from the cached profile"""
+    profile = get_user_profile()
+    return profile['area'] if profile else 'Satellite'
+
 # Main Menu Functions
 def main_menu():
     """Enhanced main menu for logged-in users"""
-    cursor = st.session_state.cursor
-    
-    # Get user info
-    cursor.execute("SELECT name, area FROM users WHERE email = %s", (st.session_state.logged_in_user,))
-    user_info = cursor.fetchone()
+    # Get user info from the session profile
+    user_info = get_user_profile()
     
     st.title(f"🎬 Welcome, {user_info['name']}!")
     st.write(f"📍 Your Area: **{user_info['area']}** (7 theaters available)")
@@ -1168,6 +1435,7 @@ def main_menu():
     with col2:
         if st.button("🚪 Logout", use_container_width=True):
             st.session_state.logged_in_user = None
+            invalidate_user_profile()
             st.session_state.current_step = "login"
             st.rerun()
 
@@ -1177,10 +1445,8 @@ def movie_booking():
     st.title("🎬 MOVIES")
     cursor = st.session_state.cursor
     
-    # Get user's area
-    cursor.execute("SELECT area FROM users WHERE email = %s", (st.session_state.logged_in_user,))
-    user_result = cursor.fetchone()
-    user_area = user_result['area'] if user_result else 'Satellite'
+    # Get user's area from the session profile
+    user_area = get_user_area()
     
     st.info(f"📍 Your Area: **{user_area}** | Each movie shows in 3 specific theaters")
     
@@ -1250,6 +1516,7 @@ def movie_booking():
         FROM movies WHERE mood = %s
     """, (st.session_state.movie_mood,))
     movies = cursor.fetchall()
+    theater_counts = get_movie_theater_counts([movie['id'] for movie in movies], user_area, cursor)
     
     # Display movies in an enhanced grid with posters
     cols = st.columns(2)
@@ -1270,9 +1537,7 @@ def movie_booking():
                     st.write(f"⭐ Rating: {movie['rating']}")
                     st.write(f"🗣️ Language: {movie['language']}")
                     
-                    # Get specific theaters for this movie
-                    specific_theaters = get_movie_specific_theaters(movie['id'], user_area, cursor)
-                    st.write(f"🏢 Available in {len(specific_theaters)} theaters")
+                    st.write(f"🏢 Available in {theater_counts.get(movie['id'], 0)} theaters")
                     
                     if st.button("🎫 Book Now", key=f"book_movie_{movie['id']}", type="primary"):
                         st.session_state.selected_movie = movie
@@ -1300,10 +1565,8 @@ def movie_theatre_selection():
     
     cursor = st.session_state.cursor
     
-    # Get user's area
-    cursor.execute("SELECT area FROM users WHERE email = %s", (st.session_state.logged_in_user,))
-    user_result = cursor.fetchone()
-    user_area = user_result['area'] if user_result else 'Satellite'
+    # Get user's area from the session profile
+    user_area = get_user_area()
     
     st.info(f"📍 Your Area: **{user_area}** | 3 Premium Theaters Selected for This Movie")
     
@@ -1526,10 +1789,8 @@ def comedy_venue_selection():
     
     cursor = st.session_state.cursor
     
-    # Get user's area
-    cursor.execute("SELECT area FROM users WHERE email = %s", (st.session_state.logged_in_user,))
-    user_result = cursor.fetchone()
-    user_area = user_result['area'] if user_result else 'Satellite'
+    # Get user's area from the session profile
+    user_area = get_user_area()
     
     st.info(f"📍 Your Area: **{user_area}** | Comedy venues near you")
     
@@ -1559,13 +1820,8 @@ def comedy_venue_selection():
             st.rerun()
         return
     
+    # available_capacity comes straight from the list query above - one query per page
     for venue in venues:
-        # Get real-time available capacity
-        cursor.execute("SELECT available_capacity FROM venues WHERE venue_id = %s", (venue['venue_id'],))
-        current_capacity = cursor.fetchone()
-        if current_capacity:
-            venue['available_capacity'] = current_capacity['available_capacity']
-        
         # Enhanced venue display
         availability_status = "Available" if venue['available_capacity'] > 0 else "SOLD OUT"
         status_color = "🟢" if venue['available_capacity'] > 0 else "🔴"
@@ -1688,12 +1944,7 @@ def comedy_ticket_selection():
     cursor = st.session_state.cursor
     
     # Get real-time available capacity
-    cursor.execute("SELECT available_capacity FROM venues WHERE venue_id = %s", (venue['venue_id'],))
-    current_capacity = cursor.fetchone()
-    if current_capacity:
-        available_seats = current_capacity['available_capacity']
-    else:
-        available_seats = venue['available_capacity']
+    available_seats = get_venue_availability([venue['venue_id']], cursor).get(venue['venue_id'], venue['available_capacity'])
     
     # Enhanced ticket selection interface
     ticket_price = show['ticket_price']
@@ -1749,9 +2000,8 @@ def comedy_ticket_selection():
     if available_seats > 0:
         if st.button("🛒 Proceed to Payment", type="primary", use_container_width=True):
             # Double-check availability before proceeding
-            cursor.execute("SELECT available_capacity FROM venues WHERE venue_id = %s", (venue['venue_id'],))
-            final_check = cursor.fetchone()
-            if final_check and final_check['available_capacity'] >= num_tickets:
+            final_check = get_venue_availability([venue['venue_id']], cursor).get(venue['venue_id'])
+            if final_check is not None and final_check >= num_tickets:
                 # Prepare booking details
                 seat_numbers = [f"C{i+1}" for i in range(num_tickets)]
                 
@@ -1844,10 +2094,8 @@ def concert_venue_selection():
     
     cursor = st.session_state.cursor
     
-    # Get user's area
-    cursor.execute("SELECT area FROM users WHERE email = %s", (st.session_state.logged_in_user,))
-    user_result = cursor.fetchone()
-    user_area = user_result['area'] if user_result else 'Satellite'
+    # Get user's area from the session profile
+    user_area = get_user_area()
     
     st.info(f"📍 Your Area: **{user_area}** | Concert venues near you")
     
@@ -1876,13 +2124,8 @@ def concert_venue_selection():
             st.rerun()
         return
     
+    # available_capacity comes straight from the list query above - one query per page
     for venue in venues:
-        # Get real-time available capacity
-        cursor.execute("SELECT available_capacity FROM venues WHERE venue_id = %s", (venue['venue_id'],))
-        current_capacity = cursor.fetchone()
-        if current_capacity:
-            venue['available_capacity'] = current_capacity['available_capacity']
-        
         # Enhanced venue display
         availability_status = "Available" if venue['available_capacity'] > 0 else "SOLD OUT"
         status_color = "🟢" if venue['available_capacity'] > 0 else "🔴"
@@ -2005,12 +2248,7 @@ def concert_ticket_selection():
     cursor = st.session_state.cursor
     
     # Get real-time available capacity
-    cursor.execute("SELECT available_capacity FROM venues WHERE venue_id = %s", (venue['venue_id'],))
-    current_capacity = cursor.fetchone()
-    if current_capacity:
-        available_seats = current_capacity['available_capacity']
-    else:
-        available_seats = venue['available_capacity']
+    available_seats = get_venue_availability([venue['venue_id']], cursor).get(venue['venue_id'], venue['available_capacity'])
     
     # Enhanced ticket selection interface
     ticket_price = concert['ticket_price']
@@ -2068,9 +2306,8 @@ def concert_ticket_selection():
     if available_seats > 0:
         if st.button("🛒 Proceed to Payment", type="primary", use_container_width=True):
             # Double-check availability before proceeding
-            cursor.execute("SELECT available_capacity FROM venues WHERE venue_id = %s", (venue['venue_id'],))
-            final_check = cursor.fetchone()
-            if final_check and final_check['available_capacity'] >= num_tickets:
+            final_check = get_venue_availability([venue['venue_id']], cursor).get(venue['venue_id'])
+            if final_check is not None and final_check >= num_tickets:
                 # Prepare booking details
                 seat_numbers = [f"M{i+1}" for i in range(num_tickets)]
                 
@@ -2446,6 +2683,7 @@ def process_booking_payment(cursor, conn, user_email, event_type, event_id, even
                     conn.rollback()
                     return False, None, transaction_id
             
+            record_booking_rollup(cursor, booking_id)
             conn.commit()
             
             # Prepare booking details for file writing
@@ -2658,154 +2896,165 @@ def show_enhanced_admin_analytics(cursor):
     """Enhanced admin analytics with comprehensive charts and metrics"""
     st.write("### 📊 Comprehensive Business Analytics")
     
-    # Get comprehensive booking statistics
-    cursor.execute("""
-        SELECT event_type,
-               COUNT(*) as total_bookings,
-               SUM(booked_seats) as total_tickets,
-               SUM(total_amount) as total_revenue,
-               SUM(profit_amount) as total_profit,
-               SUM(gst_amount) as total_gst,
-               AVG(total_amount) as avg_booking_value
-        FROM bookings GROUP BY event_type
-    """)
-    stats = cursor.fetchall()
-    
-    if stats:
-        # Enhanced metrics display
-        total_bookings = sum(stat['total_bookings'] for stat in stats)
-        total_tickets = sum(stat['total_tickets'] for stat in stats)
-        total_revenue = sum(stat['total_revenue'] for stat in stats)
-        total_profit = sum(stat['total_profit'] for stat in stats if stat['total_profit'])
-        total_gst = sum(stat['total_gst'] for stat in stats if stat['total_gst'])
-        
-        # Top metrics row
-        col1, col2, col3, col4, col5 = st.columns(5)
-        
-        with col1:
-            st.metric("Total Bookings", total_bookings, delta=f"+{total_bookings}")
-        with col2:
-            st.metric("Total Tickets", total_tickets, delta=f"+{total_tickets}")
-        with col3:
-            st.metric("Total Revenue", f"₹{total_revenue:,}", delta=f"+₹{total_revenue:,}")
-        with col4:
-            st.metric("Our Profit", f"₹{total_profit:,}", delta=f"+₹{total_profit:,}")
-        with col5:
-            st.metric("GST Collected", f"₹{total_gst:,}", delta=f"+₹{total_gst:,}")
-        
-        # Enhanced charts
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Revenue pie chart
-            st.write("#### 💰 Revenue Distribution by Event Type")
-            df_revenue = pd.DataFrame(stats)
-            fig_revenue = px.pie(df_revenue, values='total_revenue', names='event_type', 
-                               title="Revenue by Event Type",
-                               color_discrete_sequence=['#FF6B6B', '#4ECDC4', '#45B7D1'])
-            st.plotly_chart(fig_revenue, use_container_width=True)
-        
-        with col2:
-            # Bookings bar chart
-            st.write("#### 🎫 Bookings by Event Type")
-            fig_bookings = px.bar(df_revenue, x='event_type', y='total_bookings',
-                                title="Total Bookings by Event Type",
-                                color='event_type',
-                                color_discrete_sequence=['#FF6B6B', '#4ECDC4', '#45B7D1'])
-            st.plotly_chart(fig_bookings, use_container_width=True)
-        
-        # Profit analysis
-        st.write("#### 💹 Profit Analysis")
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Profit breakdown pie chart
-            profit_breakdown = {
-                'Our Profit': total_profit,
-                'GST': total_gst,
-                'Theater Share': total_revenue - total_profit - total_gst
-            }
-            fig_profit = px.pie(values=list(profit_breakdown.values()), 
-                              names=list(profit_breakdown.keys()),
-                              title="Revenue Breakdown",
-                              color_discrete_sequence=['#2ECC71', '#E74C3C', '#F39C12'])
-            st.plotly_chart(fig_profit, use_container_width=True)
-        
-        with col2:
-            # Average booking value
-            st.write("**Average Booking Values:**")
-            for stat in stats:
-                avg_value = stat['avg_booking_value'] if stat['avg_booking_value'] else 0
-                st.write(f"• {stat['event_type'].title()}: ₹{avg_value:.0f}")
-            
-            profit_margin = (total_profit / total_revenue * 100) if total_revenue > 0 else 0
-            st.write(f"**Overall Profit Margin:** {profit_margin:.1f}%")
-        
-        # Daily bookings trend
-        cursor.execute("""
-            SELECT DATE(booking_date) as booking_date, 
-                   COUNT(*) as bookings,
-                   SUM(total_amount) as daily_revenue,
-                   SUM(profit_amount) as daily_profit
-            FROM bookings 
-            GROUP BY DATE(booking_date)
-            ORDER BY booking_date DESC
+    # Event type stats, daily trend and area breakdown from the daily rollup, queried in parallel
+    queries = {
+        'event_type_stats': ("""
+            SELECT event_type,
+                   SUM(bookings)::bigint as total_bookings,
+                   SUM(tickets)::bigint as total_tickets,
+                   SUM(revenue)::bigint as total_revenue,
+                   SUM(profit_amount)::bigint as total_profit,
+                   SUM(gst_amount)::bigint as total_gst,
+                   SUM(revenue)::float / SUM(bookings) as avg_booking_value
+            FROM booking_daily_rollup GROUP BY event_type
+        """, None),
+        'daily_trend': ("""
+            SELECT day as booking_date, 
+                   SUM(bookings)::bigint as bookings,
+                   SUM(revenue)::bigint as daily_revenue,
+                   SUM(profit_amount)::bigint as daily_profit
+            FROM booking_daily_rollup 
+            GROUP BY day
+            ORDER BY day DESC
             LIMIT 30
-        """)
-        daily_data = cursor.fetchall()
-        
-        if daily_data:
-            st.write("#### 📈 Daily Performance Trends (Last 30 Days)")
-            df_daily = pd.DataFrame(daily_data)
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                fig_daily_bookings = px.line(df_daily, x='booking_date', y='bookings', 
-                                           title="Daily Bookings Trend",
-                                           markers=True)
-                st.plotly_chart(fig_daily_bookings, use_container_width=True)
-            
-            with col2:
-                fig_daily_revenue = px.line(df_daily, x='booking_date', y='daily_revenue',
-                                          title="Daily Revenue Trend",
-                                          markers=True)
-                st.plotly_chart(fig_daily_revenue, use_container_width=True)
-        
-        # Area-wise analysis
-        cursor.execute("""
-            SELECT u.area, 
-                   COUNT(b.booking_id) as bookings,
-                   SUM(b.total_amount) as revenue
-            FROM bookings b
-            JOIN users u ON b.user_email = u.email
-            GROUP BY u.area
+        """, None),
+        # By venue area; users book venues in their own area
+        'area_performance': ("""
+            SELECT area, 
+                   SUM(bookings)::bigint as bookings,
+                   SUM(revenue)::bigint as revenue
+            FROM booking_daily_rollup
+            GROUP BY area
             ORDER BY revenue DESC
-        """)
-        area_data = cursor.fetchall()
-        
-        if area_data:
-            st.write("#### 🗺️ Area-wise Performance")
-            df_area = pd.DataFrame(area_data)
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                fig_area_bookings = px.bar(df_area, x='area', y='bookings',
-                                         title="Bookings by Area",
-                                         color='bookings',
-                                         color_continuous_scale='Blues')
-                st.plotly_chart(fig_area_bookings, use_container_width=True)
-            
-            with col2:
-                fig_area_revenue = px.bar(df_area, x='area', y='revenue',
-                                        title="Revenue by Area",
-                                        color='revenue',
-                                        color_continuous_scale='Greens')
-                st.plotly_chart(fig_area_revenue, use_container_width=True)
-    
-    else:
+        """, None)
+    }
+    # Lay the sections out in page order, then fill each one in as soon as its own query finishes
+    render_dashboard_sections(queries, {
+        'event_type_stats': (st.container(), show_event_type_analytics),
+        'daily_trend': (st.container(), show_daily_trend_analytics),
+        'area_performance': (st.container(), show_area_analytics)
+    })
+
+def show_event_type_analytics(stats):
+    """Headline metrics, event type charts and profit breakdown from the per-event-type totals"""
+    if not stats:
         st.info("📝 No booking data available yet.")
+        return
+    
+    # Enhanced metrics display
+    total_bookings = sum(stat['total_bookings'] for stat in stats)
+    total_tickets = sum(stat['total_tickets'] for stat in stats)
+    total_revenue = sum(stat['total_revenue'] for stat in stats)
+    total_profit = sum(stat['total_profit'] for stat in stats if stat['total_profit'])
+    total_gst = sum(stat['total_gst'] for stat in stats if stat['total_gst'])
+    
+    # Top metrics row
+    col1, col2, col3, col4, col5 = st.columns(5)
+    
+    with col1:
+        st.metric("Total Bookings", total_bookings, delta=f"+{total_bookings}")
+    with col2:
+        st.metric("Total Tickets", total_tickets, delta=f"+{total_tickets}")
+    with col3:
+        st.metric("Total Revenue", f"₹{total_revenue:,}", delta=f"+₹{total_revenue:,}")
+    with col4:
+        st.metric("Our Profit", f"₹{total_profit:,}", delta=f"+₹{total_profit:,}")
+    with col5:
+        st.metric("GST Collected", f"₹{total_gst:,}", delta=f"+₹{total_gst:,}")
+    
+    # Enhanced charts
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Revenue pie chart
+        st.write("#### 💰 Revenue Distribution by Event Type")
+        df_revenue = pd.DataFrame(stats)
+        fig_revenue = px.pie(df_revenue, values='total_revenue', names='event_type', 
+                           title="Revenue by Event Type",
+                           color_discrete_sequence=['#FF6B6B', '#4ECDC4', '#45B7D1'])
+        st.plotly_chart(fig_revenue, use_container_width=True)
+    
+    with col2:
+        # Bookings bar chart
+        st.write("#### 🎫 Bookings by Event Type")
+        fig_bookings = px.bar(df_revenue, x='event_type', y='total_bookings',
+                            title="Total Bookings by Event Type",
+                            color='event_type',
+                            color_discrete_sequence=['#FF6B6B', '#4ECDC4', '#45B7D1'])
+        st.plotly_chart(fig_bookings, use_container_width=True)
+    
+    # Profit analysis
+    st.write("#### 💹 Profit Analysis")
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Profit breakdown pie chart
+        profit_breakdown = {
+            'Our Profit': total_profit,
+            'GST': total_gst,
+            'Theater Share': total_revenue - total_profit - total_gst
+        }
+        fig_profit = px.pie(values=list(profit_breakdown.values()), 
+                          names=list(profit_breakdown.keys()),
+                          title="Revenue Breakdown",
+                          color_discrete_sequence=['#2ECC71', '#E74C3C', '#F39C12'])
+        st.plotly_chart(fig_profit, use_container_width=True)
+    
+    with col2:
+        # Average booking value
+        st.write("**Average Booking Values:**")
+        for stat in stats:
+            avg_value = stat['avg_booking_value'] if stat['avg_booking_value'] else 0
+            st.write(f"• {stat['event_type'].title()}: ₹{avg_value:.0f}")
+        
+        profit_margin = (total_profit / total_revenue * 100) if total_revenue > 0 else 0
+        st.write(f"**Overall Profit Margin:** {profit_margin:.1f}%")
+
+def show_daily_trend_analytics(daily_data):
+    """Daily bookings and revenue charts for the last 30 days"""
+    if not daily_data:
+        return
+    
+    st.write("#### 📈 Daily Performance Trends (Last 30 Days)")
+    df_daily = pd.DataFrame(daily_data)
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        fig_daily_bookings = px.line(df_daily, x='booking_date', y='bookings', 
+                                   title="Daily Bookings Trend",
+                                   markers=True)
+        st.plotly_chart(fig_daily_bookings, use_container_width=True)
+    
+    with col2:
+        fig_daily_revenue = px.line(df_daily, x='booking_date', y='daily_revenue',
+                                  title="Daily Revenue Trend",
+                                  markers=True)
+        st.plotly_chart(fig_daily_revenue, use_container_width=True)
+
+def show_area_analytics(area_data):
+    """Bookings and revenue by venue area"""
+    if not area_data:
+        return
+    
+    st.write("#### 🗺️ Area-wise Performance")
+    df_area = pd.DataFrame(area_data)
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        fig_area_bookings = px.bar(df_area, x='area', y='bookings',
+                                 title="Bookings by Area",
+                                 color='bookings',
+                                 color_continuous_scale='Blues')
+        st.plotly_chart(fig_area_bookings, use_container_width=True)
+    
+    with col2:
+        fig_area_revenue = px.bar(df_area, x='area', y='revenue',
+                                title="Revenue by Area",
+                                color='revenue',
+                                color_continuous_scale='Greens')
+        st.plotly_chart(fig_area_revenue, use_container_width=True)
 
 def show_enhanced_admin_bookings(cursor):
     """Enhanced booking management for admin"""
@@ -2891,47 +3140,40 @@ def show_enhanced_admin_users(cursor):
     """Enhanced user management"""
     st.write("### 👥 User Management")
     
-    # User statistics
-    cursor.execute("""SELECT COUNT(*) as total_users FROM users WHERE otp IS NULL""")
-    total_users = cursor.fetchone()['total_users']
-    
-    cursor.execute("""
-        SELECT area, COUNT(*) as user_count FROM users WHERE otp IS NULL
-        GROUP BY area ORDER BY user_count DESC
-    """)
-    area_stats = cursor.fetchall()
-    
-    cursor.execute("""
-        SELECT DATE(created_at) as reg_date, COUNT(*) as registrations
-        FROM users WHERE otp IS NULL
-        GROUP BY DATE(created_at)
-        ORDER BY reg_date DESC
-        LIMIT 30
-    """)
-    registration_trend = cursor.fetchall()
-    
-    # Enhanced metrics
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.metric("Total Active Users", total_users)
-    
-    with col2:
-        if area_stats:
-            most_popular_area = area_stats[0]
-            st.metric("Most Popular Area", most_popular_area['area'], 
-                     delta=f"{most_popular_area['user_count']} users")
+    # User statistics, queried in parallel
+    queries = {
+        'user_count': ("""SELECT COUNT(*) as total_users FROM users WHERE otp IS NULL""", None),
+        'users_by_area': ("""
+            SELECT area, COUNT(*) as user_count FROM users WHERE otp IS NULL
+            GROUP BY area ORDER BY user_count DESC
+        """, None),
+        'registration_trend': ("""
+            SELECT DATE(created_at) as reg_date, COUNT(*) as registrations
+            FROM users WHERE otp IS NULL
+            GROUP BY DATE(created_at)
+            ORDER BY reg_date DESC
+            LIMIT 30
+        """, None),
+        'recent_registrations': ("""
+            SELECT name, email, area, created_at FROM users WHERE otp IS NULL 
+            ORDER BY created_at DESC LIMIT 20
+        """, None)
+    }
     
-    with col3:
-        if registration_trend:
-            recent_registrations = sum(r['registrations'] for r in registration_trend[:7])
-            st.metric("New Users (7 days)", recent_registrations)
+    # Lay out the metrics row, the charts and the table, then fill each in as its query finishes
+    metric_col1, metric_col2, metric_col3 = st.columns(3)
+    chart_col1, chart_col2 = st.columns(2)
     
-    # Enhanced visualizations
-    col1, col2 = st.columns(2)
+    def show_user_count(rows):
+        st.metric("Total Active Users", rows[0]['total_users'])
     
-    with col1:
-        if area_stats:
+    def show_users_by_area(area_stats):
+        if not area_stats:
+            return
+        most_popular_area = area_stats[0]
+        st.metric("Most Popular Area", most_popular_area['area'], 
+                 delta=f"{most_popular_area['user_count']} users")
+        with chart_col1:
             st.write("#### 📍 Users by Area")
             df_areas = pd.DataFrame(area_stats)
             fig_areas = px.bar(df_areas, x='area', y='user_count', 
@@ -2940,8 +3182,12 @@ def show_enhanced_admin_users(cursor):
                              color_continuous_scale='Blues')
             st.plotly_chart(fig_areas, use_container_width=True)
     
-    with col2:
-        if registration_trend:
+    def show_registration_trend(registration_trend):
+        if not registration_trend:
+            return
+        recent_registrations = sum(r['registrations'] for r in registration_trend[:7])
+        st.metric("New Users (7 days)", recent_registrations)
+        with chart_col2:
             st.write("#### 📈 Registration Trend")
             df_reg = pd.DataFrame(registration_trend)
             fig_reg = px.line(df_reg, x='reg_date', y='registrations',
@@ -2949,18 +3195,20 @@ def show_enhanced_admin_users(cursor):
                             markers=True)
             st.plotly_chart(fig_reg, use_container_width=True)
     
-    # Recent users table
-    cursor.execute("""
-        SELECT name, email, area, created_at FROM users WHERE otp IS NULL 
-        ORDER BY created_at DESC LIMIT 20
-    """)
-    recent_users = cursor.fetchall()
-    
-    if recent_users:
+    def show_recent_registrations(recent_users):
+        if not recent_users:
+            return
         st.write("#### 🆕 Recent Registrations")
         df_users = pd.DataFrame(recent_users)
         df_users['created_at'] = pd.to_datetime(df_users['created_at']).dt.strftime('%Y-%m-%d %H:%M')
         st.dataframe(df_users, use_container_width=True)
+    
+    render_dashboard_sections(queries, {
+        'user_count': (metric_col1, show_user_count),
+        'users_by_area': (metric_col2, show_users_by_area),
+        'registration_trend': (metric_col3, show_registration_trend),
+        'recent_registrations': (st.container(), show_recent_registrations)
+    })
 
 def show_enhanced_admin_venues(cursor):
     """Enhanced venue management"""
@@ -3095,6 +3343,15 @@ def show_enhanced_admin_settings(cursor):
             except Exception as e:
                 st.error(f"❌ Error resetting capacities: {e}")
         
+        if st.button("📊 Rebuild Analytics Rollup"):
+            try:
+                rollup_rows = rebuild_booking_rollup(cursor)
+                st.session_state.conn.commit()
+                st.success(f"✅ Analytics rollup rebuilt: {rollup_rows:,} day/venue rows")
+            except Exception as e:
+                st.session_state.conn.rollback()
+                st.error(f"❌ Error rebuilding analytics rollup: {e}")
+        
         if st.button("📊 Generate Venue Report"):
             # Generate comprehensive venue report
             cursor.execute("""
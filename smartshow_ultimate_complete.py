@@ -6,14 +6,23 @@ import streamlit as st
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import psycopg2.errors
+import psycopg2.extensions
 import random
 import json
 import time
+import atexit
 import os
+import uuid
+import threading
+import functools
+import select
+import mmap
+import struct
 import pickle  # 🔥 CONCEPT 3: FILE OPERATIONS - PICKLE
 import csv     # 🔥 CONCEPT 3: FILE OPERATIONS - CSV
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Union  # 🔥 TYPE HINTS
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union  # 🔥 TYPE HINTS
 from dataclasses import dataclass, field  # 🔥 CONCEPT 5: OOP - DATACLASS
 from abc import ABC, abstractmethod        # 🔥 CONCEPT 6: ADVANCED OOP - ABC
 from enum import Enum                      # 🔥 CONCEPT 6: ADVANCED OOP - ENUM
@@ -24,6 +33,10 @@ import plotly.graph_objects as go         # 🔥 CONCEPT 7: VISUALIZATION
 from pathlib import Path                  # 🔥 CONCEPT 3: FILE OPERATIONS
 import logging                            # 🔥 CONCEPT 1: LOGGING
 from contextlib import contextmanager     # 🔥 CONCEPT 3: CONTEXT MANAGERS
+try:
+    import fcntl                          # 🔥 CONCEPT 3: FILE LOCKING (POSIX only)
+except ImportError:
+    fcntl = None
 
 # =====================================================
 # 🎯 CONCEPT 1: FUNCTIONS, SCOPING AND ABSTRACTION
@@ -34,6 +47,40 @@ CONFIG = {
     'DB_HOST': 'localhost',
     'DB_PORT': 5432,
     'DB_USER': 'postgres',
+    'DB_NAME': 'cinebook',
+    'DB_POOL_MIN_SIZE': 2,
+    'DB_POOL_MAX_SIZE': 20,
+    'DB_POOL_CHECKOUT_TIMEOUT': 10,
+    'DB_POOL_HEALTHCHECK_SECONDS': 30,
+    'COPY_BUFFER_SIZE': 64 * 1024,
+    'SEAT_HOLD_TTL_SECONDS': 600,
+    'SEAT_HOLD_SWEEP_SECONDS': 30,
+    'CAPACITY_SHARDS_DEFAULT': 8,
+    'WAITING_ROOM_MAX_CHECKOUTS_PER_SHOW': 50,
+    'WAITING_ROOM_ADMIT_PER_SECOND': 5,
+    'WAITING_ROOM_TARGET_DB_LATENCY_MS': 50,
+    'WAITING_ROOM_CHECKOUT_TTL_SECONDS': 30,  # checkout pages heartbeat every WAITING_ROOM_POLL_SECONDS
+    'WAITING_ROOM_IDLE_SECONDS': 30,
+    'WAITING_ROOM_POLL_SECONDS': 3,
+    'CATALOG_VERSION_CHECK_SECONDS': 5,
+    'MEMOIZE_DEFAULT_MAXSIZE': 128,
+    'SCHEDULE_CACHE_SIZE': 2048,
+    'SCHEDULE_CACHE_TTL_SECONDS': 300,
+    'AVAILABILITY_CACHE_SIZE': 1024,
+    'AVAILABILITY_CACHE_TTL_SECONDS': 60,
+    'AVAILABILITY_CHANNEL': 'smartshow_availability',
+    'AVAILABILITY_LISTEN_POLL_SECONDS': 5,
+    'ADMIN_CACHE_SIZE': 64,
+    'ADMIN_CACHE_TTL_SECONDS': 60,
+    'ID_EPOCH_MS': 1735689600000,  # 2025-01-01 UTC
+    'TICKET_LOG_DIR': 'ticket_log',
+    'TICKET_SEGMENT_BYTES': 4 * 1024 * 1024,
+    'TICKET_FSYNC_MODE': 'batch',  # 'batch' (each outbox batch), 'interval' or 'never'
+    'TICKET_FSYNC_INTERVAL_MS': 1000,  # 'interval': at most this often, and when the outbox is idle
+    'OUTBOX_BATCH_SIZE': 200,
+    'OUTBOX_POLL_SECONDS': 1,
+    'OUTBOX_MAX_ATTEMPTS': 8,
+    'OUTBOX_RETRY_BASE_SECONDS': 2,
     'MAX_SEATS_PER_BOOKING': 50,
     'OTP_EXPIRY_MINUTES': 1,
     'PAYMENT_SUCCESS_RATE': 0.9
@@ -63,15 +110,116 @@ def create_validator(min_length: int, max_length: int):
     return validator
 
 # 🔥 DECORATORS - Memoization decorator
-def memoize(func):
-    """Decorator for memoization - CACHING DECORATOR"""
-    cache = {}  # 🔥 LOCAL SCOPE
-    def wrapper(*args, **kwargs):
-        key = str(args) + str(sorted(kwargs.items()))
-        if key not in cache:
-            cache[key] = func(*args, **kwargs)
-        return cache[key]
-    return wrapper
+class LRUCache:
+    """Thread-safe bounded LRU cache with optional TTL and hit/miss/eviction counters"""
+    
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[tuple, Tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key) -> Tuple[bool, object]:
+        """(True, value) for a live entry, else (False, None); expired entries are dropped"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return False, None
+    
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, key) -> bool:
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Union[int, float, None]]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0.0
+            }
+
+@st.cache_resource
+def get_memo_caches() -> Dict[str, LRUCache]:
+    """Process-wide memoize caches by function name, so they outlive Streamlit reruns"""
+    return {}
+
+def memoize(func=None, *, maxsize: Optional[int] = None, ttl: Optional[float] = None,
+            with_cursor: bool = False):
+    """Decorator for memoization - bounded LRU CACHING DECORATOR with optional TTL
+    
+    Use as @memoize or @memoize(maxsize=..., ttl=..., with_cursor=...). Arguments must be
+    hashable and cached values are shared, so callers must not mutate them. With with_cursor
+    the first argument is the caller's database cursor: it is used on a miss but left out of
+    the key. The wrapper exposes invalidate(*args, **kwargs) (key arguments only),
+    refresh(*args, **kwargs) to reload and overwrite one entry, cache_clear() and cache_stats().
+    """
+    def decorate(func):
+        name = func.__qualname__
+        
+        def key_of(args: tuple, kwargs: Dict) -> tuple:
+            return (args[1:] if with_cursor else args, tuple(sorted(kwargs.items())))  # 🔥 HASHABLE TUPLE KEY
+        
+        def cache() -> LRUCache:
+            caches = get_memo_caches()
+            if name not in caches:
+                caches.setdefault(name, LRUCache(maxsize or CONFIG['MEMOIZE_DEFAULT_MAXSIZE'], ttl))
+            return caches[name]
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = key_of(args, kwargs)
+            found, value = cache().get(key)
+            if not found:
+                value = func(*args, **kwargs)
+                cache().put(key, value)
+            return value
+        
+        def refresh(*args, **kwargs):
+            value = func(*args, **kwargs)
+            cache().put(key_of(args, kwargs), value)
+            return value
+        
+        wrapper.refresh = refresh
+        wrapper.invalidate = lambda *args, **kwargs: cache().invalidate((args, tuple(sorted(kwargs.items()))))
+        wrapper.cache_clear = lambda: cache().clear()
+        wrapper.cache_stats = lambda: cache().stats()
+        return wrapper
+    
+    return decorate(func) if func is not None else decorate
+
+def get_memo_cache_stats() -> List[Dict[str, Union[str, int, float, None]]]:
+    """Counters of every memoized function in this process"""
+    return [{'function': name, **cache.stats()} for name, cache in sorted(get_memo_caches().items())]
 
 # 🔥 CLOSURE INSTANCES - Using higher-order functions
 email_validator = create_validator(10, 100)
@@ -183,6 +331,83 @@ THEATRE_CONFIG = ImmutableConfig(
     BASE_PRICES=tuple(range(250, 400, 25))  # 🔥 TUPLE
 )
 
+# 🔥 MUTABLE BINARY STRUCTURE - bytearray seat map, one bit per seat
+class SeatBitmap:
+    """Per-show seat map for one theatre row - bit i set means seat i+1 is taken
+    
+    Bit order matches PostgreSQL get_bit()/set_bit() on BYTEA (bit i lives in
+    byte i // 8 at position i % 8), so the stored seat_map can be queried directly.
+    """
+    
+    def __init__(self, total_seats: int, data: Optional[bytes] = None):
+        self.total_seats = total_seats
+        size = (total_seats + 7) // 8
+        self.bits = bytearray(data) if data is not None else bytearray(size)
+        if len(self.bits) < size:
+            self.bits.extend(bytes(size - len(self.bits)))
+    
+    @classmethod
+    def from_row(cls, total_seats: int, available_seats: int, seat_map: Optional[bytes]) -> 'SeatBitmap':
+        """Build from a theatre_rows record; rows booked before seat maps existed
+        have their sold seats assigned from the front of the row"""
+        if seat_map is not None:
+            return cls(total_seats, bytes(seat_map))
+        bitmap = cls(total_seats)
+        for seat in range(total_seats - available_seats):
+            bitmap.test_and_set(seat)
+        return bitmap
+    
+    def is_taken(self, seat: int) -> bool:
+        return bool(self.bits[seat >> 3] & (1 << (seat & 7)))
+    
+    def test_and_set(self, seat: int) -> bool:
+        """Mark a seat taken; False if it was already taken"""
+        mask = 1 << (seat & 7)
+        if self.bits[seat >> 3] & mask:
+            return False
+        self.bits[seat >> 3] |= mask
+        return True
+    
+    def release(self, seat: int) -> None:
+        self.bits[seat >> 3] &= ~(1 << (seat & 7)) & 0xFF
+    
+    @property
+    def taken_count(self) -> int:
+        return int.from_bytes(self.bits, 'little').bit_count()
+    
+    @property
+    def available_count(self) -> int:
+        return self.total_seats - self.taken_count
+    
+    def free_seats(self) -> List[int]:
+        """Indexes of free seats, skipping full bytes eight seats at a time"""
+        free = []
+        for byte_index, byte in enumerate(self.bits):
+            if byte == 0xFF:
+                continue
+            for bit in range(8):
+                seat = (byte_index << 3) + bit
+                if seat < self.total_seats and not byte & (1 << bit):
+                    free.append(seat)
+        return free
+    
+    def allocate(self, count: int) -> Optional[List[int]]:
+        """Take `count` seats, preferring a contiguous block; None if not enough free"""
+        free = self.free_seats()
+        if count <= 0 or len(free) < count:
+            return None
+        chosen = free[:count]
+        for start in range(len(free) - count + 1):
+            if free[start + count - 1] - free[start] == count - 1:
+                chosen = free[start:start + count]
+                break
+        for seat in chosen:
+            self.test_and_set(seat)
+        return chosen
+    
+    def to_bytes(self) -> bytes:
+        return bytes(self.bits)
+
 # =====================================================
 # 🎯 CONCEPT 3: WORKING WITH FILES
 # =====================================================
@@ -207,31 +432,6 @@ class FileManager:
             if 'file_handle' in locals():
                 file_handle.close()
     
-    # 🔥 TXT FILE OPERATIONS
-    def write_ticket(self, booking_data: Dict, event_type: str) -> bool:
-        """Write ticket to text file"""
-        filename = f"{event_type}_tickets.txt"
-        try:
-            with self.open_file(filename, 'a') as f:
-                f.write(self._format_ticket(booking_data))
-            return True
-        except Exception as e:
-            logger.error(f"Error writing ticket: {e}")
-            return False
-    
-    def _format_ticket(self, booking_data: Dict) -> str:
-        """Format ticket information"""
-        return f"""
-{'='*60}
-SMARTSHOW ULTIMATE - TICKET CONFIRMATION
-{'='*60}
-Booking ID: {booking_data.get('booking_id', 'N/A')}
-Event: {booking_data.get('event_name', 'N/A')}
-Amount: ₹{booking_data.get('total_amount', 'N/A')}
-{'='*60}
-
-"""
-    
     # 🔥 PICKLE FILE OPERATIONS - Binary format
     def save_user_data(self, user_data: Dict) -> None:
         """Save user data to pickle file"""
@@ -264,47 +464,1179 @@ Amount: ₹{booking_data.get('total_amount', 'N/A')}
 # 🔥 GLOBAL FILE MANAGER INSTANCE
 file_manager = FileManager()
 
+# 🔥 TICKET ARCHIVE - Segmented append-only log with a sidecar offset index per segment
+def format_ticket(record: Dict) -> str:
+    """Printable ticket confirmation block"""
+    return f"""
+{'='*60}
+SMARTSHOW ULTIMATE - TICKET CONFIRMATION
+{'='*60}
+Booking ID: {record['booking_id']}
+Transaction ID: {record['transaction_id']}
+Event Type: {record['event_type'].upper()}
+Event Name: {record['event_name']}
+Venue: {record['venue_name']}
+User Email: {record['user_email']}
+Show Date: {record['show_date']}
+Show Time: {record['show_time']}
+Tickets Booked: {record['booked_seats']}
+Seat Numbers: {record['seat_numbers']}
+Total Amount: ₹{record['total_amount']}
+Payment Method: {record['payment_method']}
+Payment Status: {record['payment_status']}
+Booking Date: {record['booking_date']}
+{'='*60}
+
+"""
+
+class TicketLog:
+    """Append-only ticket archive split into segments of at most segment_bytes
+    
+    Each ticket is a length-prefixed JSON record in tickets-NNNNNNNN.log, and the segment's
+    .idx sidecar gets a fixed-width (booking_id, transaction_id, offset, length) entry
+    written after the record, so the index only ever points at complete records. Appends
+    from every server process are serialised by an flock on tickets.lock. Readers hold
+    the indexes in memory, read records through mmap and pick up other processes'
+    appends when a lookup misses.
+    """
+    RECORD_HEADER = struct.Struct('>I')
+    INDEX_ENTRY = struct.Struct('>q32sQI')
+    
+    def __init__(self, directory: str, segment_bytes: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        self._lock_file = open(self.directory / 'tickets.lock', 'a+b')
+        self._by_booking: Dict[int, Tuple[int, int, int]] = {}      # 🔥 booking_id -> (segment, offset, length)
+        self._by_transaction: Dict[str, Tuple[int, int, int]] = {}  # 🔥 transaction_id -> (segment, offset, length)
+        self._index_loaded: Dict[int, int] = {}                     # 🔥 segment -> index bytes already read
+        self._maps: Dict[int, mmap.mmap] = {}
+        self._unsynced: set = set()
+        self._dirty_since: Optional[float] = None  # 🔥 when the oldest unsynced append happened
+        with self._lock:
+            self._load_indexes()
+    
+    def _path(self, segment: int, suffix: str) -> Path:
+        return self.directory / f"tickets-{segment:08d}{suffix}"
+    
+    def segments(self) -> List[int]:
+        """Segment numbers on disk, oldest first"""
+        return sorted(int(path.stem.split('-')[1]) for path in self.directory.glob('tickets-*.log'))
+    
+    @contextmanager
+    def _exclusive(self):
+        """Hold the archive for appending against other threads and other processes"""
+        with self._lock:
+            if fcntl:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)  # 🔥 ADVISORY LOCK across processes
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+    
+    def append(self, records: List[Dict], sync: bool = False) -> None:
+        """Append tickets in order, rotating to a new segment when the current one is full"""
+        with self._exclusive():
+            segments = self.segments()
+            segment = segments[-1] if segments else 1
+            log_path = self._path(segment, '.log')
+            size = log_path.stat().st_size if log_path.exists() else 0
+            data, entries = bytearray(), bytearray()
+            for record in records:
+                payload = json.dumps(record, default=str).encode('utf-8')
+                length = self.RECORD_HEADER.size + len(payload)
+                if size + len(data) + length > self.segment_bytes and size + len(data) > 0:
+                    self._write_segment(segment, data, entries, sync)
+                    segment, size, data, entries = segment + 1, 0, bytearray(), bytearray()
+                entries += self.INDEX_ENTRY.pack(int(record['booking_id']),
+                                                 str(record['transaction_id']).encode('utf-8'),
+                                                 size + len(data), length)
+                data += self.RECORD_HEADER.pack(len(payload)) + payload
+            self._write_segment(segment, data, entries, sync)
+            self._load_indexes()  # 🔥 index what was just written, so get() and stats() see it at once
+    
+    def _write_segment(self, segment: int, data: bytes, entries: bytes, sync: bool) -> None:
+        """Records first, then their index entries (caller holds the archive)"""
+        for path, chunk in ((self._path(segment, '.log'), data), (self._path(segment, '.idx'), entries)):
+            with open(path, 'ab') as f:
+                f.write(chunk)
+                f.flush()
+                if sync:
+                    os.fsync(f.fileno())
+                else:
+                    self._unsynced.add(path)
+                    if self._dirty_since is None:
+                        self._dirty_since = time.monotonic()
+    
+    def sync(self) -> int:
+        """fsync every segment file appended to without sync; returns files synced"""
+        with self._lock:
+            paths, self._unsynced, self._dirty_since = self._unsynced, set(), None
+        for path in paths:
+            with open(path, 'ab') as f:
+                os.fsync(f.fileno())
+        return len(paths)
+    
+    def sync_due(self, interval_seconds: float) -> int:
+        """sync() once the oldest unsynced append is older than interval_seconds"""
+        with self._lock:
+            if self._dirty_since is None or time.monotonic() - self._dirty_since < interval_seconds:
+                return 0
+        return self.sync()
+    
+    def _load_indexes(self) -> None:
+        """Read index entries appended since the last load (caller holds the lock)"""
+        for segment in self.segments():
+            idx_path = self._path(segment, '.idx')
+            if not idx_path.exists():
+                continue
+            start = self._index_loaded.get(segment, 0)
+            with open(idx_path, 'rb') as f:
+                f.seek(start)
+                chunk = f.read()
+            usable = len(chunk) - len(chunk) % self.INDEX_ENTRY.size  # 🔥 ignore a torn trailing entry
+            for booking_id, transaction_id, offset, length in self.INDEX_ENTRY.iter_unpack(chunk[:usable]):
+                location = (segment, offset, length)
+                self._by_booking[booking_id] = location
+                self._by_transaction[transaction_id.rstrip(b'\0').decode('utf-8')] = location
+            self._index_loaded[segment] = start + usable
+    
+    def _read(self, location: Tuple[int, int, int]) -> Dict:
+        """Decode one record through the segment's mmap (caller holds the lock)"""
+        segment, offset, length = location
+        segment_map = self._maps.get(segment)
+        if segment_map is None or len(segment_map) < offset + length:
+            if segment_map is not None:
+                segment_map.close()
+            with open(self._path(segment, '.log'), 'rb') as f:
+                segment_map = self._maps[segment] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (payload_length,) = self.RECORD_HEADER.unpack_from(segment_map, offset)
+        start = offset + self.RECORD_HEADER.size
+        return json.loads(segment_map[start:start + payload_length])
+    
+    def get(self, booking_id: Optional[int] = None, transaction_id: Optional[str] = None) -> Optional[Dict]:
+        """One ticket by booking ID or transaction ID, without scanning the archive"""
+        with self._lock:
+            for attempt in range(2):
+                location = (self._by_booking.get(booking_id) if booking_id is not None
+                            else self._by_transaction.get(transaction_id))
+                if location:
+                    return self._read(location)
+                if attempt == 0:
+                    self._load_indexes()  # 🔥 another process may have archived it since
+            return None
+    
+    def archived(self, booking_ids: List[int]) -> set:
+        """Which of these bookings are already in the archive, reading new index entries once"""
+        with self._lock:
+            self._load_indexes()
+            return {booking_id for booking_id in booking_ids if booking_id in self._by_booking}
+    
+    def reprint(self, booking_id: Optional[int] = None, transaction_id: Optional[str] = None) -> Optional[str]:
+        """Printable ticket for a support reprint"""
+        record = self.get(booking_id, transaction_id)
+        return format_ticket(record) if record else None
+    
+    def stream(self, event_type: Optional[str] = None) -> Iterator[Dict]:
+        """Every archived ticket oldest first, one record at a time"""
+        for segment in self.segments():
+            idx_path = self._path(segment, '.idx')
+            if not idx_path.exists():
+                continue
+            with open(idx_path, 'rb') as f:
+                chunk = f.read()
+            usable = len(chunk) - len(chunk) % self.INDEX_ENTRY.size
+            for _, _, offset, length in self.INDEX_ENTRY.iter_unpack(chunk[:usable]):
+                with self._lock:
+                    record = self._read((segment, offset, length))
+                if event_type is None or record['event_type'] == event_type:
+                    yield record
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'segments': len(self.segments()), 'tickets_indexed': len(self._by_booking)}
+
+@st.cache_resource
+def get_ticket_log() -> TicketLog:
+    """Open the process-wide ticket archive once"""
+    return TicketLog(CONFIG['TICKET_LOG_DIR'], CONFIG['TICKET_SEGMENT_BYTES'])
+
+# 🔥 TRANSACTIONAL OUTBOX - Booking side effects commit with the booking and run in the background
+def enqueue_outbox(cursor, booking_id: int, topics: List[str], payload: Dict) -> None:
+    """Queue side effects of a booking inside the caller's transaction, dispatched in list order"""
+    cursor.execute(
+        "INSERT INTO outbox (booking_id, topic, payload) VALUES "
+        + ", ".join(["(%s, %s, %s::jsonb)"] * len(topics)),
+        tuple(value for topic in topics for value in (booking_id, topic, json.dumps(payload, default=str)))
+    )
+
+def archive_tickets(cursor, payloads: List[Dict]) -> None:
+    """Outbox handler: append tickets to the ticket log, skipping any a retried batch already wrote"""
+    log = get_ticket_log()
+    archived = log.archived([int(payload['booking_id']) for payload in payloads])
+    new_tickets = [payload for payload in payloads if int(payload['booking_id']) not in archived]
+    if new_tickets:
+        log.append(new_tickets, sync=CONFIG['TICKET_FSYNC_MODE'] == 'batch')
+    if CONFIG['TICKET_FSYNC_MODE'] == 'interval':
+        log.sync_due(CONFIG['TICKET_FSYNC_INTERVAL_MS'] / 1000)
+
+def sync_ticket_log() -> None:
+    """Outbox idle hook: fsync whatever the interval mode left pending"""
+    if CONFIG['TICKET_FSYNC_MODE'] == 'interval':
+        get_ticket_log().sync()
+
+def send_booking_confirmations(cursor, payloads: List[Dict]) -> None:
+    """Outbox handler: confirmation to each customer (simulated, like the payment gateway)"""
+    for payload in payloads:
+        logger.info(f"📧 Booking {payload['booking_id']} confirmation sent to {payload['user_email']}: "
+                    f"{payload['event_name']} on {payload['show_date']} at {payload['show_time']}")
+
+def update_booking_rollup(cursor, payloads: List[Dict]) -> None:
+    """Outbox handler: add bookings to the daily rollup in the dispatcher's transaction (exactly once)"""
+    add_bookings_to_rollup(cursor, [payload['booking_id'] for payload in payloads])
+
+OUTBOX_HANDLERS = {
+    'ticket': archive_tickets,
+    'notification': send_booking_confirmations,
+    'analytics': update_booking_rollup
+}
+
+class OutboxDispatcher:
+    """Drains the outbox on a daemon thread, one batch per transaction
+    
+    Only the oldest pending event of each booking is eligible, so a booking's side effects
+    run in the order they were queued even with a dispatcher in every server process (rows
+    are claimed FOR UPDATE SKIP LOCKED). A batch's events go to their topic handler together
+    as handler(cursor, payloads), each topic in its own savepoint; handled events are deleted,
+    failed ones retry with exponential backoff and are parked as dead after max_attempts.
+    Database work a handler does on the cursor commits with the deletes, so it happens exactly
+    once; anything else is at-least-once and must tolerate repeats. on_idle runs whenever a
+    poll finds nothing to dispatch.
+    """
+    
+    def __init__(self, handlers: Dict, batch_size: int, poll_seconds: float,
+                 max_attempts: int, retry_base_seconds: float, on_idle: Optional[Callable[[], None]] = None):
+        self.handlers = handlers
+        self.on_idle = on_idle
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self._wakeup = threading.Event()
+        self._recent: deque = deque()  # 🔥 (monotonic time, events dispatched) for the last minute
+        self.dispatched = 0
+        self.retries = 0
+        self.dead = 0
+        self.batches = 0
+        self.last_lag_seconds = 0.0
+        threading.Thread(target=self._run, name="outbox-dispatcher", daemon=True).start()
+    
+    def wake(self) -> None:
+        """Dispatch now instead of at the next poll"""
+        self._wakeup.set()
+    
+    def _run(self):
+        while True:
+            claimed = 0
+            if db_pool.is_ready:
+                try:
+                    claimed = self.dispatch_batch()
+                except Exception as e:
+                    logger.error(f"Outbox dispatch failed: {e}")
+            if claimed == 0 and self.on_idle:
+                try:
+                    self.on_idle()
+                except Exception as e:
+                    logger.error(f"Outbox idle hook failed: {e}")
+            if claimed < self.batch_size:
+                self._wakeup.wait(self.poll_seconds)
+                self._wakeup.clear()
+    
+    def dispatch_batch(self) -> int:
+        """Claim, handle and settle one batch; returns events claimed"""
+        with db_pool.cursor(commit=True) as cursor:
+            cursor.execute("""
+                SELECT o.outbox_id, o.topic, o.payload,
+                       EXTRACT(EPOCH FROM LOCALTIMESTAMP - o.created_at)::float AS age_seconds
+                FROM outbox o
+                WHERE NOT o.dead AND o.next_attempt_at <= LOCALTIMESTAMP
+                  AND NOT EXISTS (
+                      SELECT 1 FROM outbox earlier
+                      WHERE earlier.booking_id = o.booking_id AND earlier.outbox_id < o.outbox_id
+                        AND NOT earlier.dead
+                  )
+                ORDER BY o.outbox_id
+                LIMIT %s
+                FOR UPDATE OF o SKIP LOCKED
+            """, (self.batch_size,))
+            events = cursor.fetchall()
+            if not events:
+                return 0
+            
+            by_topic: Dict[str, List[Dict]] = {}
+            for event in events:
+                by_topic.setdefault(event['topic'], []).append(event)
+            
+            handled, failed, errors = [], [], []
+            for topic, topic_events in by_topic.items():
+                cursor.execute("SAVEPOINT outbox_topic")
+                try:
+                    if topic not in self.handlers:
+                        raise ValueError(f"No outbox handler for topic '{topic}'")
+                    self.handlers[topic](cursor, [event['payload'] for event in topic_events])
+                    cursor.execute("RELEASE SAVEPOINT outbox_topic")
+                    handled += [event['outbox_id'] for event in topic_events]
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT outbox_topic")
+                    logger.error(f"Outbox {topic} batch of {len(topic_events)} failed: {e}")
+                    failed += [event['outbox_id'] for event in topic_events]
+                    errors += [str(e)] * len(topic_events)
+            
+            if handled:
+                cursor.execute("DELETE FROM outbox WHERE outbox_id = ANY(%s)", (handled,))
+            if failed:
+                cursor.execute("""
+                    UPDATE outbox o
+                    SET attempts = o.attempts + 1, last_error = f.error, dead = o.attempts + 1 >= %s,
+                        next_attempt_at = LOCALTIMESTAMP + make_interval(secs => %s * power(2, o.attempts))
+                    FROM unnest(%s::bigint[], %s::text[]) AS f(outbox_id, error)
+                    WHERE o.outbox_id = f.outbox_id
+                    RETURNING o.dead
+                """, (self.max_attempts, self.retry_base_seconds, failed, errors))
+                self.dead += sum(1 for row in cursor.fetchall() if row['dead'])
+        
+        now = time.monotonic()
+        self._recent.append((now, len(handled)))
+        self.dispatched += len(handled)
+        self.retries += len(failed)
+        self.batches += 1
+        self.last_lag_seconds = max(event['age_seconds'] for event in events)
+        return len(events)
+    
+    def stats(self, cursor) -> Dict[str, Union[int, float]]:
+        """Dispatcher counters plus the backlog every process still has to drain"""
+        cursor.execute("""
+            SELECT COUNT(*) FILTER (WHERE NOT dead) AS pending,
+                   COUNT(*) FILTER (WHERE dead) AS dead,
+                   COALESCE(EXTRACT(EPOCH FROM LOCALTIMESTAMP - MIN(created_at) FILTER (WHERE NOT dead)), 0)::float
+                       AS oldest_pending_seconds
+            FROM outbox
+        """)
+        backlog = cursor.fetchone()
+        cutoff = time.monotonic() - 60
+        while self._recent and self._recent[0][0] < cutoff:
+            self._recent.popleft()
+        return {
+            'pending': backlog['pending'],
+            'dead': backlog['dead'],
+            'oldest_pending_seconds': round(backlog['oldest_pending_seconds'], 1),
+            'events_per_second': round(sum(count for _, count in self._recent) / 60, 2),
+            'last_lag_seconds': round(self.last_lag_seconds, 2),
+            'dispatched': self.dispatched,
+            'retries': self.retries,
+            'batches': self.batches
+        }
+
+@st.cache_resource
+def get_outbox_dispatcher() -> OutboxDispatcher:
+    """Start the process-wide outbox dispatcher once"""
+    return OutboxDispatcher(OUTBOX_HANDLERS, CONFIG['OUTBOX_BATCH_SIZE'], CONFIG['OUTBOX_POLL_SECONDS'],
+                            CONFIG['OUTBOX_MAX_ATTEMPTS'], CONFIG['OUTBOX_RETRY_BASE_SECONDS'],
+                            on_idle=sync_ticket_log)
+
 # =====================================================
 # 🎯 CONCEPT 4: MODULES AND DIRECTORIES
 # =====================================================
 
-# 🔥 DATABASE MODULE - Encapsulated database operations
+# 🔥 AFTER-COMMIT HOOKS - Work that must wait until the transaction it describes is visible
+class HookedConnection(psycopg2.extensions.connection):
+    """psycopg2 connection that runs registered callbacks once its transaction commits"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._after_commit: List[Callable[[], None]] = []
+    
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """Run callback when the current transaction commits (at once in autocommit mode)"""
+        if self.autocommit:
+            callback()
+        else:
+            self._after_commit.append(callback)
+    
+    def commit(self) -> None:
+        super().commit()
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"After-commit callback failed: {e}")
+    
+    def rollback(self) -> None:
+        self._after_commit = []  # 🔥 nothing happened, so there is nothing to announce
+        super().rollback()
+
+# 🔥 DATABASE MODULE - Process-wide connection pool
 class DatabaseModule:
-    """Database operations module"""
+    """Thread-safe PostgreSQL connection pool shared by every Streamlit session
+    
+    Checkout is reentrant per thread: a thread that already holds a connection gets the same
+    one back, so a helper running inside request_connection() never waits for a second slot.
+    A nested borrow shares the outer transaction and only the outermost return resets it.
+    """
     
     def __init__(self):
-        self.connection = None
-        self.cursor = None
+        self.password = None
+        self.min_size = CONFIG['DB_POOL_MIN_SIZE']
+        self.max_size = CONFIG['DB_POOL_MAX_SIZE']
+        self.checkout_timeout = CONFIG['DB_POOL_CHECKOUT_TIMEOUT']
+        self.healthcheck_interval = CONFIG['DB_POOL_HEALTHCHECK_SECONDS']
+        self._condition = threading.Condition()
+        self._idle = deque()      # 🔥 (connection, last_used) pairs ready for reuse
+        self._in_use = {}         # 🔥 id(connection) -> pool generation it was borrowed in
+        self._borrowed = threading.local()  # 🔥 this thread's connection and how deeply it is borrowed
+        self._generation = 0
+        self._opened = 0
+    
+    @property
+    def is_ready(self) -> bool:
+        """True once the pool has been configured with working credentials"""
+        return self.password is not None
+    
+    def _new_connection(self, password: Optional[str] = None):
+        """Open a raw connection to the application database (with the pool's password by default)"""
+        return psycopg2.connect(
+            host=CONFIG['DB_HOST'],  # 🔥 USING GLOBAL CONFIG
+            user=CONFIG['DB_USER'],
+            password=self.password if password is None else password,
+            database=CONFIG['DB_NAME'],
+            port=CONFIG['DB_PORT'],
+            connection_factory=HookedConnection
+        )
+    
+    def dedicated_connection(self, autocommit: bool = True):
+        """Open a connection outside the pool for a session that must outlive any checkout
+        
+        For LISTEN and session-level advisory locks; the caller owns it and must close it.
+        """
+        conn = self._new_connection()
+        conn.autocommit = autocommit
+        return conn
     
     def connect(self, password: str) -> bool:
-        """Connect to database"""
+        """Check the password, then configure the pool and pre-open the minimum number of connections
+        
+        The password is always checked on a fresh connection, so a wrong one is rejected even
+        when the pool already holds enough connections; a rejected password leaves the pool as it was.
+        """
         try:
-            self.connection = psycopg2.connect(
-                host=CONFIG['DB_HOST'],  # 🔥 USING GLOBAL CONFIG
-                user=CONFIG['DB_USER'],
-                password=password,
-                database='cinebook',
-                port=CONFIG['DB_PORT']
-            )
-            self.cursor = self.connection.cursor(cursor_factory=RealDictCursor)
-            return True
+            self._new_connection(password).close()
         except Exception as e:
             logger.error(f"Database connection failed: {e}")
             return False
+        with self._condition:
+            if self.password != password:
+                self._generation += 1
+                self._close_idle()
+            self.password = password
+            try:
+                while self._opened < self.min_size:
+                    self._idle.append((self._new_connection(), time.monotonic()))
+                    self._opened += 1
+                return True
+            except Exception as e:
+                logger.error(f"Database connection failed: {e}")
+                self._close_idle()
+                self.password = None
+                return False
+    
+    def _is_healthy(self, conn, last_used: float) -> bool:
+        """Health check on borrow - ping connections that sat idle for a while"""
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.healthcheck_interval:
+            return True
+        try:
+            with conn.cursor() as ping:
+                ping.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
     
-    def execute_query(self, query: str, params: Tuple = ()) -> Optional[List]:
-        """Execute database query safely"""
+    def getconn(self, timeout: Optional[float] = None):
+        """Borrow a connection, waiting up to `timeout` seconds for a free slot"""
+        if not self.is_ready:
+            raise DatabaseConnectionError("Connection pool is not configured")
+        if getattr(self._borrowed, 'conn', None) is not None:
+            self._borrowed.depth += 1
+            return self._borrowed.conn
+        conn = self._checkout(timeout)
+        self._borrowed.conn, self._borrowed.depth = conn, 1
+        return conn
+    
+    def _checkout(self, timeout: Optional[float]):
+        """Take a connection from the pool, opening one if there is a free slot"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                while self._idle:
+                    conn, last_used = self._idle.pop()  # 🔥 LIFO keeps hot connections warm
+                    if self._is_healthy(conn, last_used):
+                        self._in_use[id(conn)] = self._generation
+                        return conn
+                    self._discard(conn)
+                if self._opened < self.max_size:
+                    self._opened += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise DatabaseConnectionError(
+                        f"Timed out after {timeout}s waiting for a database connection "
+                        f"({self.max_size} in use)"
+                    )
+                self._condition.wait(remaining)
+        # Open outside the lock so slow handshakes don't block other borrowers
         try:
-            self.cursor.execute(query, params)
-            if query.strip().upper().startswith('SELECT'):
-                return self.cursor.fetchall()
+            conn = self._new_connection()
+        except Exception as e:
+            with self._condition:
+                self._opened -= 1
+                self._condition.notify()
+            raise DatabaseConnectionError(f"Could not open database connection: {e}") from e
+        with self._condition:
+            self._in_use[id(conn)] = self._generation
+        return conn
+    
+    def putconn(self, conn, close: bool = False) -> None:
+        """Return a borrowed connection, resetting any open transaction"""
+        if getattr(self._borrowed, 'conn', None) is conn:
+            self._borrowed.depth -= 1
+            if self._borrowed.depth:
+                return  # 🔥 still borrowed further up this thread's stack
+            self._borrowed.conn = None
+        with self._condition:
+            if self._in_use.pop(id(conn), None) != self._generation:
+                close = True  # borrowed before close_all()
+            if not close and not conn.closed:
+                try:
+                    if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                        conn.rollback()
+                    conn.autocommit = False
+                except psycopg2.Error:
+                    close = True
+            if close or conn.closed:
+                self._discard(conn)
             else:
-                self.connection.commit()
+                self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+    
+    def _discard(self, conn) -> None:
+        """Close a connection and free its slot (caller holds the lock)"""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._opened -= 1
+    
+    def _close_idle(self) -> None:
+        """Close every idle connection (caller holds the lock)"""
+        while self._idle:
+            conn, _ = self._idle.pop()
+            self._discard(conn)
+    
+    def close_all(self) -> None:
+        """Close idle connections; borrowed ones are closed when returned"""
+        with self._condition:
+            self._generation += 1
+            self._close_idle()
+            self._condition.notify_all()
+    
+    # 🔥 CONTEXT MANAGERS - Borrow/return automatically
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """Borrow a connection for the duration of a `with` block"""
+        outermost = getattr(self._borrowed, 'conn', None) is None
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        except Exception:
+            if outermost and not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    pass  # broken connection; putconn discards it and the original error propagates
+            raise
+        finally:
+            self.putconn(conn)
+    
+    @contextmanager
+    def cursor(self, commit: bool = False, timeout: Optional[float] = None):
+        """Per-request RealDictCursor on a pooled connection"""
+        with self.connection(timeout) as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            try:
+                yield cursor
+                if commit:
+                    conn.commit()
+            finally:
+                cursor.close()
+    
+    def execute_query(self, query: str, params: Tuple = ()) -> Optional[List]:
+        """Execute database query safely on a pooled connection"""
+        try:
+            with self.cursor() as cursor:
+                cursor.execute(query, params)
+                if query.strip().upper().startswith('SELECT'):
+                    return cursor.fetchall()
+                cursor.connection.commit()
                 return None
         except Exception as e:
             logger.error(f"Query execution failed: {e}")
-            self.connection.rollback()
             return None
+    
+    def stats(self) -> Dict[str, int]:
+        """Current pool occupancy"""
+        with self._condition:
+            return {
+                'open': self._opened,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'max_size': self.max_size
+            }
+
+# 🔥 PROCESS-WIDE INSTANCE - cache_resource survives script reruns and is shared by all sessions
+@st.cache_resource
+def get_db_pool() -> DatabaseModule:
+    """Return the single connection pool for this server process"""
+    return DatabaseModule()
+
+db_pool = get_db_pool()
+
+# 🔥 BACKGROUND JOBS - Long admin tasks run on worker threads with a progress record
+@dataclass
+class BackgroundJob:
+    """Progress of an admin job running outside the Streamlit request"""
+    name: str
+    total_steps: int
+    completed_steps: int = 0
+    rows_affected: int = 0
+    status: str = "RUNNING"
+    error: Optional[str] = None
+    started_at: datetime = field(default_factory=datetime.now)
+    finished_at: Optional[datetime] = None
+    
+    @property
+    def is_running(self) -> bool:
+        return self.status == "RUNNING"
+    
+    @property
+    def progress(self) -> float:
+        return self.completed_steps / self.total_steps if self.total_steps else 1.0
+
+class JobRegistry:
+    """Starts named jobs on daemon threads, at most one running job per name"""
+    
+    def __init__(self):
+        self._jobs: Dict[str, BackgroundJob] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, name: str) -> Optional[BackgroundJob]:
+        return self._jobs.get(name)
+    
+    def start(self, name: str, steps: List, step_fn) -> BackgroundJob:
+        """Run step_fn(step) for each step in order; step_fn returns rows affected"""
+        with self._lock:
+            current = self._jobs.get(name)
+            if current and current.is_running:
+                return current
+            job = BackgroundJob(name=name, total_steps=len(steps))
+            self._jobs[name] = job
+        
+        def run():
+            try:
+                for step in steps:
+                    job.rows_affected += step_fn(step)
+                    job.completed_steps += 1
+                job.status = "DONE"
+            except Exception as e:
+                job.status = "FAILED"
+                job.error = str(e)
+                logger.error(f"Background job {name} failed: {e}")
+            finally:
+                job.finished_at = datetime.now()
+                logger.info(f"Background job {name} {job.status}: "
+                            f"{job.completed_steps}/{job.total_steps} steps, {job.rows_affected} rows")
+        
+        threading.Thread(target=run, name=f"job-{name}", daemon=True).start()
+        return job
+
+@st.cache_resource
+def get_job_registry() -> JobRegistry:
+    """Return the process-wide background job registry"""
+    return JobRegistry()
+
+class SeatHoldSweeper:
+    """Deletes expired seat holds on a daemon thread so abandoned carts free their seats"""
+    
+    def __init__(self, interval: int):
+        self.interval = interval
+        self.last_swept: Optional[datetime] = None
+        self.holds_released = 0
+        threading.Thread(target=self._run, name="seat-hold-sweeper", daemon=True).start()
+    
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            if not db_pool.is_ready:
+                continue
+            try:
+                with db_pool.cursor(commit=True) as cursor:
+                    self.holds_released += sweep_expired_seat_holds(cursor)
+                self.last_swept = datetime.now()
+            except Exception as e:
+                logger.error(f"Seat hold sweep failed: {e}")
+
+@st.cache_resource
+def get_seat_hold_sweeper() -> SeatHoldSweeper:
+    """Start the process-wide seat hold sweeper once"""
+    return SeatHoldSweeper(CONFIG['SEAT_HOLD_SWEEP_SECONDS'])
+
+class AvailabilityListener:
+    """LISTENs for availability changes from every app process and evicts them from this process's caches
+    
+    Writers publish inside their transaction, so Postgres delivers a change only once it has
+    committed. Changes sent while the listen connection is down are lost, so every
+    (re)connect starts from empty availability caches.
+    """
+    
+    def __init__(self, channel: str, poll_seconds: int):
+        self.channel = channel
+        self.poll_seconds = poll_seconds
+        self.connected = False
+        self.notifications = 0
+        self.last_notification: Optional[datetime] = None
+        threading.Thread(target=self._run, name="availability-listener", daemon=True).start()
+    
+    def _run(self):
+        while True:
+            if db_pool.is_ready:
+                try:
+                    self._listen()
+                except Exception as e:
+                    logger.error(f"Availability listener disconnected: {e}")
+                self.connected = False
+            time.sleep(self.poll_seconds)
+    
+    def _listen(self):
+        """Hold one dedicated autocommit connection and apply notifications as they arrive"""
+        conn = db_pool.dedicated_connection()  # 🔥 OUTSIDE THE POOL - LISTEN needs a connection of its own
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {self.channel}")
+            self.connected = True
+            clear_availability_caches()
+            while db_pool.is_ready:
+                if select.select([conn], [], [], self.poll_seconds) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        apply_availability_change(json.loads(notify.payload))
+                    except (ValueError, KeyError) as e:
+                        logger.error(f"Ignoring bad availability notification {notify.payload!r}: {e}")
+                        clear_availability_caches()
+                    self.notifications += 1
+                    self.last_notification = datetime.now()
+        finally:
+            conn.close()
+
+@st.cache_resource
+def get_availability_listener() -> AvailabilityListener:
+    """Start the process-wide availability listener once"""
+    return AvailabilityListener(CONFIG['AVAILABILITY_CHANNEL'], CONFIG['AVAILABILITY_LISTEN_POLL_SECONDS'])
+
+# 🔥 ID GENERATION - k-sorted 64-bit IDs: milliseconds | worker id | sequence
+class SnowflakeIdGenerator:
+    """Snowflake-style IDs that sort by creation time and never repeat across workers
+    
+    41 bits of milliseconds since CONFIG['ID_EPOCH_MS'], 10 bits of worker id and a 12-bit
+    per-millisecond sequence. When a millisecond's sequence runs out or the clock steps
+    back, the next millisecond is borrowed instead of sleeping, so one worker's IDs
+    always increase.
+    """
+    WORKER_BITS = 10
+    SEQUENCE_BITS = 12
+    MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+    MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+    
+    def __init__(self, worker_id: int, epoch_ms: int = CONFIG['ID_EPOCH_MS']):
+        if not 0 <= worker_id <= self.MAX_WORKER_ID:
+            raise ValueError(f"Worker id must be between 0 and {self.MAX_WORKER_ID}: {worker_id}")
+        self.worker_id = worker_id
+        self.epoch_ms = epoch_ms
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = threading.Lock()  # 🔥 held for a few integer operations only
+    
+    def next_id(self) -> int:
+        now_ms = time.time_ns() // 1_000_000 - self.epoch_ms
+        with self._lock:
+            if now_ms > self._last_ms:
+                self._last_ms, self._sequence = now_ms, 0
+            elif self._sequence < self.MAX_SEQUENCE:
+                self._sequence += 1
+            else:
+                self._last_ms, self._sequence = self._last_ms + 1, 0
+            return ((self._last_ms << (self.WORKER_BITS + self.SEQUENCE_BITS))
+                    | (self.worker_id << self.SEQUENCE_BITS) | self._sequence)
+    
+    @classmethod
+    def parse(cls, snowflake_id: int, epoch_ms: int = CONFIG['ID_EPOCH_MS']) -> Dict[str, Union[int, datetime]]:
+        """Split an ID back into its creation time, worker id and sequence"""
+        ms = snowflake_id >> (cls.WORKER_BITS + cls.SEQUENCE_BITS)
+        return {
+            'created_at': datetime.fromtimestamp((ms + epoch_ms) / 1000),
+            'worker_id': (snowflake_id >> cls.SEQUENCE_BITS) & cls.MAX_WORKER_ID,
+            'sequence': snowflake_id & cls.MAX_SEQUENCE
+        }
+
+class WorkerIdLease:
+    """Exclusive hold on one Snowflake worker id while this process runs
+    
+    The hold is a session advisory lock on a dedicated connection, so the server frees it when
+    the process exits or the connection drops; release() frees it straight away.
+    """
+    LOCK_NAMESPACE = 0x534E  # 🔥 advisory lock key space (first int of the two-int form) for worker ids
+    
+    def __init__(self, check_interval: float = 5.0):
+        self.check_interval = check_interval
+        self.worker_id = None
+        self._held = False
+        self._last_check = time.monotonic()
+        self._lock = threading.Lock()
+        self.conn = db_pool.dedicated_connection()  # 🔥 OUTSIDE THE POOL - the lock lives as long as this session
+        try:
+            with self.conn.cursor() as cursor:
+                # Start at the next sequence value so restarts spread out, then take the first free id
+                cursor.execute("SELECT nextval('snowflake_worker_ids')")
+                start = cursor.fetchone()[0]
+                worker_ids = SnowflakeIdGenerator.MAX_WORKER_ID + 1
+                for offset in range(worker_ids):
+                    candidate = (start + offset) % worker_ids
+                    cursor.execute("SELECT pg_try_advisory_lock(%s, %s)", (self.LOCK_NAMESPACE, candidate))
+                    if cursor.fetchone()[0]:
+                        self.worker_id, self._held = candidate, True
+                        break
+        except Exception:
+            self.conn.close()
+            raise
+        if not self._held:
+            self.conn.close()
+            raise DatabaseConnectionError(f"All {worker_ids} Snowflake worker ids are leased by running processes")
+        logger.info(f"Leased Snowflake worker id {self.worker_id}")
+    
+    def is_held(self) -> bool:
+        """False once the lease connection is gone; checked at most every check_interval seconds"""
+        now = time.monotonic()
+        if not self._held or now - self._last_check < self.check_interval:
+            return self._held
+        if not self._lock.acquire(blocking=False):
+            return self._held  # another thread is checking right now
+        try:
+            self._last_check = now
+            with self.conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except psycopg2.Error as e:
+            logger.warning(f"Lost the lease on Snowflake worker id {self.worker_id}: {e}")
+            self._held = False
+            self.conn.close()
+        finally:
+            self._lock.release()
+        return self._held
+    
+    def release(self) -> None:
+        """Give the worker id back"""
+        if self._held:
+            self._held = False
+            try:
+                with self.conn.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_unlock(%s, %s)", (self.LOCK_NAMESPACE, self.worker_id))
+            except psycopg2.Error:
+                pass  # the connection is gone, and the lock with it
+        self.conn.close()
+
+def claim_worker_id() -> WorkerIdLease:
+    """Lease a worker id no running server process holds; freed when this process exits"""
+    lease = WorkerIdLease()
+    atexit.register(lease.release)
+    return lease
+
+@st.cache_resource
+def get_worker_id_lease() -> WorkerIdLease:
+    """Return this process's worker id lease"""
+    return claim_worker_id()
+
+@st.cache_resource
+def get_id_generator(worker_id: int) -> SnowflakeIdGenerator:
+    """Return the process-wide ID generator for a leased worker id"""
+    return SnowflakeIdGenerator(worker_id)
+
+_worker_lease_renewal = threading.Lock()
+
+def get_leased_id_generator() -> SnowflakeIdGenerator:
+    """ID generator on this process's worker id, leasing a new id if the old lease was lost"""
+    lease = get_worker_id_lease()
+    if not lease.is_held():
+        with _worker_lease_renewal:
+            if get_worker_id_lease() is lease:
+                get_worker_id_lease.clear()
+            lease = get_worker_id_lease()
+    return get_id_generator(lease.worker_id)
+
+# 🔥 ADMISSION CONTROL - Virtual waiting room in front of comedy/concert checkout
+class WaitingRoom:
+    """Per-show admission queue kept in process memory
+    
+    Each session joins with a queue token; tokens are let through in arrival order at a rate
+    that drops as database latency rises, and at most max_checkouts tokens per show may be
+    checking out at once. Queues and slots are per process, so with several server processes
+    the cap (and the admission rate) applies to each of them separately. Sessions that stop
+    polling lose their place, and checkout slots lapse checkout_ttl after the last heartbeat.
+    """
+    
+    def __init__(self, max_checkouts: int, admit_per_second: float, target_latency_ms: float,
+                 checkout_ttl: int, idle_seconds: int, probe_interval: float = 1.0):
+        self.max_checkouts = max_checkouts
+        self.admit_per_second = admit_per_second
+        self.target_latency_ms = target_latency_ms
+        self.checkout_ttl = checkout_ttl
+        self.idle_seconds = idle_seconds
+        self.probe_interval = probe_interval
+        self.latency_ms = 0.0
+        self._last_probe = 0.0
+        self._lock = threading.Lock()
+        self._queues: Dict[tuple, OrderedDict] = {}
+        self._checkouts: Dict[tuple, Dict[str, float]] = {}
+        self._allowance: Dict[tuple, Tuple[float, float]] = {}
+    
+    @property
+    def admission_rate(self) -> float:
+        """Admissions per second per show, scaled down when the database is slower than target"""
+        if self.latency_ms <= self.target_latency_ms:
+            return self.admit_per_second
+        return self.admit_per_second * self.target_latency_ms / self.latency_ms
+    
+    def _probe_latency(self, now: float, cursor) -> None:
+        """Smoothed round-trip time of a trivial query on the caller's connection
+        
+        Borrowing a pooled connection here would wait out the checkout timeout on the
+        admission path exactly when the pool is saturated.
+        """
+        if now - self._last_probe < self.probe_interval:
+            return
+        self._last_probe = now
+        try:
+            start = time.perf_counter()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            sample = (time.perf_counter() - start) * 1000
+        except Exception as e:
+            logger.warning(f"Waiting room latency probe failed: {e}")
+            sample = self.target_latency_ms * 10
+        self.latency_ms = sample if not self.latency_ms else 0.8 * self.latency_ms + 0.2 * sample
+    
+    def _expire(self, show_key: tuple, now: float) -> None:
+        queue = self._queues.setdefault(show_key, OrderedDict())
+        for token in [t for t, seen in queue.items() if now - seen > self.idle_seconds]:
+            del queue[token]
+        checkouts = self._checkouts.setdefault(show_key, {})
+        for token in [t for t, seen in checkouts.items() if now - seen > self.checkout_ttl]:
+            del checkouts[token]
+    
+    def _admit(self, show_key: tuple, now: float) -> None:
+        """Token bucket per show: refill at admission_rate, hold at most one second of burst"""
+        rate = self.admission_rate
+        allowance, last = self._allowance.get(show_key, (max(rate, 1.0), now))
+        allowance = min(max(rate, 1.0), allowance + (now - last) * rate)
+        queue, checkouts = self._queues[show_key], self._checkouts[show_key]
+        while queue and len(checkouts) < self.max_checkouts and allowance >= 1:
+            token, _ = queue.popitem(last=False)
+            checkouts[token] = now
+            allowance -= 1
+        self._allowance[show_key] = (allowance, now)
+    
+    def enter(self, show_key: tuple, token: str, cursor=None) -> int:
+        """Join or re-poll the queue for a show; 0 means admitted, otherwise the 1-based position
+        
+        The latency probe runs on the caller's request cursor; without one the call never
+        touches the database.
+        """
+        now = time.monotonic()
+        if cursor is not None:
+            self._probe_latency(now, cursor)
+        with self._lock:
+            self._expire(show_key, now)
+            checkouts = self._checkouts[show_key]
+            if token in checkouts:
+                checkouts[token] = now
+                return 0
+            queue = self._queues[show_key]
+            queue[token] = now  # re-polling keeps the original place in line
+            self._admit(show_key, now)
+            if token in checkouts:
+                return 0
+            return list(queue).index(token) + 1
+    
+    def heartbeat(self, token: str) -> bool:
+        """Keep a token's checkout slots alive; False if it holds none any more"""
+        now = time.monotonic()
+        with self._lock:
+            held = False
+            for checkouts in self._checkouts.values():
+                if token in checkouts:
+                    checkouts[token] = now
+                    held = True
+            return held
+    
+    def leave(self, token: str) -> None:
+        """Drop a token from every queue and checkout, freeing its slot"""
+        with self._lock:
+            for queue in self._queues.values():
+                queue.pop(token, None)
+            for checkouts in self._checkouts.values():
+                checkouts.pop(token, None)
+    
+    def estimated_wait(self, position: int) -> float:
+        """Rough seconds until a queue position is admitted"""
+        return position / max(self.admission_rate, 0.01)
+    
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'waiting': sum(len(queue) for queue in self._queues.values()),
+                'checking_out': sum(len(checkouts) for checkouts in self._checkouts.values()),
+                'admission_rate': round(self.admission_rate, 2),
+                'db_latency_ms': round(self.latency_ms, 1)
+            }
+
+@st.cache_resource
+def get_waiting_room() -> WaitingRoom:
+    """Return the process-wide waiting room"""
+    return WaitingRoom(CONFIG['WAITING_ROOM_MAX_CHECKOUTS_PER_SHOW'], CONFIG['WAITING_ROOM_ADMIT_PER_SECOND'],
+                       CONFIG['WAITING_ROOM_TARGET_DB_LATENCY_MS'], CONFIG['WAITING_ROOM_CHECKOUT_TTL_SECONDS'],
+                       CONFIG['WAITING_ROOM_IDLE_SECONDS'])
+
+# 🔥 CATALOG CACHE - Static catalog tables loaded once per process and indexed in memory
+@dataclass(frozen=True)
+class Catalog:
+    """Immutable snapshot of movies, theatres, venues, comedy shows and concerts
+    
+    Rows are shared between sessions - copy one before changing it.
+    """
+    version: int
+    movies: Dict[int, dict]
+    movies_by_mood: Dict[str, Tuple[dict, ...]]
+    theatres: Dict[int, dict]
+    theatres_by_area: Dict[str, Tuple[dict, ...]]
+    theatres_by_movie: Dict[Tuple[str, int], Tuple[dict, ...]]
+    venues: Dict[int, dict]
+    comedy_shows: Tuple[dict, ...]
+    concerts: Tuple[dict, ...]
+    
+    @classmethod
+    def load(cls, cursor, version: int) -> 'Catalog':
+        cursor.execute("SELECT id, movie_name, mood, duration_minutes, rating, language FROM movies ORDER BY id")
+        movies = {row['id']: dict(row) for row in cursor.fetchall()}
+        cursor.execute("""
+            SELECT theater_id, name, area, theater_type, base_price, total_seats, address
+            FROM theatres ORDER BY theater_id
+        """)
+        theatres = {row['theater_id']: dict(row) for row in cursor.fetchall()}
+        cursor.execute("SELECT area, movie_id, theatre_id FROM movie_theatre_assignments ORDER BY area, movie_id, slot")
+        assignments = cursor.fetchall()
+        cursor.execute("""
+            SELECT venue_id, name, area, venue_type, capacity, available_capacity, base_price, address, facilities
+            FROM venues ORDER BY name
+        """)
+        venues = {row['venue_id']: dict(row) for row in cursor.fetchall()}
+        cursor.execute("""
+            SELECT show_id, comedian_name, show_title, show_type, duration_minutes, 
+                   language, age_rating, description, ticket_price
+            FROM comedy_shows ORDER BY comedian_name
+        """)
+        comedy_shows = tuple(dict(row) for row in cursor.fetchall())
+        cursor.execute("""
+            SELECT concert_id, artist_name, concert_title, genre, duration_minutes, 
+                   language, ticket_price, description, special_guests
+            FROM concerts ORDER BY artist_name
+        """)
+        concerts = tuple(dict(row) for row in cursor.fetchall())
+        
+        movies_by_mood: Dict[str, List[dict]] = {}
+        for movie in movies.values():
+            movies_by_mood.setdefault(movie['mood'], []).append(movie)
+        theatres_by_area: Dict[str, List[dict]] = {}
+        for theatre in theatres.values():
+            theatres_by_area.setdefault(theatre['area'], []).append(theatre)
+        theatres_by_movie: Dict[Tuple[str, int], List[dict]] = {}
+        for row in assignments:
+            theatres_by_movie.setdefault((row['area'], row['movie_id']), []).append(theatres[row['theatre_id']])
+        
+        return cls(version=version, movies=movies,
+                   movies_by_mood={mood: tuple(rows) for mood, rows in movies_by_mood.items()},
+                   theatres=theatres,
+                   theatres_by_area={area: tuple(rows) for area, rows in theatres_by_area.items()},
+                   theatres_by_movie={key: tuple(rows) for key, rows in theatres_by_movie.items()},
+                   venues=venues, comedy_shows=comedy_shows, concerts=concerts)
+    
+    def comedy_venues(self, area: Optional[str] = None) -> List[dict]:
+        """Copies of comedy venues, optionally in one area, ordered by name"""
+        return [dict(venue) for venue in self.venues.values()
+                if 'Comedy' in (venue['venue_type'] or '') and (area is None or venue['area'] == area)]
+    
+    def concert_venues(self, area: Optional[str] = None) -> List[dict]:
+        """Copies of concert/music venues, optionally in one area, ordered by name"""
+        return [dict(venue) for venue in self.venues.values()
+                if any(kind in (venue['venue_type'] or '') for kind in ('Concert', 'Music'))
+                and (area is None or venue['area'] == area)]
+
+@memoize(maxsize=1, ttl=CONFIG['CATALOG_VERSION_CHECK_SECONDS'], with_cursor=True)
+def get_catalog_version(cursor) -> int:
+    """catalog_meta.version, re-read at most every CATALOG_VERSION_CHECK_SECONDS
+    
+    Changes made by another process show up within that window; bump_catalog_version
+    clears it once the change commits, so this process sees its own changes at once.
+    """
+    cursor.execute("SELECT version FROM catalog_meta WHERE id = 1")
+    row = cursor.fetchone()
+    return row['version'] if row else 0
+
+@memoize(maxsize=1, with_cursor=True)
+def load_catalog(cursor, version: int) -> Catalog:
+    """Catalog snapshot for one version; a new version evicts the old snapshot"""
+    catalog = Catalog.load(cursor, version)
+    logger.info(f"Catalog loaded at version {version}")
+    return catalog
+
+def get_catalog(cursor) -> Catalog:
+    """Current catalog snapshot, read on the caller's cursor when it has to be loaded"""
+    return load_catalog(cursor, get_catalog_version(cursor))
+
+def bump_catalog_version(cursor) -> None:
+    """Mark catalog tables as changed; call in the transaction that changes them"""
+    cursor.execute("""
+        UPDATE catalog_meta
+        SET version = GREATEST(version + 1, (EXTRACT(EPOCH FROM clock_timestamp()) * 1000)::BIGINT),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = 1
+    """)
+    # Clearing before the commit would let a concurrent reader re-cache the old version for the TTL
+    cursor.connection.after_commit(get_catalog_version.cache_clear)
 
 # 🔥 UTILITY MODULE - Static utility functions
 class UtilityModule:
@@ -318,7 +1650,7 @@ class UtilityModule:
     @staticmethod
     def generate_transaction_id() -> str:
         """Generate unique transaction ID"""
-        return f"TXN{int(time.time())}{random.randint(1000, 9999)}"
+        return generate_transaction_id()
     
     @staticmethod
     def get_next_dates(days: int = 3) -> List[Dict]:
@@ -421,10 +1753,10 @@ class Movie:
     rating: str
     language: str
     
-    @memoize  # 🔥 USING DECORATOR
     def get_show_times(self) -> List[str]:
-        """Get show times for this movie"""
-        return calculate_show_times(self.id)
+        """Get today's show times for this movie"""
+        with db_pool.cursor() as cursor:  # 🔥 reuses the request's connection when there is one
+            return list(get_show_times(cursor, 'movie', self.id, datetime.now().date()))
 
 # =====================================================
 # 🎯 CONCEPT 6: ADVANCED OOP CONCEPTS AND NUMPY
@@ -506,7 +1838,7 @@ class BookingManager:
     def __init__(self):
         if not self._initialized:
             self.bookings = []  # 🔥 MUTABLE LIST
-            self.db = DatabaseModule()
+            self.db = get_db_pool()
             self.utils = UtilityModule()
             self._initialized = True
 
@@ -610,6 +1942,7 @@ if 'admin_logged_in' not in st.session_state:
     st.session_state.admin_logged_in = None
 if 'db_password' not in st.session_state:
     st.session_state.db_password = None
+# conn/cursor are borrowed from db_pool for a single script run (see request_connection)
 if 'conn' not in st.session_state:
     st.session_state.conn = None
 if 'cursor' not in st.session_state:
@@ -619,59 +1952,35 @@ if 'db_ready' not in st.session_state:
 
 # 🔥 ENHANCED FUNCTIONS WITH ALL CONCEPTS
 
-@memoize  # 🔥 USING DECORATOR
-def calculate_show_times(movie_id: int) -> List[str]:
-    """Memoized function to calculate show times"""
-    base_times = {
-        'romantic': ["2:00 PM", "5:30 PM", "8:45 PM"],
-        'action': ["12:30 PM", "4:00 PM", "7:30 PM", "10:45 PM"],
-        'comedy': ["1:30 PM", "4:30 PM", "7:00 PM", "9:30 PM"],
-        'family': ["11:00 AM", "2:30 PM", "6:00 PM", "9:00 PM"]
-    }
-    
-    if 1 <= movie_id <= 10:
-        category = 'romantic'
-    elif 11 <= movie_id <= 20:
-        category = 'action'
-    elif 21 <= movie_id <= 30:
-        category = 'comedy'
-    else:
-        category = 'family'
-    
-    times = base_times[category].copy()
-    offset = (movie_id - 1) % 4 * 15
-    
-    adjusted_times = []
-    for time_str in times:
-        hour, minute_period = time_str.split(':')
-        minute, period = minute_period.split(' ')
-        
-        total_minutes = int(hour) * 60 + int(minute) + offset
-        if period == 'PM' and int(hour) != 12:
-            total_minutes += 12 * 60
-        elif period == 'AM' and int(hour) == 12:
-            total_minutes -= 12 * 60
-            
-        new_hour = (total_minutes // 60) % 24
-        new_minute = total_minutes % 60
-        
-        if new_hour == 0:
-            display_hour, period = 12, 'AM'
-        elif new_hour < 12:
-            display_hour, period = new_hour, 'AM'
-        elif new_hour == 12:
-            display_hour, period = 12, 'PM'
-        else:
-            display_hour, period = new_hour - 12, 'PM'
-            
-        adjusted_times.append(f"{display_hour}:{new_minute:02d} {period}")
-    
-    return adjusted_times
+@memoize(maxsize=CONFIG['SCHEDULE_CACHE_SIZE'], ttl=CONFIG['SCHEDULE_CACHE_TTL_SECONDS'],
+         with_cursor=True)  # 🔥 USING DECORATOR
+def get_show_times(cursor, event_type: str, event_id: int, show_date, venue_id: Optional[int] = None) -> Tuple[str, ...]:
+    """Cached show times of one event on a date, read from the schedule"""
+    return tuple(get_scheduled_show_times(cursor, event_type, event_id, show_date, venue_id))
+
+@memoize(maxsize=CONFIG['SCHEDULE_CACHE_SIZE'], ttl=CONFIG['SCHEDULE_CACHE_TTL_SECONDS'], with_cursor=True)
+def get_show_grid(cursor, event_type: str, venue_id: int, show_date) -> Dict[int, Tuple[Tuple[str, Any], ...]]:
+    """Cached per-day show grid of one venue (event id -> (show time, start time) pairs), shared by every event there"""
+    return {event_id: tuple(shows)
+            for event_id, shows in load_show_grid(cursor, event_type, venue_id, show_date).items()}
+
+def get_upcoming_show_times(cursor, event_type: str, event_id: int, venue_id: int, show_date) -> Tuple[str, ...]:
+    """Show times of one event at a venue; today only those that haven't started yet
+    
+    The whole day's grid is cached and today's started shows are dropped here, so the
+    cache key doesn't change as the day goes on.
+    """
+    now = datetime.now()
+    shows = get_show_grid(cursor, event_type, venue_id, show_date).get(event_id, ())
+    if show_date == now.date():
+        after = now.time().replace(second=0, microsecond=0)
+        shows = [(show_time, start_time) for show_time, start_time in shows if start_time >= after]
+    return tuple(show_time for show_time, _ in shows)
 
 def reset_and_create_database():
     """Completely reset and create database with correct structure"""
     try:
-        password = st.session_state.db_password
+        password = st.session_state.db_password or db_pool.password
         
         # Connect to default postgres database to drop/create target db
         server_conn = psycopg2.connect(
@@ -683,6 +1992,9 @@ def reset_and_create_database():
         server_conn.autocommit = True
         server_cursor = server_conn.cursor()
         
+        # Release pooled connections before the database is dropped
+        db_pool.close_all()
+        
         # Force drop and recreate database
         try:
             # Terminate existing connections first
@@ -693,23 +2005,18 @@ def reset_and_create_database():
             server_cursor.close()
             server_conn.close()
         
-        # Connect to new database
-        conn = psycopg2.connect(
-            host=CONFIG['DB_HOST'],
-            user=CONFIG['DB_USER'],
-            password=password,
-            database='cinebook',
-            port=CONFIG['DB_PORT']
-        )
-        conn.autocommit = False # Reset to default
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        # Re-point the shared pool at the new database
+        if not db_pool.connect(password):
+            raise DatabaseConnectionError("Could not connect to the new database")
         
-        # Create all tables with correct structure
-        create_all_tables(cursor, conn)
-        insert_all_sample_data(cursor, conn)
+        with db_pool.connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            
+            # Create all tables with correct structure
+            create_all_tables(cursor, conn)
+            insert_all_sample_data(cursor, conn)
+            cursor.close()
         
-        st.session_state.conn = conn
-        st.session_state.cursor = cursor
         st.session_state.db_ready = True
         
         st.success("✅ Database created with all concepts!")
@@ -727,10 +2034,10 @@ def connect_to_existing_database():
         
         # First check if database exists
         server_conn = psycopg2.connect(
-            host='localhost',
-            user='postgres',
+            host=CONFIG['DB_HOST'],
+            user=CONFIG['DB_USER'],
             password=password,
-            port=5432
+            port=CONFIG['DB_PORT']
         )
         server_conn.autocommit = True
         server_cursor = server_conn.cursor()
@@ -747,42 +2054,34 @@ def connect_to_existing_database():
         server_cursor.close()
         server_conn.close()
         
-        # Connect to the database
-        conn = psycopg2.connect(
-            host='localhost',
-            user='postgres',
-            password=password,
-            database='cinebook',
-            port=5432
-        )
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        # Configure the shared connection pool for this process
+        if not db_pool.connect(password):
+            raise DatabaseConnectionError("Could not connect to database 'cinebook'")
         
-        # Check if theatre_rows table has show_time column
-        try:
-            cursor.execute("""
-                SELECT column_name FROM information_schema.columns 
-                WHERE table_name='theatre_rows' AND column_name='show_time'
-            """)
-            show_time_exists = cursor.fetchone()
+        with db_pool.connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
             
-            if not show_time_exists:
-                st.warning("⚠️ Database structure needs updating. Fixing automatically...")
-                # Force recreation of database structure
-                cursor.close()
-                conn.close()
-                return reset_and_create_database()
-        except:
-            # If any error occurs, reset the database
-            st.warning("⚠️ Database structure issues detected. Resetting database...")
+            # Check if theatre_rows table has show_time column
+            try:
+                cursor.execute("""
+                    SELECT column_name FROM information_schema.columns 
+                    WHERE table_name='theatre_rows' AND column_name='show_time'
+                """)
+                show_time_exists = cursor.fetchone()
+            except:
+                # Any error here is treated as a broken structure
+                show_time_exists = None
+            
+            if show_time_exists:
+                # Check and fix database structure
+                fix_database_structure(cursor, conn)
             cursor.close()
-            conn.close()
-            return reset_and_create_database()
         
-        # Check and fix database structure
-        fix_database_structure(cursor, conn)
+        if not show_time_exists:
+            st.warning("⚠️ Database structure needs updating. Fixing automatically...")
+            # Force recreation of database structure (after the pooled connection is returned)
+            return reset_and_create_database()
         
-        st.session_state.conn = conn
-        st.session_state.cursor = cursor
         st.session_state.db_ready = True
         
         return True
@@ -791,6 +2090,38 @@ def connect_to_existing_database():
         st.info("💡 Try using the 'Reset DB' button to create a fresh database.")
         return False
 
+def apply_schema_migrations(cursor):
+    """Idempotent schema upgrades run by every bootstrap path: typed show keys and hot-path indexes"""
+    # show_starts_at is the typed show key; the show_date/show_time labels stay for the existing keys
+    for table in ('theatre_rows', 'bookings'):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS show_starts_at TIMESTAMP")
+        cursor.execute(f"""
+            UPDATE {table} SET show_starts_at = show_date + show_time::time
+            WHERE show_starts_at IS NULL AND show_date IS NOT NULL AND show_time IS NOT NULL
+        """)
+    cursor.execute("ALTER TABLE theatre_rows ALTER COLUMN show_starts_at SET NOT NULL")
+    
+    # Worker ids for the transaction ID generator, one per server process
+    cursor.execute("CREATE SEQUENCE IF NOT EXISTS snowflake_worker_ids")
+    
+    # One booking per cart, however many times its payment is submitted
+    cursor.execute("ALTER TABLE bookings ADD COLUMN IF NOT EXISTS idempotency_key VARCHAR(64)")
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_bookings_idempotency_key
+        ON bookings (idempotency_key) WHERE idempotency_key IS NOT NULL
+    """)
+    
+    # Seat page and seat locking: every row of one show in row order, answered from the index alone
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_theatre_rows_show
+        ON theatre_rows (theatre_id, show_starts_at, row_name)
+        INCLUDE (total_seats, available_seats, price_multiplier)
+    """)
+    # My Bookings: one user's bookings, newest first
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bookings_user_date ON bookings (user_email, booking_date DESC)")
+    # Admin booking lists and booking-date filters
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bookings_booking_date ON bookings (booking_date DESC)")
+
 def fix_database_structure(cursor, conn):
     """Check and fix database structure issues"""
     try:
@@ -830,9 +2161,11 @@ def fix_database_structure(cursor, conn):
                     row_name VARCHAR(5) NOT NULL,
                     show_date DATE NOT NULL,
                     show_time VARCHAR(20) NOT NULL,
+                    show_starts_at TIMESTAMP NOT NULL,
                     total_seats INTEGER NOT NULL,
                     available_seats INTEGER NOT NULL,
                     price_multiplier DECIMAL(3,2) DEFAULT 1.0,
+                    seat_map BYTEA,
                     FOREIGN KEY (theatre_id) REFERENCES theatres(theater_id),
                     UNIQUE (theatre_id, row_name, show_date, show_time)
                 )
@@ -842,6 +2175,28 @@ def fix_database_structure(cursor, conn):
             # Force recreation of theatre rows data
             recreate_theatre_rows_data(cursor, conn)
         
+        # Per-seat bitmap column (NULL means no individual seat has been assigned yet)
+        cursor.execute("ALTER TABLE theatre_rows ADD COLUMN IF NOT EXISTS seat_map BYTEA")
+        
+        apply_schema_migrations(cursor)
+        
+        # Per-venue switch for sharded show capacity
+        cursor.execute("ALTER TABLE venues ADD COLUMN IF NOT EXISTS capacity_shards INTEGER DEFAULT 1")
+        
+        # Seed per-show capacity from existing comedy/concert bookings
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM show_capacity) AS seeded")
+        if not cursor.fetchone()['seeded']:
+            cursor.execute("""
+                INSERT INTO show_capacity (venue_id, event_type, show_id, show_date, show_time, capacity, available_capacity)
+                SELECT b.venue_id, b.event_type, b.event_id, b.show_date, b.show_time,
+                       v.capacity, GREATEST(v.capacity - SUM(b.booked_seats), 0)
+                FROM bookings b
+                JOIN venues v ON v.venue_id = b.venue_id
+                WHERE b.event_type IN ('comedy', 'concert')
+                GROUP BY b.venue_id, b.event_type, b.event_id, b.show_date, b.show_time, v.capacity
+                ON CONFLICT DO NOTHING
+            """)
+        
         # Add sample data if tables are empty
         cursor.execute("SELECT COUNT(*) as count FROM theatres")
         result = cursor.fetchone()
@@ -852,6 +2207,24 @@ def fix_database_structure(cursor, conn):
             insert_all_sample_data(cursor, conn)
             st.success("✅ Sample data added!")
         else:
+            # Precompute movie -> theatre assignments for databases created before the table existed
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM movie_theatre_assignments) AS built")
+            if not cursor.fetchone()['built']:
+                build_movie_theatre_assignments(cursor)
+            
+            # Schedule the booking window for databases created before the schedules table existed
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM schedules) AS seeded")
+            if not cursor.fetchone()['seeded']:
+                seed_schedules(cursor, [date_info['date'] for date_info in get_next_few_days(3)])
+            
+            # Roll up bookings made before the analytics rollup existed
+            cursor.execute("""
+                SELECT NOT EXISTS (SELECT 1 FROM booking_daily_rollup)
+                       AND EXISTS (SELECT 1 FROM bookings) AS needs_rollup
+            """)
+            if cursor.fetchone()['needs_rollup']:
+                rebuild_booking_rollup(cursor)
+            
             # Check if theatre_rows has data
             cursor.execute("SELECT COUNT(*) as count FROM theatre_rows")
             result = cursor.fetchone()
@@ -877,56 +2250,120 @@ def get_next_few_days(num_days=3):
         })
     return dates
 
-def get_movie_specific_theatres(movie_id, user_area, cursor):
-    """Get 3 specific theatres for each movie from the 7 available in user's area"""
-    # Get all theatres in user's area
+def get_movie_theatre_indices(movie_id, theatre_count):
+    """Positions (in an area's theatres ordered by theater_id) of the 3 theatres showing a movie"""
+    if theatre_count < 3:
+        return list(range(theatre_count))
+    if not 1 <= movie_id <= 40:
+        return [0, 1, 2]
+    
+    # Use modulo to cycle through available theatres, ensuring each movie gets 3 different ones
+    start_idx = ((movie_id - 1) * 2) % theatre_count  # Different starting point for each movie
+    selected_indices = []
+    
+    # Select 3 theatres with some spacing
+    for j in range(3):
+        idx = (start_idx + j * 2) % theatre_count
+        selected_indices.append(idx)
+    
+    # Remove duplicates and ensure we have 3 different theatres
+    selected_indices = list(set(selected_indices))
+    while len(selected_indices) < 3 and len(selected_indices) < theatre_count:
+        for k in range(theatre_count):
+            if k not in selected_indices:
+                selected_indices.append(k)
+                break
+    
+    return selected_indices[:3]
+
+# 🔥 ANALYTICS ROLLUP - Per day, event type, venue and area totals so dashboards never scan bookings
+BOOKING_ROLLUP_SELECT = """
+    SELECT b.booking_date::date, b.event_type, b.venue_id,
+           COALESCE(CASE WHEN b.event_type = 'movie' THEN t.area ELSE v.area END, 'Unknown'),
+           COUNT(*), SUM(b.booked_seats), SUM(b.total_amount), SUM(b.base_amount), SUM(b.gst_amount),
+           SUM(b.platform_fee), SUM(b.theatre_share), SUM(b.profit_amount)
+    FROM bookings b
+    LEFT JOIN theatres t ON b.event_type = 'movie' AND t.theater_id = b.venue_id
+    LEFT JOIN venues v ON b.event_type <> 'movie' AND v.venue_id = b.venue_id
+    WHERE b.payment_status = 'COMPLETED' AND {where}
+    GROUP BY 1, 2, 3, 4
+    ORDER BY 1, 2, 3, 4
+"""
+
+ROLLUP_SETTLED_BOOKING = """NOT EXISTS (
+        SELECT 1 FROM outbox o WHERE o.booking_id = b.booking_id AND o.topic = 'analytics' AND NOT o.dead
+    )"""
+
+def add_bookings_to_rollup(cursor, booking_ids: List[int]) -> None:
+    """Add completed bookings to booking_daily_rollup, one upsert per (day, event type, venue, area)"""
+    cursor.execute(f"""
+        INSERT INTO booking_daily_rollup (day, event_type, venue_id, area, bookings, tickets, revenue,
+                                          base_amount, gst_amount, platform_fee, theatre_share, profit_amount)
+        {BOOKING_ROLLUP_SELECT.format(where="b.booking_id = ANY(%s)")}
+        ON CONFLICT (day, event_type, venue_id, area) DO UPDATE SET
+            bookings = booking_daily_rollup.bookings + EXCLUDED.bookings,
+            tickets = booking_daily_rollup.tickets + EXCLUDED.tickets,
+            revenue = booking_daily_rollup.revenue + EXCLUDED.revenue,
+            base_amount = booking_daily_rollup.base_amount + EXCLUDED.base_amount,
+            gst_amount = booking_daily_rollup.gst_amount + EXCLUDED.gst_amount,
+            platform_fee = booking_daily_rollup.platform_fee + EXCLUDED.platform_fee,
+            theatre_share = booking_daily_rollup.theatre_share + EXCLUDED.theatre_share,
+            profit_amount = booking_daily_rollup.profit_amount + EXCLUDED.profit_amount
+    """, (list(booking_ids),))
+
+def rebuild_booking_rollup(cursor) -> int:
+    """Recompute booking_daily_rollup from bookings; returns rollup rows written
+    
+    Bookings whose analytics event is still in the outbox are left for the dispatcher, and the
+    table lock waits out (and then holds off) dispatchers writing the rollup meanwhile.
+    """
+    cursor.execute("LOCK TABLE booking_daily_rollup IN SHARE ROW EXCLUSIVE MODE")
+    cursor.execute("DELETE FROM booking_daily_rollup")
+    cursor.execute(f"""
+        INSERT INTO booking_daily_rollup (day, event_type, venue_id, area, bookings, tickets, revenue,
+                                          base_amount, gst_amount, platform_fee, theatre_share, profit_amount)
+        {BOOKING_ROLLUP_SELECT.format(where=ROLLUP_SETTLED_BOOKING)}
+    """)
+    return cursor.rowcount
+
+def build_movie_theatre_assignments(cursor) -> int:
+    """Precompute which theatres in each area show each movie into movie_theatre_assignments"""
+    cursor.execute("SELECT theater_id, area FROM theatres ORDER BY area, theater_id")
+    theatres_by_area: Dict[str, List[int]] = {}
+    for row in cursor.fetchall():
+        theatres_by_area.setdefault(row['area'], []).append(row['theater_id'])
+    cursor.execute("SELECT id FROM movies ORDER BY id")
+    movie_ids = [row['id'] for row in cursor.fetchall()]
+    
+    areas, movies, slots, theatre_ids = [], [], [], []
+    for area, area_theatres in theatres_by_area.items():
+        for movie_id in movie_ids:
+            for slot, idx in enumerate(get_movie_theatre_indices(movie_id, len(area_theatres))):
+                areas.append(area)
+                movies.append(movie_id)
+                slots.append(slot)
+                theatre_ids.append(area_theatres[idx])
+    
+    cursor.execute("DELETE FROM movie_theatre_assignments")
     cursor.execute("""
-        SELECT theater_id, name, area, theater_type, base_price, total_seats, address
-        FROM theatres 
-        WHERE area = %s
-        ORDER BY theater_id
-    """, (user_area,))
-    all_theatres = cursor.fetchall()
-    
-    if len(all_theatres) < 3:
-        return all_theatres
-    
-    # Movie-specific theatre mapping (each movie gets 3 different theatres)
-    movie_theatre_mapping = {}
-    
-    # Create mapping for all 40 movies
-    for i in range(1, 41):
-        # Use modulo to cycle through available theatres, ensuring each movie gets 3 different ones
-        start_idx = ((i - 1) * 2) % len(all_theatres)  # Different starting point for each movie
-        selected_indices = []
-        
-        # Select 3 theatres with some spacing
-        for j in range(3):
-            idx = (start_idx + j * 2) % len(all_theatres)
-            selected_indices.append(idx)
-        
-        # Remove duplicates and ensure we have 3 different theatres
-        selected_indices = list(set(selected_indices))
-        while len(selected_indices) < 3 and len(selected_indices) < len(all_theatres):
-            for k in range(len(all_theatres)):
-                if k not in selected_indices:
-                    selected_indices.append(k)
-                    break
-        
-        movie_theatre_mapping[i] = selected_indices[:3]
-    
-    # Get the specific theatres for this movie
-    theatre_indices = movie_theatre_mapping.get(movie_id, [0, 1, 2])
-    selected_theatres = []
+        INSERT INTO movie_theatre_assignments (area, movie_id, slot, theatre_id)
+        SELECT * FROM unnest(%s::varchar[], %s::int[], %s::int[], %s::int[])
+    """, (areas, movies, slots, theatre_ids))
+    bump_catalog_version(cursor)
     
-    for idx in theatre_indices:
-        if idx < len(all_theatres):
-            selected_theatres.append(all_theatres[idx])
-    
-    return selected_theatres
+    logger.info(f"Built {len(areas)} movie-theatre assignments for {len(theatres_by_area)} areas")
+    return len(areas)
+
+def get_movie_specific_theatres(movie_id, user_area, cursor):
+    """Get the 3 theatres showing a movie in the user's area from the precomputed assignments"""
+    return [dict(theatre) for theatre in get_catalog(cursor).theatres_by_movie.get((user_area, movie_id), ())]
 
-def get_movie_show_times(movie_id):
-    """Get show times based on movie ID - each movie has unique show times"""
+def seed_schedules(cursor, show_dates) -> int:
+    """Create the default daily show grid for every movie, comedy show and concert on the given dates
+    
+    Movies play at their assigned theatres (movie_theatre_assignments); comedy shows and
+    concerts play at every comedy or concert venue. Existing schedule rows are kept.
+    """
     # Different show times for different movies to ensure variety
     movie_show_times = {
         # Romantic Movies (1-10) - Evening focused
@@ -978,7 +2415,190 @@ def get_movie_show_times(movie_id):
         40: ["10:20 AM", "1:50 PM", "5:20 PM", "8:20 PM"]
     }
     
-    return movie_show_times.get(movie_id, ["2:00 PM", "6:00 PM", "9:00 PM"])
+    # Different show times for different comedy shows
+    comedy_show_times = {
+        1: ["6:00 PM", "8:30 PM"],  # Kapil Sharma
+        2: ["6:15 PM", "8:45 PM"],  # Zakir Khan
+        3: ["6:30 PM", "9:00 PM"],  # Biswa
+        4: ["6:45 PM", "9:15 PM"],  # Kenny Sebastian
+        5: ["7:00 PM", "9:30 PM"]   # Abhishek Upmanyu
+    }
+    
+    # Different show times for different concerts
+    concert_show_times = {
+        1: ["7:00 PM", "9:30 PM"],   # Arijit Singh
+        2: ["6:30 PM", "9:00 PM"],   # A.R. Rahman
+        3: ["8:00 PM", "10:30 PM"],  # Nucleya
+        4: ["6:45 PM", "9:15 PM"],   # Rahat Fateh Ali Khan
+        5: ["7:15 PM", "9:45 PM"]    # Sunidhi Chauhan
+    }
+    
+    grid = [(event_type, event_id, show_time)
+            for event_type, show_times in (('movie', movie_show_times), ('comedy', comedy_show_times),
+                                           ('concert', concert_show_times))
+            for event_id, times in show_times.items() for show_time in times]
+    event_types, event_ids, show_times = (list(column) for column in zip(*grid))
+    
+    cursor.execute("""
+        INSERT INTO schedules (event_type, event_id, venue_id, show_date, start_time, show_time)
+        SELECT g.event_type, g.event_id, v.venue_id, d.show_date, g.start_time,
+               to_char(g.start_time, 'FMHH12:MI AM')
+        FROM unnest(%s::varchar[], %s::int[], %s::time[]) AS g(event_type, event_id, start_time)
+        JOIN (
+            SELECT 'movie' AS event_type, movie_id AS event_id, theatre_id AS venue_id
+            FROM movie_theatre_assignments
+            UNION ALL
+            SELECT 'comedy', c.show_id, v.venue_id
+            FROM comedy_shows c CROSS JOIN venues v WHERE v.venue_type LIKE '%%Comedy%%'
+            UNION ALL
+            SELECT 'concert', c.concert_id, v.venue_id
+            FROM concerts c CROSS JOIN venues v
+            WHERE v.venue_type LIKE '%%Concert%%' OR v.venue_type LIKE '%%Music%%'
+        ) v USING (event_type, event_id)
+        CROSS JOIN unnest(%s::date[]) AS d(show_date)
+        ON CONFLICT DO NOTHING
+    """, (event_types, event_ids, show_times, list(show_dates)))
+    logger.info(f"Scheduled {cursor.rowcount} shows across {len(show_dates)} dates")
+    return cursor.rowcount
+
+def extend_schedules(cursor, through_date) -> int:
+    """Repeat each event's latest scheduled day at every venue up to through_date"""
+    cursor.execute("""
+        INSERT INTO schedules (event_type, event_id, venue_id, show_date, start_time, show_time)
+        SELECT s.event_type, s.event_id, s.venue_id, d.show_date::date, s.start_time, s.show_time
+        FROM schedules s
+        JOIN (
+            SELECT event_type, event_id, venue_id, MAX(show_date) AS last_date
+            FROM schedules GROUP BY event_type, event_id, venue_id
+        ) l ON l.event_type = s.event_type AND l.event_id = s.event_id
+           AND l.venue_id = s.venue_id AND l.last_date = s.show_date
+        CROSS JOIN generate_series(l.last_date + 1, %s::date, INTERVAL '1 day') AS d(show_date)
+        WHERE l.last_date < %s::date
+        ON CONFLICT DO NOTHING
+    """, (through_date, through_date))
+    if cursor.rowcount:
+        logger.info(f"Extended schedules through {through_date} with {cursor.rowcount} shows")
+    return cursor.rowcount
+
+@st.cache_resource
+def ensure_schedule_horizon(through_date) -> int:
+    """Extend schedules through the end of the booking window once per process per date"""
+    with db_pool.cursor(commit=True) as cursor:
+        added = extend_schedules(cursor, through_date)
+    if added:
+        get_show_times.cache_clear()
+        get_show_grid.cache_clear()
+    return added
+
+def load_show_grid(cursor, event_type, venue_id, show_date) -> Dict[int, List[Tuple[str, Any]]]:
+    """Per-day show grid of one venue: event id -> (show time, start time) pairs in start order, in one query"""
+    cursor.execute("""
+        SELECT event_id, array_agg(show_time ORDER BY start_time) AS show_times,
+               array_agg(start_time ORDER BY start_time) AS start_times
+        FROM schedules
+        WHERE venue_id = %s AND show_date = %s AND event_type = %s
+        GROUP BY event_id
+    """, (venue_id, show_date, event_type))
+    return {row['event_id']: list(zip(row['show_times'], row['start_times'])) for row in cursor.fetchall()}
+
+def get_scheduled_show_times(cursor, event_type, event_id, show_date, venue_id=None) -> List[str]:
+    """Show times of one event on a date in start order, at one venue or across all its venues"""
+    cursor.execute("""
+        SELECT show_time FROM schedules
+        WHERE event_type = %s AND event_id = %s AND show_date = %s
+          AND (%s::int IS NULL OR venue_id = %s)
+        GROUP BY show_time, start_time
+        ORDER BY start_time
+    """, (event_type, event_id, show_date, venue_id, venue_id))
+    return [row['show_time'] for row in cursor.fetchall()]
+
+def get_theatre_seat_layout(theatre_id):
+    """Row layout as (row_name, seats_in_row, price_multiplier) tuples for a theatre"""
+    if theatre_id <= 7:  # Theatres 1-7 (120 seats)
+        return [("A", 30, 1.5), ("B", 35, 1.2), ("C", 30, 1.0), ("D", 15, 0.8), ("E", 10, 0.7)]
+    elif theatre_id <= 14:  # Theatres 8-14 (90 seats)
+        return [("A", 25, 1.5), ("B", 30, 1.2), ("C", 20, 1.0), ("D", 15, 0.8)]
+    elif theatre_id <= 21:  # Theatres 15-21 (105 seats)
+        return [("A", 30, 1.5), ("B", 35, 1.2), ("C", 25, 1.0), ("D", 15, 0.8)]
+    elif theatre_id <= 28:  # Theatres 22-28 (75 seats)
+        return [("A", 20, 1.5), ("B", 25, 1.2), ("C", 20, 1.0), ("D", 10, 0.8)]
+    elif theatre_id <= 35:  # Theatres 29-35 (60 seats)
+        return [("A", 20, 1.5), ("B", 25, 1.2), ("C", 15, 1.0)]
+    elif theatre_id <= 42:  # Theatres 36-42 (85 seats)
+        return [("A", 25, 1.5), ("B", 30, 1.2), ("C", 20, 1.0), ("D", 10, 0.8)]
+    elif theatre_id <= 49:  # Theatres 43-49 (70 seats)
+        return [("A", 20, 1.5), ("B", 25, 1.2), ("C", 15, 1.0), ("D", 10, 0.8)]
+    else:  # Theatres 50-56 (70 seats)
+        return [("A", 20, 1.5), ("B", 25, 1.2), ("C", 15, 1.0), ("D", 10, 0.8)]
+
+def get_scheduled_movie_shows(cursor, show_dates) -> List[Tuple[int, object, str, datetime]]:
+    """Every (theatre_id, show_date, show_time, show_starts_at) with a movie scheduled on the given dates"""
+    cursor.execute("""
+        SELECT DISTINCT venue_id, show_date, show_time, show_date + start_time AS show_starts_at
+        FROM schedules
+        WHERE event_type = 'movie' AND show_date = ANY(%s)
+        ORDER BY venue_id, show_starts_at
+    """, (list(show_dates),))
+    return [(row['venue_id'], row['show_date'], row['show_time'], row['show_starts_at'])
+            for row in cursor.fetchall()]
+
+# 🔥 GENERATOR - Seat inventory rows are produced lazily, never materialised as a list
+def generate_theatre_rows(shows):
+    """Yield one theatre_rows tuple per row of each (theatre, date, show time, start timestamp) show"""
+    for theatre_id, show_date, show_time, show_starts_at in shows:
+        for row_name, seats_in_row, price_mult in get_theatre_seat_layout(theatre_id):
+            yield (theatre_id, row_name, show_date, show_time, show_starts_at,
+                   seats_in_row, seats_in_row, price_mult)
+
+class CopyRowStream:
+    """File-like adapter that feeds generator rows to COPY FROM STDIN in text format"""
+    
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.row_count = 0
+        self._buffer = ""
+    
+    @staticmethod
+    def _format_value(value) -> str:
+        if value is None:
+            return "\\N"
+        return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+                .replace("\n", "\\n").replace("\r", "\\r"))
+    
+    def read(self, size: int = -1) -> str:
+        """Return up to `size` characters, pulling more rows from the generator as needed"""
+        while size < 0 or len(self._buffer) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self._buffer += "\t".join(self._format_value(v) for v in row) + "\n"
+            self.row_count += 1
+        if size < 0:
+            chunk, self._buffer = self._buffer, ""
+        else:
+            chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+    
+    readline = read
+
+def bulk_load_theatre_rows(cursor, rows) -> Dict[str, float]:
+    """Stream seat inventory rows into theatre_rows with a single COPY FROM STDIN"""
+    stream = CopyRowStream(rows)
+    start = time.perf_counter()
+    cursor.copy_expert("""
+        COPY theatre_rows (theatre_id, row_name, show_date, show_time, show_starts_at,
+                           total_seats, available_seats, price_multiplier)
+        FROM STDIN
+    """, stream, size=CONFIG['COPY_BUFFER_SIZE'])
+    elapsed = time.perf_counter() - start
+    stats = {
+        'rows': stream.row_count,
+        'seconds': elapsed,
+        'rows_per_second': stream.row_count / elapsed if elapsed > 0 else float(stream.row_count)
+    }
+    logger.info(f"Bulk loaded {stats['rows']} theatre rows in {elapsed:.2f}s "
+                f"({stats['rows_per_second']:,.0f} rows/s)")
+    return stats
 
 def recreate_theatre_rows_data(cursor, conn):
     """Recreate theatre rows data with date and movie-specific show times"""
@@ -986,65 +2606,47 @@ def recreate_theatre_rows_data(cursor, conn):
         # Clear existing data
         cursor.execute("DELETE FROM theatre_rows")
         
-        # Get all unique show times from all movies with individual timings
-        all_show_times = set()
-        
-        # Add all movie show times
-        for movie_id in range(1, 41):  # Movies 1-40
-            show_times = get_movie_show_times(movie_id)
-            all_show_times.update(show_times)
-        
-        # Add comedy show times
-        comedy_times = ["6:00 PM", "6:15 PM", "6:30 PM", "6:45 PM", "7:00 PM", "8:30 PM", "8:45 PM", "9:00 PM", "9:15 PM", "9:30 PM"]
-        all_show_times.update(comedy_times)
-        
-        # Add concert times
-        concert_times = ["6:30 PM", "6:45 PM", "7:00 PM", "7:15 PM", "8:00 PM", "9:00 PM", "9:15 PM", "9:30 PM", "9:45 PM", "10:30 PM"]
-        all_show_times.update(concert_times)
-        
-        # Convert to sorted list
-        all_show_times = sorted(list(all_show_times))
-        
         # Get next 3 days for booking
         available_dates = get_next_few_days(3)
+        scheduled_shows = get_scheduled_movie_shows(cursor, [date_info['date'] for date_info in available_dates])
         
-        st.info(f"Creating seat data for {len(all_show_times)} show times across {len(available_dates)} dates...")
-        
-        for theatre_id in range(1, 57):  # 56 theatres total
-            if theatre_id <= 7:  # Theatres 1-7 (120 seats)
-                rows = [("A", 30, 1.5), ("B", 35, 1.2), ("C", 30, 1.0), ("D", 15, 0.8), ("E", 10, 0.7)]
-            elif theatre_id <= 14:  # Theatres 8-14 (90 seats)
-                rows = [("A", 25, 1.5), ("B", 30, 1.2), ("C", 20, 1.0), ("D", 15, 0.8)]
-            elif theatre_id <= 21:  # Theatres 15-21 (105 seats)
-                rows = [("A", 30, 1.5), ("B", 35, 1.2), ("C", 25, 1.0), ("D", 15, 0.8)]
-            elif theatre_id <= 28:  # Theatres 22-28 (75 seats)
-                rows = [("A", 20, 1.5), ("B", 25, 1.2), ("C", 20, 1.0), ("D", 10, 0.8)]
-            elif theatre_id <= 35:  # Theatres 29-35 (60 seats)
-                rows = [("A", 20, 1.5), ("B", 25, 1.2), ("C", 15, 1.0)]
-            elif theatre_id <= 42:  # Theatres 36-42 (85 seats)
-                rows = [("A", 25, 1.5), ("B", 30, 1.2), ("C", 20, 1.0), ("D", 10, 0.8)]
-            elif theatre_id <= 49:  # Theatres 43-49 (70 seats)
-                rows = [("A", 20, 1.5), ("B", 25, 1.2), ("C", 15, 1.0), ("D", 10, 0.8)]
-            else:  # Theatres 50-56 (70 seats)
-                rows = [("A", 20, 1.5), ("B", 25, 1.2), ("C", 15, 1.0), ("D", 10, 0.8)]
-            
-            # Create rows for each date and show time combination
-            for date_info in available_dates:
-                show_date = date_info['date']
-                for show_time in all_show_times:
-                    for row_name, seats_in_row, price_mult in rows:
-                        cursor.execute("""
-                            INSERT INTO theatre_rows 
-                            (theatre_id, row_name, show_date, show_time, total_seats, available_seats, price_multiplier)
-                            VALUES (%s, %s, %s, %s, %s, %s, %s)
-                        """, (theatre_id, row_name, show_date, show_time, seats_in_row, seats_in_row, price_mult))
+        st.info(f"Creating seat data for {len(scheduled_shows)} scheduled shows across {len(available_dates)} dates...")
+        
+        # Create rows for each scheduled theatre, date and show time in one COPY
+        stats = bulk_load_theatre_rows(cursor, generate_theatre_rows(scheduled_shows))
         
         conn.commit()
-        st.success(f"✅ Created seat data for {len(all_show_times)} show times across {len(available_dates)} dates for all theatres!")
+        st.success(f"✅ Created seat data for {len(scheduled_shows)} scheduled shows across {len(available_dates)} dates! "
+                   f"({stats['rows']:,} rows at {stats['rows_per_second']:,.0f} rows/s)")
     except Exception as e:
         st.error(f"❌ Error recreating theatre rows data: {e}")
         conn.rollback()
 
+def upsert_seat_inventory(cursor, start_date, days=1, theatre_ids=None, show_times=None) -> int:
+    """Create any missing theatre_rows for scheduled movie shows in a date horizon in one set-based statement"""
+    theatre_ids = list(theatre_ids) if theatre_ids else list(range(1, 57))
+    show_times = list(show_times) if show_times else None
+    layout = [(theatre_id,) + row for theatre_id in theatre_ids
+              for row in get_theatre_seat_layout(theatre_id)]
+    layout_ids, row_names, seats, multipliers = (list(column) for column in zip(*layout))
+    
+    cursor.execute("""
+        INSERT INTO theatre_rows
+        (theatre_id, row_name, show_date, show_time, show_starts_at, total_seats, available_seats, price_multiplier)
+        SELECT l.theatre_id, l.row_name, s.show_date, s.show_time, s.show_date + s.start_time,
+               l.seats, l.seats, l.price_multiplier
+        FROM unnest(%s::int[], %s::varchar[], %s::int[], %s::numeric[])
+             AS l(theatre_id, row_name, seats, price_multiplier)
+        JOIN (
+            SELECT DISTINCT venue_id, show_date, show_time, start_time FROM schedules
+            WHERE event_type = 'movie' AND show_date BETWEEN %s::date AND %s::date + %s
+              AND (%s::varchar[] IS NULL OR show_time = ANY(%s))
+        ) s ON s.venue_id = l.theatre_id
+        ON CONFLICT (theatre_id, row_name, show_date, show_time) DO NOTHING
+    """, (layout_ids, row_names, seats, multipliers,
+          start_date, start_date, days - 1, show_times, show_times))
+    return cursor.rowcount
+
 def ensure_all_tables_exist(cursor, conn):
     """Ensure all required tables exist"""
     # Check and create missing tables
@@ -1133,6 +2735,7 @@ def ensure_all_tables_exist(cursor, conn):
                 venue_type VARCHAR(50),
                 capacity INTEGER DEFAULT 200,
                 available_capacity INTEGER DEFAULT 200,
+                capacity_shards INTEGER DEFAULT 1,
                 base_price INTEGER DEFAULT 500,
                 address TEXT,
                 facilities TEXT
@@ -1149,6 +2752,7 @@ def ensure_all_tables_exist(cursor, conn):
                 venue_name VARCHAR(100) NOT NULL,
                 show_date DATE NOT NULL,
                 show_time VARCHAR(20) NOT NULL,
+                show_starts_at TIMESTAMP,
                 booked_seats INTEGER NOT NULL,
                 total_amount INTEGER NOT NULL,
                 booking_date TIMESTAMP NOT NULL,
@@ -1161,7 +2765,8 @@ def ensure_all_tables_exist(cursor, conn):
                 gst_amount INTEGER DEFAULT 0,
                 platform_fee INTEGER DEFAULT 0,
                 theatre_share INTEGER DEFAULT 0,
-                profit_amount INTEGER DEFAULT 0
+                profit_amount INTEGER DEFAULT 0,
+                idempotency_key VARCHAR(64)
             )
         """,
         'payment_transactions': """
@@ -1178,6 +2783,122 @@ def ensure_all_tables_exist(cursor, conn):
                 failure_reason TEXT,
                 FOREIGN KEY (booking_id) REFERENCES bookings(booking_id)
             )
+        """,
+        'movie_theatre_assignments': """
+            CREATE TABLE IF NOT EXISTS movie_theatre_assignments (
+                area VARCHAR(100) NOT NULL,
+                movie_id INTEGER NOT NULL,
+                slot INTEGER NOT NULL,
+                theatre_id INTEGER NOT NULL,
+                PRIMARY KEY (area, movie_id, slot),
+                FOREIGN KEY (movie_id) REFERENCES movies(id),
+                FOREIGN KEY (theatre_id) REFERENCES theatres(theater_id)
+            )
+        """,
+        'schedules': """
+            CREATE TABLE IF NOT EXISTS schedules (
+                schedule_id SERIAL PRIMARY KEY,
+                event_type VARCHAR(20) NOT NULL,
+                event_id INTEGER NOT NULL,
+                venue_id INTEGER NOT NULL,
+                show_date DATE NOT NULL,
+                start_time TIME NOT NULL,
+                show_time VARCHAR(20) NOT NULL,
+                UNIQUE (event_type, event_id, venue_id, show_date, start_time)
+            );
+            CREATE INDEX IF NOT EXISTS idx_schedules_venue_date ON schedules (venue_id, show_date)
+        """,
+        'show_capacity': """
+            CREATE TABLE IF NOT EXISTS show_capacity (
+                venue_id INTEGER NOT NULL,
+                event_type VARCHAR(20) NOT NULL,
+                show_id INTEGER NOT NULL,
+                show_date DATE NOT NULL,
+                show_time VARCHAR(20) NOT NULL,
+                capacity INTEGER NOT NULL,
+                available_capacity INTEGER NOT NULL,
+                PRIMARY KEY (venue_id, event_type, show_id, show_date, show_time),
+                FOREIGN KEY (venue_id) REFERENCES venues(venue_id)
+            )
+        """,
+        'show_capacity_shards': """
+            CREATE TABLE IF NOT EXISTS show_capacity_shards (
+                venue_id INTEGER NOT NULL,
+                event_type VARCHAR(20) NOT NULL,
+                show_id INTEGER NOT NULL,
+                show_date DATE NOT NULL,
+                show_time VARCHAR(20) NOT NULL,
+                shard_no INTEGER NOT NULL,
+                available_capacity INTEGER NOT NULL,
+                PRIMARY KEY (venue_id, event_type, show_id, show_date, show_time, shard_no),
+                FOREIGN KEY (venue_id, event_type, show_id, show_date, show_time)
+                    REFERENCES show_capacity(venue_id, event_type, show_id, show_date, show_time) ON DELETE CASCADE
+            )
+        """,
+        'show_availability': """
+            CREATE OR REPLACE VIEW show_availability AS
+            SELECT sc.venue_id, sc.event_type, sc.show_id, sc.show_date, sc.show_time, sc.capacity,
+                   COALESCE(sh.available_capacity, sc.available_capacity) AS available_capacity
+            FROM show_capacity sc
+            LEFT JOIN (
+                SELECT venue_id, event_type, show_id, show_date, show_time,
+                       SUM(available_capacity)::int AS available_capacity
+                FROM show_capacity_shards
+                GROUP BY venue_id, event_type, show_id, show_date, show_time
+            ) sh USING (venue_id, event_type, show_id, show_date, show_time)
+        """,
+        'catalog_meta': """
+            CREATE TABLE IF NOT EXISTS catalog_meta (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version BIGINT NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            INSERT INTO catalog_meta (id, version)
+            VALUES (1, (EXTRACT(EPOCH FROM clock_timestamp()) * 1000)::BIGINT)
+            ON CONFLICT DO NOTHING
+        """,
+        'outbox': """
+            CREATE TABLE IF NOT EXISTS outbox (
+                outbox_id BIGSERIAL PRIMARY KEY,
+                booking_id INTEGER NOT NULL,
+                topic VARCHAR(30) NOT NULL,
+                payload JSONB NOT NULL,
+                created_at TIMESTAMP NOT NULL DEFAULT LOCALTIMESTAMP,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at TIMESTAMP NOT NULL DEFAULT LOCALTIMESTAMP,
+                last_error TEXT,
+                dead BOOLEAN NOT NULL DEFAULT FALSE
+            );
+            CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox (booking_id, outbox_id) WHERE NOT dead
+        """,
+        'booking_daily_rollup': """
+            CREATE TABLE IF NOT EXISTS booking_daily_rollup (
+                day DATE NOT NULL,
+                event_type VARCHAR(20) NOT NULL,
+                venue_id INTEGER NOT NULL,
+                area VARCHAR(100) NOT NULL,
+                bookings INTEGER NOT NULL DEFAULT 0,
+                tickets INTEGER NOT NULL DEFAULT 0,
+                revenue BIGINT NOT NULL DEFAULT 0,
+                base_amount BIGINT NOT NULL DEFAULT 0,
+                gst_amount BIGINT NOT NULL DEFAULT 0,
+                platform_fee BIGINT NOT NULL DEFAULT 0,
+                theatre_share BIGINT NOT NULL DEFAULT 0,
+                profit_amount BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, event_type, venue_id, area)
+            )
+        """,
+        'seat_holds': """
+            CREATE TABLE IF NOT EXISTS seat_holds (
+                session_id VARCHAR(64) NOT NULL,
+                theatre_id INTEGER NOT NULL,
+                show_date DATE NOT NULL,
+                show_time VARCHAR(20) NOT NULL,
+                row_name VARCHAR(5) NOT NULL,
+                seats INTEGER NOT NULL,
+                expires_at TIMESTAMP NOT NULL,
+                PRIMARY KEY (session_id, theatre_id, show_date, show_time, row_name)
+            )
         """
     }
     
@@ -1190,6 +2911,14 @@ def create_all_tables(cursor, conn):
     """Create all tables with correct structure"""
     # Drop all tables first
     drop_tables = [
+        "DROP TABLE IF EXISTS catalog_meta CASCADE",
+        "DROP TABLE IF EXISTS seat_holds CASCADE",
+        "DROP TABLE IF EXISTS outbox CASCADE",
+        "DROP TABLE IF EXISTS booking_daily_rollup CASCADE",
+        "DROP TABLE IF EXISTS schedules CASCADE",
+        "DROP TABLE IF EXISTS movie_theatre_assignments CASCADE",
+        "DROP TABLE IF EXISTS show_capacity_shards CASCADE",
+        "DROP TABLE IF EXISTS show_capacity CASCADE",
         "DROP TABLE IF EXISTS payment_transactions CASCADE",
         "DROP TABLE IF EXISTS bookings CASCADE",
         "DROP TABLE IF EXISTS theatre_rows CASCADE",
@@ -1298,6 +3027,7 @@ def create_all_tables(cursor, conn):
             venue_type VARCHAR(50),
             capacity INTEGER DEFAULT 200,
             available_capacity INTEGER DEFAULT 200,
+            capacity_shards INTEGER DEFAULT 1,
             base_price INTEGER DEFAULT 500,
             address TEXT,
             facilities TEXT
@@ -1311,9 +3041,11 @@ def create_all_tables(cursor, conn):
             row_name VARCHAR(5) NOT NULL,
             show_date DATE NOT NULL,
             show_time VARCHAR(20) NOT NULL,
+            show_starts_at TIMESTAMP NOT NULL,
             total_seats INTEGER NOT NULL,
             available_seats INTEGER NOT NULL,
             price_multiplier DECIMAL(3,2) DEFAULT 1.0,
+            seat_map BYTEA,
             FOREIGN KEY (theatre_id) REFERENCES theatres(theater_id),
             UNIQUE (theatre_id, row_name, show_date, show_time)
         )
@@ -1330,6 +3062,7 @@ def create_all_tables(cursor, conn):
             venue_name VARCHAR(100) NOT NULL,
             show_date DATE NOT NULL,
             show_time VARCHAR(20) NOT NULL,
+            show_starts_at TIMESTAMP,
             booked_seats INTEGER NOT NULL,
             total_amount INTEGER NOT NULL,
             booking_date TIMESTAMP NOT NULL,
@@ -1360,12 +3093,138 @@ def create_all_tables(cursor, conn):
             failure_reason TEXT,
             FOREIGN KEY (booking_id) REFERENCES bookings(booking_id)
         )
+        """,
+        # Precomputed movie -> theatre assignments per area
+        """
+        CREATE TABLE movie_theatre_assignments (
+            area VARCHAR(100) NOT NULL,
+            movie_id INTEGER NOT NULL,
+            slot INTEGER NOT NULL,
+            theatre_id INTEGER NOT NULL,
+            PRIMARY KEY (area, movie_id, slot),
+            FOREIGN KEY (movie_id) REFERENCES movies(id),
+            FOREIGN KEY (theatre_id) REFERENCES theatres(theater_id)
+        )
+        """,
+        # Show schedule: one row per event, venue (theatre_id for movies), date and start time
+        """
+        CREATE TABLE schedules (
+            schedule_id SERIAL PRIMARY KEY,
+            event_type VARCHAR(20) NOT NULL,
+            event_id INTEGER NOT NULL,
+            venue_id INTEGER NOT NULL,
+            show_date DATE NOT NULL,
+            start_time TIME NOT NULL,
+            show_time VARCHAR(20) NOT NULL,
+            UNIQUE (event_type, event_id, venue_id, show_date, start_time)
+        );
+        CREATE INDEX IF NOT EXISTS idx_schedules_venue_date ON schedules (venue_id, show_date)
+        """,
+        # Per-show capacity for comedy shows and concerts
+        """
+        CREATE TABLE show_capacity (
+            venue_id INTEGER NOT NULL,
+            event_type VARCHAR(20) NOT NULL,
+            show_id INTEGER NOT NULL,
+            show_date DATE NOT NULL,
+            show_time VARCHAR(20) NOT NULL,
+            capacity INTEGER NOT NULL,
+            available_capacity INTEGER NOT NULL,
+            PRIMARY KEY (venue_id, event_type, show_id, show_date, show_time),
+            FOREIGN KEY (venue_id) REFERENCES venues(venue_id)
+        )
+        """,
+        # Sharded counters for flash-sale shows (venues with capacity_shards > 1)
+        """
+        CREATE TABLE show_capacity_shards (
+            venue_id INTEGER NOT NULL,
+            event_type VARCHAR(20) NOT NULL,
+            show_id INTEGER NOT NULL,
+            show_date DATE NOT NULL,
+            show_time VARCHAR(20) NOT NULL,
+            shard_no INTEGER NOT NULL,
+            available_capacity INTEGER NOT NULL,
+            PRIMARY KEY (venue_id, event_type, show_id, show_date, show_time, shard_no),
+            FOREIGN KEY (venue_id, event_type, show_id, show_date, show_time)
+                REFERENCES show_capacity(venue_id, event_type, show_id, show_date, show_time) ON DELETE CASCADE
+        )
+        """,
+        # Live per-show availability, summing shards where a show is sharded
+        """
+        CREATE OR REPLACE VIEW show_availability AS
+        SELECT sc.venue_id, sc.event_type, sc.show_id, sc.show_date, sc.show_time, sc.capacity,
+               COALESCE(sh.available_capacity, sc.available_capacity) AS available_capacity
+        FROM show_capacity sc
+        LEFT JOIN (
+            SELECT venue_id, event_type, show_id, show_date, show_time,
+                   SUM(available_capacity)::int AS available_capacity
+            FROM show_capacity_shards
+            GROUP BY venue_id, event_type, show_id, show_date, show_time
+        ) sh USING (venue_id, event_type, show_id, show_date, show_time)
+        """,
+        # Catalog version stamp (the creation time, so a rebuilt database never reuses a version)
+        """
+        CREATE TABLE catalog_meta (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version BIGINT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        INSERT INTO catalog_meta (id, version)
+        VALUES (1, (EXTRACT(EPOCH FROM clock_timestamp()) * 1000)::BIGINT)
+        ON CONFLICT DO NOTHING
+        """,
+        # Transactional outbox: booking side effects queued in the booking's transaction
+        """
+        CREATE TABLE outbox (
+            outbox_id BIGSERIAL PRIMARY KEY,
+            booking_id INTEGER NOT NULL,
+            topic VARCHAR(30) NOT NULL,
+            payload JSONB NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT LOCALTIMESTAMP,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMP NOT NULL DEFAULT LOCALTIMESTAMP,
+            last_error TEXT,
+            dead BOOLEAN NOT NULL DEFAULT FALSE
+        );
+        CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox (booking_id, outbox_id) WHERE NOT dead
+        """,
+        # Daily booking totals per event type, venue and area for the admin dashboards
+        """
+        CREATE TABLE booking_daily_rollup (
+            day DATE NOT NULL,
+            event_type VARCHAR(20) NOT NULL,
+            venue_id INTEGER NOT NULL,
+            area VARCHAR(100) NOT NULL,
+            bookings INTEGER NOT NULL DEFAULT 0,
+            tickets INTEGER NOT NULL DEFAULT 0,
+            revenue BIGINT NOT NULL DEFAULT 0,
+            base_amount BIGINT NOT NULL DEFAULT 0,
+            gst_amount BIGINT NOT NULL DEFAULT 0,
+            platform_fee BIGINT NOT NULL DEFAULT 0,
+            theatre_share BIGINT NOT NULL DEFAULT 0,
+            profit_amount BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, event_type, venue_id, area)
+        )
+        """,
+        # Seat holds table (cart locks between seat selection and payment)
+        """
+        CREATE TABLE seat_holds (
+            session_id VARCHAR(64) NOT NULL,
+            theatre_id INTEGER NOT NULL,
+            show_date DATE NOT NULL,
+            show_time VARCHAR(20) NOT NULL,
+            row_name VARCHAR(5) NOT NULL,
+            seats INTEGER NOT NULL,
+            expires_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (session_id, theatre_id, show_date, show_time, row_name)
+        )
         """
     ]
     
     for table_sql in tables:
         cursor.execute(table_sql)
     
+    apply_schema_migrations(cursor)
     conn.commit()
 def insert_all_sample_data(cursor, conn):
     """Insert all sample data"""
@@ -1564,58 +3423,14 @@ def insert_all_sample_data(cursor, conn):
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
             """, concert)
         
-        # Insert theatre rows with date and movie-specific show times
-        # Get all unique show times from all movies with individual timings
-        all_show_times = set()
-        
-        # Add all movie show times
-        for movie_id in range(1, 41):  # Movies 1-40
-            show_times = get_movie_show_times(movie_id)
-            all_show_times.update(show_times)
+        build_movie_theatre_assignments(cursor)
         
-        # Add comedy show times
-        comedy_times = ["6:00 PM", "6:15 PM", "6:30 PM", "6:45 PM", "7:00 PM", "8:30 PM", "8:45 PM", "9:00 PM", "9:15 PM", "9:30 PM"]
-        all_show_times.update(comedy_times)
-        
-        # Add concert times
-        concert_times = ["6:30 PM", "6:45 PM", "7:00 PM", "7:15 PM", "8:00 PM", "9:00 PM", "9:15 PM", "9:30 PM", "9:45 PM", "10:30 PM"]
-        all_show_times.update(concert_times)
-        
-        # Convert to sorted list
-        all_show_times = sorted(list(all_show_times))
-        
-        # Get next 3 days for booking
-        available_dates = get_next_few_days(3)
-        
-        for theatre_id in range(1, 57):  # 56 theatres total
-            if theatre_id <= 7:  # Theatres 1-7 (120 seats)
-                rows = [("A", 30, 1.5), ("B", 35, 1.2), ("C", 30, 1.0), ("D", 15, 0.8), ("E", 10, 0.7)]
-            elif theatre_id <= 14:  # Theatres 8-14 (90 seats)
-                rows = [("A", 25, 1.5), ("B", 30, 1.2), ("C", 20, 1.0), ("D", 15, 0.8)]
-            elif theatre_id <= 21:  # Theatres 15-21 (105 seats)
-                rows = [("A", 30, 1.5), ("B", 35, 1.2), ("C", 25, 1.0), ("D", 15, 0.8)]
-            elif theatre_id <= 28:  # Theatres 22-28 (75 seats)
-                rows = [("A", 20, 1.5), ("B", 25, 1.2), ("C", 20, 1.0), ("D", 10, 0.8)]
-            elif theatre_id <= 35:  # Theatres 29-35 (60 seats)
-                rows = [("A", 20, 1.5), ("B", 25, 1.2), ("C", 15, 1.0)]
-            elif theatre_id <= 42:  # Theatres 36-42 (85 seats)
-                rows = [("A", 25, 1.5), ("B", 30, 1.2), ("C", 20, 1.0), ("D", 10, 0.8)]
-            elif theatre_id <= 49:  # Theatres 43-49 (70 seats)
-                rows = [("A", 20, 1.5), ("B", 25, 1.2), ("C", 15, 1.0), ("D", 10, 0.8)]
-            else:  # Theatres 50-56 (70 seats)
-                rows = [("A", 20, 1.5), ("B", 25, 1.2), ("C", 15, 1.0), ("D", 10, 0.8)]
-            
-            # Create rows for each date and show time combination
-            for date_info in available_dates:
-                show_date = date_info['date']
-                for show_time in all_show_times:
-                    for row_name, seats_in_row, price_mult in rows:
-                        cursor.execute("""
-                            INSERT INTO theatre_rows 
-                            (theatre_id, row_name, show_date, show_time, total_seats, available_seats, price_multiplier)
-                            VALUES (%s, %s, %s, %s, %s, %s, %s)
-                        """, (theatre_id, row_name, show_date, show_time, seats_in_row, seats_in_row, price_mult))
+        # Schedule every show for the booking window, then create seat rows for the scheduled movie shows
+        show_dates = [date_info['date'] for date_info in get_next_few_days(3)]
+        seed_schedules(cursor, show_dates)
+        bulk_load_theatre_rows(cursor, generate_theatre_rows(get_scheduled_movie_shows(cursor, show_dates)))
         
+        bump_catalog_version(cursor)
         conn.commit()
     except psycopg2.Error as e:
         st.error(f"❌ Error inserting sample data: {e}")
@@ -1640,8 +3455,12 @@ def generate_otp():
     return UtilityModule.generate_otp()  # 🔥 USING MODULE
 
 def generate_transaction_id():
-    """Generate unique transaction ID"""
-    return f"TXN{int(time.time())}{random.randint(1000, 9999)}"
+    """Generate unique transaction ID - zero-padded so text order matches ID order"""
+    return f"TXN{get_leased_id_generator().next_id():019d}"
+
+def generate_idempotency_key() -> str:
+    """Token minted once per cart; every submission of that cart carries it"""
+    return uuid.uuid4().hex
 
 def validate_upi_id(upi_id):
     """Validate UPI ID format"""
@@ -1701,50 +3520,6 @@ def process_payment_details(payment_method, payment_data):
         return True, f"Net Banking: {payment_data['bank_name']}"
     return False, "Invalid payment method"
 
-def write_ticket_to_file(event_type, booking_details):
-    """Write ticket details to appropriate text file"""
-    try:
-        # Determine filename based on event type
-        if event_type == "movie":
-            filename = "movies.txt"
-        elif event_type == "comedy":
-            filename = "comedy.txt"
-        elif event_type == "concert":
-            filename = "concerts.txt"
-        else:
-            filename = "other_bookings.txt"
-        
-        # Create ticket information string
-        ticket_info = f"""
-{'='*60}
-SMARTSHOW ULTIMATE - TICKET CONFIRMATION
-{'='*60}
-Booking ID: {booking_details['booking_id']}
-Transaction ID: {booking_details['transaction_id']}
-Event Type: {booking_details['event_type'].upper()}
-Event Name: {booking_details['event_name']}
-Venue: {booking_details['venue_name']}
-User Email: {booking_details['user_email']}
-Show Date: {booking_details['show_date']}
-Show Time: {booking_details['show_time']}
-Tickets Booked: {booking_details['booked_seats']}
-Seat Numbers: {booking_details['seat_numbers']}
-Total Amount: ₹{booking_details['total_amount']}
-Payment Method: {booking_details['payment_method']}
-Payment Status: {booking_details['payment_status']}
-Booking Date: {booking_details['booking_date']}
-{'='*60}
-
-"""
-        
-        # Write to file (append mode)
-        with open(filename, 'a', encoding='utf-8') as file:
-            file.write(ticket_info)
-        
-        return True
-    except Exception as e:
-        st.error(f"❌ Error writing to file: {e}")
-        return False
 # Enhanced Payment Processing Functions
 
 def show_complete_payment_form(payment_method, total_amount, event_type, back_step):
@@ -1853,31 +3628,432 @@ def calculate_profit_breakdown(total_amount):
     # Base amount (before GST)
     base_amount = int(total_amount / 1.18)  # Remove 18% GST
     
-    # GST (18%)
-    gst_amount = total_amount - base_amount
+    # GST (18%)
+    gst_amount = total_amount - base_amount
+    
+    # Platform fee (10% of base amount)
+    platform_fee = int(base_amount * 0.10)
+    
+    # Theatre share (60% of base amount)
+    theatre_share = int(base_amount * 0.60)
+    
+    # Our profit (30% of base amount)
+    profit_amount = base_amount - platform_fee - theatre_share
+    
+    return {
+        'base_amount': base_amount,
+        'gst_amount': gst_amount,
+        'platform_fee': platform_fee,
+        'theatre_share': theatre_share,
+        'profit_amount': profit_amount
+    }
+
+def get_show_capacity(cursor, event_type, venue_id, show_id, show_date, show_time) -> Dict[str, int]:
+    """Capacity of one comedy/concert show; shows nobody has booked yet have the full venue"""
+    cursor.execute("""
+        SELECT v.capacity AS capacity, COALESCE(sc.available_capacity, v.capacity) AS available_capacity
+        FROM venues v
+        LEFT JOIN show_availability sc
+          ON sc.venue_id = v.venue_id AND sc.event_type = %s AND sc.show_id = %s
+         AND sc.show_date = %s AND sc.show_time = %s
+        WHERE v.venue_id = %s
+    """, (event_type, show_id, show_date, show_time, venue_id))
+    return cursor.fetchone() or {'capacity': 0, 'available_capacity': 0}
+
+# 🔥 AVAILABILITY CACHE - Seat maps and show capacities shared by sessions, evicted over LISTEN/NOTIFY
+@memoize(maxsize=CONFIG['AVAILABILITY_CACHE_SIZE'], ttl=CONFIG['AVAILABILITY_CACHE_TTL_SECONDS'], with_cursor=True)
+def get_cached_show_capacity(cursor, event_type: str, venue_id: int, show_id: int, show_date: str,
+                             show_time: str) -> Dict[str, int]:
+    """Cached get_show_capacity for display; bookings still check the live row"""
+    return dict(get_show_capacity(cursor, event_type, venue_id, show_id, show_date, show_time))
+
+@memoize(maxsize=CONFIG['AVAILABILITY_CACHE_SIZE'], ttl=CONFIG['AVAILABILITY_CACHE_TTL_SECONDS'], with_cursor=True)
+def get_seat_map(cursor, theatre_id: int, show_date: str, show_time: str) -> Tuple[Dict, ...]:
+    """Cached theatre_rows of one movie show, in row order"""
+    cursor.execute("""
+        SELECT row_name, total_seats, available_seats, price_multiplier
+        FROM theatre_rows
+        WHERE theatre_id = %s AND show_starts_at = %s::date + %s::time
+        ORDER BY row_name
+    """, (theatre_id, show_date, show_time))
+    return tuple(dict(row) for row in cursor.fetchall())
+
+def clear_availability_caches() -> None:
+    """Drop every cached seat map and show capacity in this process"""
+    get_seat_map.cache_clear()
+    get_cached_show_capacity.cache_clear()
+
+def apply_availability_change(change: Dict) -> None:
+    """Evict the cache entry a published change refers to; anything else clears both caches"""
+    if change.get('kind') == 'seats':
+        get_seat_map.invalidate(change['theatre_id'], change['show_date'], change['show_time'])
+    elif change.get('kind') == 'capacity':
+        get_cached_show_capacity.invalidate(change['event_type'], change['venue_id'], change['show_id'],
+                                            change['show_date'], change['show_time'])
+    else:
+        clear_availability_caches()
+
+def publish_availability_change(cursor, kind: str, **key) -> None:
+    """Tell every app process that availability changed; delivered when the caller commits
+    
+    kind is 'seats' (theatre_id, show_date, show_time), 'capacity' (event_type, venue_id,
+    show_id, show_date, show_time) or 'reset'. This process evicts as soon as the commit
+    returns rather than waiting for its listener; evicting any earlier would let a concurrent
+    reader re-cache the pre-commit rows.
+    """
+    change = {'kind': kind, **{name: str(value) if name in ('show_date', 'show_time') else value
+                               for name, value in key.items()}}
+    cursor.connection.after_commit(lambda: apply_availability_change(change))
+    cursor.execute("SELECT pg_notify(%s, %s)", (CONFIG['AVAILABILITY_CHANNEL'], json.dumps(change)))
+
+def get_venue_show_availability(cursor, event_type, show_id, venues, show_dates) -> None:
+    """Fill in available_capacity on each venue as seats left across its scheduled shows, in one query
+    
+    Adds show_count and total_show_capacity (capacity stays the per-show venue capacity)
+    and re-sorts the list most-available first.
+    """
+    cursor.execute("""
+        SELECT s.venue_id, COUNT(*) AS show_count,
+               COALESCE(SUM(sa.capacity - sa.available_capacity), 0) AS booked
+        FROM schedules s
+        LEFT JOIN show_availability sa
+          ON sa.venue_id = s.venue_id AND sa.event_type = s.event_type AND sa.show_id = s.event_id
+         AND sa.show_date = s.show_date AND sa.show_time = s.show_time
+        WHERE s.event_type = %s AND s.event_id = %s AND s.venue_id = ANY(%s) AND s.show_date = ANY(%s)
+        GROUP BY s.venue_id
+    """, (event_type, show_id, [venue['venue_id'] for venue in venues], list(show_dates)))
+    scheduled = {row['venue_id']: row for row in cursor.fetchall()}
+    
+    for venue in venues:
+        shows = scheduled.get(venue['venue_id'], {'show_count': 0, 'booked': 0})
+        venue['show_count'] = shows['show_count']
+        venue['total_show_capacity'] = venue['capacity'] * shows['show_count']
+        venue['available_capacity'] = venue['total_show_capacity'] - int(shows['booked'])
+    venues.sort(key=lambda venue: (-venue['available_capacity'], venue['name']))
+
+def reserve_show_capacity(cursor, event_type, venue_id, show_id, show_date, show_time, seats) -> bool:
+    """Decrement one show's capacity, creating its row on first booking; False if not enough left
+    
+    Shows at venues with capacity_shards > 1 keep their capacity in that many shard rows,
+    so concurrent buyers lock different rows instead of queueing on one.
+    """
+    key = (venue_id, event_type, show_id, show_date, show_time)
+    
+    # First booking creates the show row and, for sharded venues, its shards (capacity split evenly)
+    cursor.execute("""
+        WITH created AS (
+            INSERT INTO show_capacity (venue_id, event_type, show_id, show_date, show_time, capacity, available_capacity)
+            SELECT venue_id, %s, %s, %s, %s, capacity, capacity FROM venues WHERE venue_id = %s
+            ON CONFLICT DO NOTHING
+            RETURNING venue_id, event_type, show_id, show_date, show_time, capacity
+        )
+        INSERT INTO show_capacity_shards (venue_id, event_type, show_id, show_date, show_time, shard_no, available_capacity)
+        SELECT c.venue_id, c.event_type, c.show_id, c.show_date, c.show_time, g,
+               c.capacity / v.capacity_shards + CASE WHEN g < c.capacity %% v.capacity_shards THEN 1 ELSE 0 END
+        FROM created c
+        JOIN venues v ON v.venue_id = c.venue_id
+        CROSS JOIN generate_series(0, v.capacity_shards - 1) AS g
+        WHERE v.capacity_shards > 1
+    """, (event_type, show_id, show_date, show_time, venue_id))
+    sharded = cursor.rowcount > 0
+    
+    if not sharded:
+        # The show row may have been created (or re-split) by another transaction, which the
+        # statement above only waited for - its snapshot predates that commit. Key-share lock the
+        # row (buyers don't block each other; set_venue_capacity_shards' FOR UPDATE waits for us),
+        # then look for shards in a fresh statement that sees the committed state
+        cursor.execute("""
+            SELECT 1 FROM show_capacity
+            WHERE venue_id = %s AND event_type = %s AND show_id = %s AND show_date = %s AND show_time = %s
+            FOR KEY SHARE
+        """, key)
+        if not cursor.fetchone():
+            return False
+        cursor.execute("""
+            SELECT EXISTS (
+                SELECT 1 FROM show_capacity_shards
+                WHERE venue_id = %s AND event_type = %s AND show_id = %s AND show_date = %s AND show_time = %s
+            ) AS sharded
+        """, key)
+        sharded = cursor.fetchone()['sharded']
+    
+    if not sharded:
+        # Single counter row
+        cursor.execute("""
+            UPDATE show_capacity
+            SET available_capacity = available_capacity - %s
+            WHERE venue_id = %s AND event_type = %s AND show_id = %s AND show_date = %s AND show_time = %s
+              AND available_capacity >= %s
+        """, (seats,) + key + (seats,))
+        return cursor.rowcount == 1
+    
+    # Shard attempts can leave rows locked even when they fail (a row whose recheck fails after
+    # waiting stays locked), so they run in a savepoint that is rolled back before the ordered
+    # lock-all below - otherwise two buyers could deadlock
+    cursor.execute("SAVEPOINT shard_attempt")
+    
+    # Random shard with enough seats, skipping shards other buyers hold right now
+    cursor.execute("""
+        SELECT shard_no FROM show_capacity_shards
+        WHERE venue_id = %s AND event_type = %s AND show_id = %s AND show_date = %s AND show_time = %s
+          AND available_capacity >= %s
+        ORDER BY random()
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    """, key + (seats,))
+    shard = cursor.fetchone()
+    if shard:
+        cursor.execute("""
+            UPDATE show_capacity_shards SET available_capacity = available_capacity - %s
+            WHERE venue_id = %s AND event_type = %s AND show_id = %s AND show_date = %s AND show_time = %s
+              AND shard_no = %s
+        """, (seats,) + key + (shard['shard_no'],))
+        cursor.execute("RELEASE SAVEPOINT shard_attempt")
+        return True
+    
+    # All suitable shards are busy: wait on one random shard rather than on all of them
+    cursor.execute("""
+        WITH target AS (
+            SELECT shard_no FROM show_capacity_shards
+            WHERE venue_id = %s AND event_type = %s AND show_id = %s AND show_date = %s AND show_time = %s
+              AND available_capacity >= %s
+            ORDER BY random()
+            LIMIT 1
+        )
+        UPDATE show_capacity_shards s SET available_capacity = s.available_capacity - %s
+        FROM target
+        WHERE s.venue_id = %s AND s.event_type = %s AND s.show_id = %s AND s.show_date = %s AND s.show_time = %s
+          AND s.shard_no = target.shard_no AND s.available_capacity >= %s
+    """, key + (seats, seats) + key + (seats,))
+    if cursor.rowcount == 1:
+        cursor.execute("RELEASE SAVEPOINT shard_attempt")
+        return True
+    cursor.execute("ROLLBACK TO SAVEPOINT shard_attempt")
+    
+    # No single shard can cover the request: lock them all and rebalance
+    cursor.execute("""
+        SELECT shard_no, available_capacity FROM show_capacity_shards
+        WHERE venue_id = %s AND event_type = %s AND show_id = %s AND show_date = %s AND show_time = %s
+        ORDER BY shard_no
+        FOR UPDATE
+    """, key)
+    return rebalance_capacity_shards(cursor, key, cursor.fetchall(), seats)
+
+def rebalance_capacity_shards(cursor, key, shards, seats=0) -> bool:
+    """Take `seats` from the locked shards' combined pool and spread what is left evenly
+    
+    Keeps a sold-down show bookable while any shard still has seats; False if the pool is too small.
+    """
+    remaining = sum(shard['available_capacity'] for shard in shards) - seats
+    if not shards or remaining < 0:
+        return False
+    count = len(shards)
+    cursor.execute("""
+        UPDATE show_capacity_shards s
+        SET available_capacity = u.available_capacity
+        FROM unnest(%s::int[], %s::int[]) AS u(shard_no, available_capacity)
+        WHERE s.venue_id = %s AND s.event_type = %s AND s.show_id = %s AND s.show_date = %s AND s.show_time = %s
+          AND s.shard_no = u.shard_no
+    """, ([shard['shard_no'] for shard in shards],
+          [remaining // count + (1 if i < remaining % count else 0) for i in range(count)]) + tuple(key))
+    logger.info(f"Rebalanced {count} capacity shards for {key}: {remaining} seats left")
+    return True
+
+def set_venue_capacity_shards(cursor, venue_id, shards) -> int:
+    """Switch a venue between single-row (1) and sharded (>1) show capacity
+    
+    Existing shows at the venue are re-split with their current availability; returns shows converted.
+    """
+    shards = max(int(shards), 1)
+    cursor.execute("UPDATE venues SET capacity_shards = %s WHERE venue_id = %s", (shards, venue_id))
+    bump_catalog_version(cursor)
+    
+    # Freeze each show's live availability into its single counter, then rebuild shards from it
+    cursor.execute("""
+        SELECT sc.event_type, sc.show_id, sc.show_date, sc.show_time
+        FROM show_capacity sc
+        WHERE sc.venue_id = %s
+        ORDER BY sc.event_type, sc.show_id, sc.show_date, sc.show_time
+        FOR UPDATE
+    """, (venue_id,))
+    shows = cursor.fetchall()
+    cursor.execute("""
+        UPDATE show_capacity sc SET available_capacity = sa.available_capacity
+        FROM show_availability sa
+        WHERE sc.venue_id = %s AND sa.venue_id = sc.venue_id AND sa.event_type = sc.event_type
+          AND sa.show_id = sc.show_id AND sa.show_date = sc.show_date AND sa.show_time = sc.show_time
+    """, (venue_id,))
+    cursor.execute("DELETE FROM show_capacity_shards WHERE venue_id = %s", (venue_id,))
+    if shards > 1:
+        cursor.execute("""
+            INSERT INTO show_capacity_shards (venue_id, event_type, show_id, show_date, show_time, shard_no, available_capacity)
+            SELECT sc.venue_id, sc.event_type, sc.show_id, sc.show_date, sc.show_time, g,
+                   sc.available_capacity / %s + CASE WHEN g < sc.available_capacity %% %s THEN 1 ELSE 0 END
+            FROM show_capacity sc
+            CROSS JOIN generate_series(0, %s - 1) AS g
+            WHERE sc.venue_id = %s
+        """, (shards, shards, shards, venue_id))
+    
+    logger.info(f"Venue {venue_id} capacity now in {shards} shard(s); {len(shows)} shows converted")
+    return len(shows)
+
+def get_seat_hold_session_id() -> str:
+    """Stable id for this browser session's seat holds"""
+    if 'seat_hold_session_id' not in st.session_state:
+        st.session_state.seat_hold_session_id = uuid.uuid4().hex
+    return st.session_state.seat_hold_session_id
+
+def get_held_seats(cursor, theatre_id, show_date, show_time, exclude_session_id=None) -> Dict[str, int]:
+    """Seats per row held by other sessions' unexpired carts"""
+    cursor.execute("""
+        SELECT row_name, SUM(seats) AS held
+        FROM seat_holds
+        WHERE theatre_id = %s AND show_date = %s AND show_time = %s
+          AND expires_at > LOCALTIMESTAMP AND session_id IS DISTINCT FROM %s
+        GROUP BY row_name
+    """, (theatre_id, show_date, show_time, exclude_session_id))
+    return {row['row_name']: int(row['held']) for row in cursor.fetchall()}
+
+def place_seat_hold(cursor, session_id, theatre_id, show_date, show_time,
+                    row_quantities: Dict[str, int], ttl_seconds=None) -> Optional[datetime]:
+    """Hold seats for one session until payment; replaces the session's previous hold on this show
+    
+    Returns the hold expiry, or None if other carts and bookings leave too few seats.
+    """
+    requested = {row_name: int(quantity) for row_name, quantity in row_quantities.items() if quantity > 0}
+    ttl_seconds = ttl_seconds or CONFIG['SEAT_HOLD_TTL_SECONDS']
     
-    # Platform fee (10% of base amount)
-    platform_fee = int(base_amount * 0.10)
+    # Same row locks and order as reserve_theatre_seats, so holds and bookings serialise per row
+    cursor.execute("""
+        SELECT row_name, available_seats
+        FROM theatre_rows
+        WHERE theatre_id = %s AND show_starts_at = %s::date + %s::time AND row_name = ANY(%s)
+        ORDER BY row_name
+        FOR UPDATE
+    """, (theatre_id, show_date, show_time, list(requested.keys())))
+    locked_rows = cursor.fetchall()
+    if not requested or len(locked_rows) != len(requested):
+        return None
+    
+    held = get_held_seats(cursor, theatre_id, show_date, show_time, exclude_session_id=session_id)
+    for row in locked_rows:
+        if row['available_seats'] - held.get(row['row_name'], 0) < requested[row['row_name']]:
+            return None
     
-    # Theatre share (60% of base amount)
-    theatre_share = int(base_amount * 0.60)
+    release_seat_holds(cursor, session_id, theatre_id, show_date, show_time)
+    # Expiry uses the database clock, the same one the availability queries compare against
+    cursor.execute("""
+        INSERT INTO seat_holds (session_id, theatre_id, show_date, show_time, row_name, seats, expires_at)
+        SELECT %s, %s, %s, %s, r.row_name, r.seats, LOCALTIMESTAMP + make_interval(secs => %s)
+        FROM unnest(%s::varchar[], %s::int[]) AS r(row_name, seats)
+        RETURNING expires_at
+    """, (session_id, theatre_id, show_date, show_time, ttl_seconds,
+          list(requested.keys()), list(requested.values())))
+    expires_at = cursor.fetchall()[0]['expires_at']
+    
+    logger.info(f"Seat hold {session_id[:8]} on theatre {theatre_id} {show_date} {show_time}: {requested}")
+    return expires_at
+
+def release_seat_holds(cursor, session_id, theatre_id=None, show_date=None, show_time=None) -> int:
+    """Drop a session's holds, optionally only those on one show"""
+    if theatre_id is None:
+        cursor.execute("DELETE FROM seat_holds WHERE session_id = %s", (session_id,))
+    else:
+        cursor.execute("""
+            DELETE FROM seat_holds
+            WHERE session_id = %s AND theatre_id = %s AND show_date = %s AND show_time = %s
+        """, (session_id, theatre_id, show_date, show_time))
+    return cursor.rowcount
+
+def sweep_expired_seat_holds(cursor) -> int:
+    """Delete every expired hold; returns the number of rows released"""
+    cursor.execute("DELETE FROM seat_holds WHERE expires_at <= LOCALTIMESTAMP")
+    if cursor.rowcount:
+        logger.info(f"Released {cursor.rowcount} expired seat holds")
+    return cursor.rowcount
+
+def reserve_theatre_seats(cursor, theatre_id, show_date, show_time, row_quantities: Dict[str, int],
+                          hold_session_id=None) -> Optional[List[str]]:
+    """Atomically assign real seats from several rows of one show - all rows succeed or none change
+    
+    Seats held by other sessions are off limits; the caller's own hold on the show is
+    converted (deleted) once the seats are assigned.
+    Returns the seat labels taken (e.g. ['A12', 'A13', 'C4']) or None if any row is short.
+    """
+    requested = {row_name: int(quantity) for row_name, quantity in row_quantities.items() if quantity > 0}
+    if not requested:
+        return None
+    
+    # Lock the rows in row_name order so concurrent buyers cannot deadlock
+    cursor.execute("""
+        SELECT id, row_name, total_seats, available_seats, seat_map
+        FROM theatre_rows
+        WHERE theatre_id = %s AND show_starts_at = %s::date + %s::time AND row_name = ANY(%s)
+        ORDER BY row_name
+        FOR UPDATE
+    """, (theatre_id, show_date, show_time, list(requested.keys())))
+    locked_rows = cursor.fetchall()
+    if len(locked_rows) != len(requested):
+        return None
+    
+    held = get_held_seats(cursor, theatre_id, show_date, show_time, exclude_session_id=hold_session_id)
+    
+    # Test-and-set on the in-memory bitmaps; nothing is written unless every row fits
+    row_ids, seat_maps, available_counts, seat_numbers = [], [], [], []
+    for row in locked_rows:
+        bitmap = SeatBitmap.from_row(row['total_seats'], row['available_seats'], row['seat_map'])
+        if bitmap.available_count - held.get(row['row_name'], 0) < requested[row['row_name']]:
+            logger.warning(f"Seat reservation blocked by holds on theatre {theatre_id} {show_date} {show_time}")
+            return None
+        seats = bitmap.allocate(requested[row['row_name']])
+        if seats is None:
+            logger.warning(f"Seat reservation rejected for theatre {theatre_id} {show_date} {show_time}: {requested}")
+            return None
+        row_ids.append(row['id'])
+        seat_maps.append(psycopg2.Binary(bitmap.to_bytes()))
+        available_counts.append(bitmap.available_count)
+        seat_numbers.extend(f"{row['row_name']}{seat + 1}" for seat in seats)
     
-    # Our profit (30% of base amount)
-    profit_amount = base_amount - platform_fee - theatre_share
+    cursor.execute("""
+        UPDATE theatre_rows tr
+        SET seat_map = u.seat_map, available_seats = u.available_seats
+        FROM unnest(%s::int[], %s::bytea[], %s::int[]) AS u(id, seat_map, available_seats)
+        WHERE tr.id = u.id
+    """, (row_ids, seat_maps, available_counts))
     
-    return {
-        'base_amount': base_amount,
-        'gst_amount': gst_amount,
-        'platform_fee': platform_fee,
-        'theatre_share': theatre_share,
-        'profit_amount': profit_amount
-    }
+    if hold_session_id:
+        release_seat_holds(cursor, hold_session_id, theatre_id, show_date, show_time)
+    
+    logger.info(f"Reserved seats in theatre {theatre_id} {show_date} {show_time}: {seat_numbers}")
+    return seat_numbers
+
+def find_idempotent_booking(cursor, idempotency_key) -> Optional[Dict]:
+    """Booking already made for a cart token, if any"""
+    cursor.execute("SELECT booking_id, transaction_id FROM bookings WHERE idempotency_key = %s",
+                   (idempotency_key,))
+    return cursor.fetchone()
 
 def process_booking_payment(cursor, conn, user_email, event_type, event_id, event_name, venue_id, venue_name, 
                           show_date, show_time, booked_seats, total_amount, seat_numbers, row_details, 
-                          payment_method, payment_data):
-    """Process booking and payment transaction"""
+                          payment_method, payment_data, row_quantities=None, hold_session_id=None,
+                          idempotency_key=None):
+    """Process booking and payment transaction
+    
+    For movies `row_quantities` maps row name to seat count, e.g. {'A': 2, 'C': 1},
+    and the seat hold owned by `hold_session_id` becomes the booking.
+    A repeat submission with the same `idempotency_key` returns the original booking
+    without charging or touching inventory again.
+    """
     try:
+        if idempotency_key:
+            # Serialise submissions of the same cart, then replay one that already succeeded
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (idempotency_key,))
+            existing = find_idempotent_booking(cursor, idempotency_key)
+            if existing:
+                conn.rollback()
+                logger.info(f"Replayed booking {existing['booking_id']} for idempotency key {idempotency_key}")
+                return True, existing['booking_id'], existing['transaction_id']
+        
         # Generate transaction ID
         transaction_id = generate_transaction_id()
         
@@ -1885,23 +4061,38 @@ def process_booking_payment(cursor, conn, user_email, event_type, event_id, even
         payment_success = random.random() > 0.1
         
         if payment_success:
+            # Assign real movie seats first so the booking records the seats actually taken
+            if event_type == "movie":
+                reserved_seats = reserve_theatre_seats(cursor, venue_id, show_date, show_time,
+                                                       row_quantities or {}, hold_session_id=hold_session_id)
+                if not reserved_seats:
+                    # Rollback if any requested row ran out of seats
+                    conn.rollback()
+                    logger.error(f"Insufficient seats at theatre {venue_id} for {row_quantities}")
+                    return False, None, transaction_id
+                seat_numbers = ', '.join(reserved_seats)
+                publish_availability_change(cursor, 'seats', theatre_id=venue_id,
+                                            show_date=show_date, show_time=show_time)
+            
             # Calculate profit breakdown
             profit_breakdown = calculate_profit_breakdown(total_amount)
+            booked_at = datetime.now()
             
             # Insert booking with profit details
             cursor.execute("""
                 INSERT INTO bookings (user_email, event_type, event_id, event_name, venue_id, venue_name,
-                                    show_date, show_time, booked_seats, total_amount, booking_date,
+                                    show_date, show_time, show_starts_at, booked_seats, total_amount, booking_date,
                                     seat_numbers, row_details, payment_method, payment_status, transaction_id,
-                                    base_amount, gst_amount, platform_fee, theatre_share, profit_amount)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                                    base_amount, gst_amount, platform_fee, theatre_share, profit_amount,
+                                    idempotency_key)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s::date + %s::time, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 RETURNING booking_id
             """, (user_email, event_type, event_id, event_name, venue_id, venue_name,
-                  show_date, show_time, booked_seats, total_amount, datetime.now(),
+                  show_date, show_time, show_date, show_time, booked_seats, total_amount, booked_at,
                   seat_numbers, row_details, payment_method, 'COMPLETED', transaction_id,
                   profit_breakdown['base_amount'], profit_breakdown['gst_amount'], 
                   profit_breakdown['platform_fee'], profit_breakdown['theatre_share'], 
-                  profit_breakdown['profit_amount']))
+                  profit_breakdown['profit_amount'], idempotency_key))
             
             booking_id = cursor.fetchone()['booking_id']
             
@@ -1921,43 +4112,21 @@ def process_booking_payment(cursor, conn, user_email, event_type, event_id, even
                   'SUCCESS', datetime.now(), payment_details.get('card_last_digits'),
                   payment_details.get('upi_id')))
             
-            # Update seat availability for movies
-            if event_type == "movie":
-                # Parse row details to update specific rows
-                for row_info in row_details.split(', '):
-                    if ' x ' in row_info:
-                        row_name = row_info.split(' x ')[0].strip()
-                        seats_booked = int(row_info.split(' x ')[1].split(' seats')[0])
-                        
-                        cursor.execute("""
-                            UPDATE theatre_rows 
-                            SET available_seats = available_seats - %s
-                            WHERE theatre_id = %s AND row_name = %s AND show_date = %s AND show_time = %s
-                        """, (seats_booked, venue_id, row_name, show_date, show_time))
-                        
-                        # Log the seat update
-                        logger.info(f"Updated theatre {venue_id}, row {row_name}: -{seats_booked} seats")
-            else:
-                # Update venue capacity for comedy shows and concerts
-                cursor.execute("""
-                    UPDATE venues 
-                    SET available_capacity = available_capacity - %s
-                    WHERE venue_id = %s AND available_capacity >= %s
-                """, (booked_seats, venue_id, booked_seats))
-                
-                # Check if update was successful
-                if cursor.rowcount == 0:
+            if event_type != "movie":
+                # Update the show's capacity for comedy shows and concerts
+                if not reserve_show_capacity(cursor, event_type, venue_id, event_id, show_date, show_time, booked_seats):
                     # Rollback and return failure if not enough seats
                     conn.rollback()
                     logger.error(f"Insufficient capacity at venue {venue_id} for {booked_seats} seats")
                     return False, None, transaction_id
                 
-                # Log the venue capacity update
-                logger.info(f"Updated venue {venue_id}: -{booked_seats} seats")
-            
-            conn.commit()
+                publish_availability_change(cursor, 'capacity', event_type=event_type, venue_id=venue_id,
+                                            show_id=event_id, show_date=show_date, show_time=show_time)
+                
+                # Log the show capacity update
+                logger.info(f"Updated {event_type} {event_id} at venue {venue_id} {show_date} {show_time}: -{booked_seats} seats")
             
-            # Prepare booking details for file writing
+            # Ticket archive and confirmation run from the outbox once this transaction commits
             booking_details = {
                 'booking_id': booking_id,
                 'transaction_id': transaction_id,
@@ -1972,11 +4141,13 @@ def process_booking_payment(cursor, conn, user_email, event_type, event_id, even
                 'total_amount': total_amount,
                 'payment_method': payment_method,
                 'payment_status': 'COMPLETED',
-                'booking_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                'booking_date': booked_at.strftime('%Y-%m-%d %H:%M:%S')
             }
+            enqueue_outbox(cursor, booking_id, ['ticket', 'notification'], booking_details)
+            enqueue_outbox(cursor, booking_id, ['analytics'], {'booking_id': booking_id})
             
-            # Write to appropriate file
-            write_ticket_to_file(event_type, booking_details)
+            conn.commit()
+            get_outbox_dispatcher().wake()
             
             return True, booking_id, transaction_id
         else:
@@ -1992,6 +4163,14 @@ def process_booking_payment(cursor, conn, user_email, event_type, event_id, even
             conn.commit()
             return False, None, transaction_id
     
+    except psycopg2.errors.UniqueViolation:
+        # Backstop for the unique key: another submission of this cart committed first
+        conn.rollback()
+        existing = find_idempotent_booking(cursor, idempotency_key)
+        if existing:
+            return True, existing['booking_id'], existing['transaction_id']
+        st.error("❌ Booking failed: duplicate submission")
+        return False, None, None
     except Exception as e:
         conn.rollback()
         st.error(f"❌ Booking failed: {e}")
@@ -2151,6 +4330,7 @@ def verify_otp():
                             
                             st.success("✅ Account verified successfully!")
                             st.session_state.logged_in_user = st.session_state.pending_email
+                            load_user_profile(cursor, st.session_state.pending_email)
                             st.session_state.pending_email = None
                             # Clear the stored OTP
                             if 'generated_otp' in st.session_state:
@@ -2198,6 +4378,7 @@ def login_user():
                         else:
                             st.success(f"✅ Welcome back, {user['name']}!")
                             st.session_state.logged_in_user = email
+                            load_user_profile(cursor, email)
                             st.session_state.current_step = "main_menu"
                             st.rerun()
                     else:
@@ -2260,17 +4441,45 @@ def admin_login():
     
     st.info("💡 Default admin credentials: **admin** / **Admin@123**")
 
+# 🔥 SESSION CACHE - User profile loaded once per login
+@dataclass(frozen=True)
+class UserProfile:
+    """Logged-in user's profile, kept in session state between reruns"""
+    email: str
+    name: str
+    area: str
+
+def load_user_profile(cursor, email) -> Optional[UserProfile]:
+    """Read a user's profile from the database and cache it in the session"""
+    cursor.execute("SELECT email, name, area FROM users WHERE email = %s", (email,))
+    row = cursor.fetchone()
+    st.session_state.user_profile = UserProfile(**row) if row else None
+    return st.session_state.user_profile
+
+def get_user_profile() -> Optional[UserProfile]:
+    """The session's cached profile; loaded on first use after login or invalidation"""
+    profile = st.session_state.get('user_profile')
+    if profile is None or profile.email != st.session_state.logged_in_user:
+        profile = load_user_profile(st.session_state.cursor, st.session_state.logged_in_user)
+    return profile
+
+def invalidate_user_profile() -> None:
+    """Drop the cached profile; call whenever the user's row changes and on logout"""
+    st.session_state.pop('user_profile', None)
+
+def get_user_area() -> str:
+    """Logged-in user's area from the cached profile"""
+    profile = get_user_profile()
+    return profile.area if profile else 'Satellite'  # Default fallback
+
 # Main Menu Functions
 def main_menu():
     """Main menu for logged-in users"""
-    cursor = st.session_state.cursor
+    # Get user info from the session profile
+    user_info = get_user_profile()
     
-    # Get user info
-    cursor.execute("SELECT name, area FROM users WHERE email = %s", (st.session_state.logged_in_user,))
-    user_info = cursor.fetchone()
-    
-    st.title(f"🎬 Welcome, {user_info['name']}!")
-    st.write(f"📍 Area: {user_info['area']}")
+    st.title(f"🎬 Welcome, {user_info.name}!")
+    st.write(f"📍 Area: {user_info.area}")
     
     # Main menu options
     col1, col2, col3 = st.columns(3)
@@ -2301,13 +4510,13 @@ def main_menu():
     with col2:
         if st.button("🚪 Logout", use_container_width=True):
             st.session_state.logged_in_user = None
+            invalidate_user_profile()
             st.session_state.current_step = "login"
             st.rerun()
 # Movie Booking Functions
 def movie_booking():
     """Movie booking interface with mood-based filtering and movie posters"""
     st.title("🎬 MOVIES")
-    cursor = st.session_state.cursor
     
     # Back button
     if st.button("← Back to Entertainment Selection"):
@@ -2344,11 +4553,7 @@ def movie_booking():
     # Step 2: Show movies based on mood with posters
     st.write(f"## {st.session_state.movie_mood.upper()} MOVIES")
     
-    cursor.execute("""
-        SELECT id, movie_name, duration_minutes, rating, language 
-        FROM movies WHERE mood = %s
-    """, (st.session_state.movie_mood,))
-    movies = cursor.fetchall()
+    movies = [dict(movie) for movie in get_catalog(st.session_state.cursor).movies_by_mood.get(st.session_state.movie_mood, ())]
     
     # Display movies in a grid with posters
     cols = st.columns(2)
@@ -2387,20 +4592,13 @@ def movie_theatre_selection():
     st.title(f"🎬 {st.session_state.selected_movie['movie_name']}")
     st.write("### 🏢 Select Theatre")
     
-    cursor = st.session_state.cursor
-    
-    # Get user's area - FIXED TUPLE ERROR
-    cursor.execute("SELECT area FROM users WHERE email = %s", (st.session_state.logged_in_user,))
-    user_result = cursor.fetchone()
-    if user_result and 'area' in user_result:
-        user_area = user_result['area']
-    else:
-        user_area = 'Satellite'  # Default fallback
+    # Get user's area from the session profile
+    user_area = get_user_area()
     
     st.info(f"📍 Showing selected theatres in your area: **{user_area}**")
     
     # Get movie-specific theatres (3 theatres for this movie)
-    theatres = get_movie_specific_theatres(st.session_state.selected_movie['id'], user_area, cursor)
+    theatres = get_movie_specific_theatres(st.session_state.selected_movie['id'], user_area, st.session_state.cursor)
     
     if not theatres:
         st.error(f"❌ No theatres found in {user_area} area")
@@ -2432,45 +4630,13 @@ def movie_theatre_selection():
 def ensure_seat_data_exists(cursor, conn, theatre_id, show_date, show_time):
     """Ensure seat data exists for a specific theatre, date, and time"""
     try:
-        # Check if seat data already exists
-        cursor.execute("""
-            SELECT COUNT(*) as count FROM theatre_rows 
-            WHERE theatre_id = %s AND show_date = %s AND show_time = %s
-        """, (theatre_id, show_date, show_time))
-        
-        existing_count = cursor.fetchone()['count']
-        
-        if existing_count == 0:
-            # Create seat data for this specific show
-            if theatre_id <= 7:  # Theatres 1-7 (120 seats)
-                seat_rows = [("A", 30, 1.5), ("B", 35, 1.2), ("C", 30, 1.0), ("D", 15, 0.8), ("E", 10, 0.7)]
-            elif theatre_id <= 14:  # Theatres 8-14 (90 seats)
-                seat_rows = [("A", 25, 1.5), ("B", 30, 1.2), ("C", 20, 1.0), ("D", 15, 0.8)]
-            elif theatre_id <= 21:  # Theatres 15-21 (105 seats)
-                seat_rows = [("A", 30, 1.5), ("B", 35, 1.2), ("C", 25, 1.0), ("D", 15, 0.8)]
-            elif theatre_id <= 28:  # Theatres 22-28 (75 seats)
-                seat_rows = [("A", 20, 1.5), ("B", 25, 1.2), ("C", 20, 1.0), ("D", 10, 0.8)]
-            elif theatre_id <= 35:  # Theatres 29-35 (60 seats)
-                seat_rows = [("A", 20, 1.5), ("B", 25, 1.2), ("C", 15, 1.0)]
-            elif theatre_id <= 42:  # Theatres 36-42 (85 seats)
-                seat_rows = [("A", 25, 1.5), ("B", 30, 1.2), ("C", 20, 1.0), ("D", 10, 0.8)]
-            elif theatre_id <= 49:  # Theatres 43-49 (70 seats)
-                seat_rows = [("A", 20, 1.5), ("B", 25, 1.2), ("C", 15, 1.0), ("D", 10, 0.8)]
-            else:  # Theatres 50-56 (70 seats)
-                seat_rows = [("A", 20, 1.5), ("B", 25, 1.2), ("C", 15, 1.0), ("D", 10, 0.8)]
-            
-            # Insert seat data
-            for row_name, seats_in_row, price_mult in seat_rows:
-                cursor.execute("""
-                    INSERT INTO theatre_rows 
-                    (theatre_id, row_name, show_date, show_time, total_seats, available_seats, price_multiplier)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                """, (theatre_id, row_name, show_date, show_time, seats_in_row, seats_in_row, price_mult))
-            
-            conn.commit()
-            return True
-        
-        return False
+        created = upsert_seat_inventory(cursor, show_date,
+                                        theatre_ids=[theatre_id], show_times=[show_time])
+        if created:
+            publish_availability_change(cursor, 'seats', theatre_id=theatre_id,
+                                        show_date=show_date, show_time=show_time)
+        conn.commit()
+        return created > 0
         
     except Exception as e:
         conn.rollback()
@@ -2494,7 +4660,9 @@ def movie_date_time_selection():
     
     if selected_date:
         # Get show times for this movie
-        movie_show_times = get_movie_show_times(st.session_state.selected_movie['id'])
+        movie_show_times = get_upcoming_show_times(st.session_state.cursor, 'movie',
+                                                   st.session_state.selected_movie['id'],
+                                                   st.session_state.selected_theatre['theater_id'], selected_date['date'])
         
         st.write("### ⏰ Available Show Times")
         
@@ -2519,7 +4687,9 @@ def movie_date_time_selection():
                         st.session_state.selected_date = selected_date['date']
                         st.session_state.selected_time = show_time
                         st.session_state.current_step = "movie_seat_selection"
-                    st.rerun()
+                        st.rerun()
+        else:
+            st.error("❌ No show times scheduled for this movie at this theatre")
     
     if st.button("← Back to Theatres"):
         st.session_state.current_step = "movie_theatre_selection"
@@ -2534,14 +4704,8 @@ def movie_seat_selection():
     cursor = st.session_state.cursor
     
     # Get available seats for this theatre, date, and time
-    cursor.execute("""
-        SELECT row_name, total_seats, available_seats, price_multiplier
-        FROM theatre_rows 
-        WHERE theatre_id = %s AND show_date = %s AND show_time = %s
-        ORDER BY row_name
-    """, (st.session_state.selected_theatre['theater_id'], st.session_state.selected_date, st.session_state.selected_time))
-    
-    rows = cursor.fetchall()
+    rows = get_seat_map(cursor, st.session_state.selected_theatre['theater_id'],
+                        str(st.session_state.selected_date), str(st.session_state.selected_time))
     
     if not rows:
         st.warning("⚠️ Creating seat data for this show time...")
@@ -2574,11 +4738,14 @@ def movie_seat_selection():
             for row_name, seats_in_row, price_mult in seat_rows:
                 cursor.execute("""
                     INSERT INTO theatre_rows 
-                    (theatre_id, row_name, show_date, show_time, total_seats, available_seats, price_multiplier)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    (theatre_id, row_name, show_date, show_time, show_starts_at, total_seats, available_seats, price_multiplier)
+                    VALUES (%s, %s, %s, %s, %s::date + %s::time, %s, %s, %s)
                     ON CONFLICT (theatre_id, row_name, show_date, show_time) DO NOTHING
-                """, (theatre_id, row_name, show_date, show_time, seats_in_row, seats_in_row, price_mult))
+                """, (theatre_id, row_name, show_date, show_time, show_date, show_time,
+                      seats_in_row, seats_in_row, price_mult))
             
+            publish_availability_change(cursor, 'seats', theatre_id=theatre_id,
+                                        show_date=show_date, show_time=show_time)
             st.session_state.conn.commit()
             st.success("✅ Seat data created! Please refresh to see seats.")
             
@@ -2599,6 +4766,11 @@ def movie_seat_selection():
     if 'selected_seats' not in st.session_state:
         st.session_state.selected_seats = {}
     
+    # Seats sitting in other users' carts are not offered
+    held = get_held_seats(cursor, st.session_state.selected_theatre['theater_id'],
+                          st.session_state.selected_date, st.session_state.selected_time,
+                          exclude_session_id=get_seat_hold_session_id())
+    
     base_price = st.session_state.selected_theatre['base_price']
     total_amount = 0
     total_seats = 0
@@ -2607,7 +4779,7 @@ def movie_seat_selection():
     
     for row in rows:
         row_name = row['row_name']
-        available = row['available_seats']
+        available = max(row['available_seats'] - held.get(row_name, 0), 0)
         total = row['total_seats']
         price_mult = float(row['price_multiplier'])
         row_price = int(base_price * price_mult)
@@ -2651,17 +4823,23 @@ def movie_seat_selection():
             st.write(f"### 💰 Total Amount: ₹{total_amount}")
         
         if st.button("🛒 Proceed to Payment", type="primary"):
-            # Prepare booking details
-            seat_numbers = []
-            row_details = []
-            seat_counter = 1
-            
-            for row_name, seats_count in st.session_state.selected_seats.items():
-                if seats_count > 0:
-                    row_seats = [f"{row_name}{i}" for i in range(seat_counter, seat_counter + seats_count)]
-                    seat_numbers.extend(row_seats)
-                    row_details.append(f"Row {row_name} x {seats_count} seats")
-                    seat_counter += seats_count
+            row_quantities = {row_name: seats_count
+                              for row_name, seats_count in st.session_state.selected_seats.items()
+                              if seats_count > 0}
+            
+            # Hold the seats while the user pays
+            expires_at = place_seat_hold(cursor, get_seat_hold_session_id(),
+                                         st.session_state.selected_theatre['theater_id'],
+                                         st.session_state.selected_date, st.session_state.selected_time,
+                                         row_quantities)
+            if expires_at is None:
+                st.session_state.conn.rollback()
+                st.error("❌ Some of these seats were just taken. Please adjust your selection.")
+                return
+            st.session_state.conn.commit()
+            
+            # Prepare booking details (exact seat numbers are assigned from the seat map at payment)
+            row_details = [f"Row {row_name} x {seats_count} seats" for row_name, seats_count in row_quantities.items()]
             
             st.session_state.booking_details = {
                 'event_type': 'movie',
@@ -2673,8 +4851,11 @@ def movie_seat_selection():
                 'show_time': st.session_state.selected_time,
                 'booked_seats': total_seats,
                 'total_amount': total_amount,
-                'seat_numbers': ', '.join(seat_numbers),
-                'row_details': ', '.join(row_details)
+                'seat_numbers': '',
+                'row_details': ', '.join(row_details),
+                'row_quantities': row_quantities,
+                'hold_expires_at': expires_at,
+                'idempotency_key': generate_idempotency_key()
             }
             
             st.session_state.current_step = "payment_method_selection"
@@ -2683,10 +4864,51 @@ def movie_seat_selection():
         st.info("👆 Select seats to proceed")
     
     if st.button("← Back to Date/Time"):
+        release_seat_holds(cursor, get_seat_hold_session_id())
+        st.session_state.conn.commit()
         st.session_state.selected_seats = {}
         st.session_state.current_step = "movie_date_time_selection"
         st.rerun()
 
+# Waiting room gate for comedy and concert checkout
+def get_queue_token() -> str:
+    """This session's waiting room token"""
+    if 'queue_token' not in st.session_state:
+        st.session_state.queue_token = uuid.uuid4().hex
+    return st.session_state.queue_token
+
+def waiting_room_gate(event_type, show_id, venue_id, show_date, show_time) -> bool:
+    """Let the session through to checkout or show its place in the queue; True when admitted"""
+    show_key = (event_type, show_id, venue_id, show_date, show_time)
+    if get_waiting_room().enter(show_key, get_queue_token(), st.session_state.cursor) == 0:
+        keep_checkout_slot()
+        return True
+    
+    st.info("🚦 This show is in high demand - you're in the waiting room")
+    show_queue_position(show_key)
+    st.caption("Keep this page open - you'll move to ticket selection automatically.")
+    return False
+
+@st.fragment(run_every=CONFIG['WAITING_ROOM_POLL_SECONDS'])
+def show_queue_position(show_key):
+    """Re-poll the queue on a timer; fragment reruns skip the latency probe, so they never touch the database"""
+    waiting_room = get_waiting_room()
+    position = waiting_room.enter(show_key, get_queue_token())
+    if position == 0:
+        st.rerun(scope="app")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Your place in line", position)
+    with col2:
+        st.metric("Estimated wait", f"{int(waiting_room.estimated_wait(position)) + 1}s")
+
+@st.fragment(run_every=CONFIG['WAITING_ROOM_POLL_SECONDS'])
+def keep_checkout_slot():
+    """Heartbeat this session's checkout slot while a checkout page is open; a closed tab lets it lapse"""
+    if not get_waiting_room().heartbeat(get_queue_token()):
+        st.rerun(scope="app")  # slot lapsed - the gate puts the session back in line
+
 # Comedy Show Booking Functions
 def comedy_booking():
     """Comedy show booking interface with posters"""
@@ -2696,13 +4918,7 @@ def comedy_booking():
         st.session_state.current_step = "main_menu"
         st.rerun()
     
-    cursor = st.session_state.cursor
-    cursor.execute("""
-        SELECT show_id, comedian_name, show_title, show_type, duration_minutes, 
-               language, age_rating, description, ticket_price
-        FROM comedy_shows ORDER BY comedian_name
-    """)
-    shows = cursor.fetchall()
+    shows = [dict(show) for show in get_catalog(st.session_state.cursor).comedy_shows]
     
     # Display comedy shows in a grid with posters
     cols = st.columns(2)
@@ -2735,34 +4951,18 @@ def comedy_venue_selection():
     
     cursor = st.session_state.cursor
     
-    # Get user's area - FIXED TUPLE ERROR
-    cursor.execute("SELECT area FROM users WHERE email = %s", (st.session_state.logged_in_user,))
-    user_result = cursor.fetchone()
-    if user_result and 'area' in user_result:
-        user_area = user_result['area']
-    else:
-        user_area = 'Satellite'  # Default fallback
+    # Get user's area from the session profile
+    user_area = get_user_area()
     
     st.info(f"📍 Showing venues in your area: **{user_area}**")
     
-    # Get venues suitable for comedy shows in user's area with fresh capacity data
-    cursor.execute("""
-        SELECT venue_id, name, area, venue_type, capacity, available_capacity, base_price, address, facilities
-        FROM venues 
-        WHERE venue_type LIKE '%Comedy%' AND area = %s
-        ORDER BY available_capacity DESC, name
-    """, (user_area,))
-    venues = cursor.fetchall()
+    # Get venues suitable for comedy shows in user's area from the catalog cache
+    venues = get_catalog(cursor).comedy_venues(user_area)
     
     if not venues:
         st.warning(f"⚠️ No comedy venues found in {user_area} area. Showing all available venues:")
         # Fallback to show all comedy venues if none in user's area
-        cursor.execute("""
-            SELECT venue_id, name, area, venue_type, capacity, available_capacity, base_price, address, facilities
-            FROM venues WHERE venue_type LIKE '%Comedy%' 
-            ORDER BY available_capacity DESC, name
-        """)
-        venues = cursor.fetchall()
+        venues = get_catalog(cursor).comedy_venues()
     
     if not venues:
         st.error("❌ No comedy venues available in the system!")
@@ -2771,27 +4971,25 @@ def comedy_venue_selection():
             st.rerun()
         return
     
+    # Seats left for this show across its upcoming dates and times
+    get_venue_show_availability(cursor, "comedy", st.session_state.selected_comedy['show_id'], venues,
+                                [day['date'] for day in get_next_few_days(3)])
+    
     for venue in venues:
-        # Get real-time available capacity
-        cursor.execute("SELECT available_capacity FROM venues WHERE venue_id = %s", (venue['venue_id'],))
-        current_capacity = cursor.fetchone()
-        if current_capacity:
-            venue['available_capacity'] = current_capacity['available_capacity']
-        
         with st.expander(f"🏢 {venue['name']} - {venue['area']} ({'Available' if venue['available_capacity'] > 0 else 'SOLD OUT'})"):
             col1, col2 = st.columns([3, 1])
             with col1:
                 st.write(f"**Type:** {venue['venue_type']}")
-                st.write(f"**Total Capacity:** {venue['capacity']} seats")
+                st.write(f"**Total Capacity:** {venue['total_show_capacity']} seats across {venue['show_count']} shows")
                 st.write(f"**Available Seats:** {venue['available_capacity']} seats")
                 st.write(f"**Address:** {venue['address']}")
                 st.write(f"**Facilities:** {venue['facilities']}")
                 
                 # Show booking status
-                if venue['available_capacity'] == venue['capacity']:
+                if venue['available_capacity'] == venue['total_show_capacity']:
                     st.success("✅ No bookings yet - Full availability!")
                 elif venue['available_capacity'] > 0:
-                    booked = venue['capacity'] - venue['available_capacity']
+                    booked = venue['total_show_capacity'] - venue['available_capacity']
                     st.info(f"📊 {booked} seats already booked")
                 else:
                     st.error("❌ Completely sold out!")
@@ -2826,16 +5024,9 @@ def comedy_date_time_selection():
     )
     
     if selected_date:
-        # Different show times for different comedy shows
-        comedy_show_times = {
-            1: ["6:00 PM", "8:30 PM"],  # Kapil Sharma
-            2: ["6:15 PM", "8:45 PM"],  # Zakir Khan
-            3: ["6:30 PM", "9:00 PM"],  # Biswa
-            4: ["6:45 PM", "9:15 PM"],  # Kenny Sebastian
-            5: ["7:00 PM", "9:30 PM"]   # Abhishek Upmanyu
-        }
-        
-        show_times = comedy_show_times.get(st.session_state.selected_comedy['show_id'], ["6:00 PM", "8:30 PM"])
+        show_times = get_upcoming_show_times(st.session_state.cursor, 'comedy',
+                                             st.session_state.selected_comedy['show_id'],
+                                             st.session_state.selected_comedy_venue['venue_id'], selected_date['date'])
         
         st.write("### ⏰ Available Show Times")
         
@@ -2870,13 +5061,20 @@ def comedy_ticket_selection():
     show = st.session_state.selected_comedy
     cursor = st.session_state.cursor
     
-    # Get real-time available capacity
-    cursor.execute("SELECT available_capacity FROM venues WHERE venue_id = %s", (venue['venue_id'],))
-    current_capacity = cursor.fetchone()
-    if current_capacity:
-        available_seats = current_capacity['available_capacity']
-    else:
-        available_seats = venue['available_capacity']
+    # High-demand shows admit buyers through the waiting room
+    if not waiting_room_gate("comedy", show['show_id'], venue['venue_id'],
+                             st.session_state.selected_comedy_date, st.session_state.selected_comedy_time):
+        if st.button("← Leave Queue"):
+            get_waiting_room().leave(get_queue_token())
+            st.session_state.current_step = "comedy_date_time_selection"
+            st.rerun()
+        return
+    
+    # Get real-time available capacity for this show
+    show_capacity = get_cached_show_capacity(cursor, "comedy", venue['venue_id'], show['show_id'],
+                                             str(st.session_state.selected_comedy_date),
+                                             str(st.session_state.selected_comedy_time))
+    available_seats = show_capacity['available_capacity']
     
     # Show pricing
     ticket_price = show['ticket_price']
@@ -2922,9 +5120,9 @@ def comedy_ticket_selection():
         
         if st.button("🛒 Proceed to Payment", type="primary"):
             # Double-check availability before proceeding
-            cursor.execute("SELECT available_capacity FROM venues WHERE venue_id = %s", (venue['venue_id'],))
-            final_check = cursor.fetchone()
-            if final_check and final_check['available_capacity'] >= num_tickets:
+            final_check = get_show_capacity(cursor, "comedy", venue['venue_id'], show['show_id'],
+                                            st.session_state.selected_comedy_date, st.session_state.selected_comedy_time)
+            if final_check['available_capacity'] >= num_tickets:
                 # Prepare booking details
                 seat_numbers = [f"S{i+1}" for i in range(num_tickets)]
                 
@@ -2939,7 +5137,8 @@ def comedy_ticket_selection():
                     'booked_seats': num_tickets,
                     'total_amount': total_amount,
                     'seat_numbers': ', '.join(seat_numbers),
-                    'row_details': f"General Seating x {num_tickets} tickets"
+                    'row_details': f"General Seating x {num_tickets} tickets",
+                    'idempotency_key': generate_idempotency_key()
                 }
                 
                 st.session_state.current_step = "payment_method_selection"
@@ -2952,6 +5151,7 @@ def comedy_ticket_selection():
         st.warning("⚠️ This show is completely sold out!")
     
     if st.button("← Back to Date/Time"):
+        get_waiting_room().leave(get_queue_token())
         st.session_state.current_step = "comedy_date_time_selection"
         st.rerun()
 
@@ -2964,13 +5164,7 @@ def concert_booking():
         st.session_state.current_step = "main_menu"
         st.rerun()
     
-    cursor = st.session_state.cursor
-    cursor.execute("""
-        SELECT concert_id, artist_name, concert_title, genre, duration_minutes, 
-               language, ticket_price, description, special_guests
-        FROM concerts ORDER BY artist_name
-    """)
-    concerts = cursor.fetchall()
+    concerts = [dict(concert) for concert in get_catalog(st.session_state.cursor).concerts]
     
     # Display concerts in a grid with posters
     cols = st.columns(2)
@@ -3005,34 +5199,18 @@ def concert_venue_selection():
     
     cursor = st.session_state.cursor
     
-    # Get user's area - FIXED TUPLE ERROR
-    cursor.execute("SELECT area FROM users WHERE email = %s", (st.session_state.logged_in_user,))
-    user_result = cursor.fetchone()
-    if user_result and 'area' in user_result:
-        user_area = user_result['area']
-    else:
-        user_area = 'Satellite'  # Default fallback
+    # Get user's area from the session profile
+    user_area = get_user_area()
     
     st.info(f"📍 Showing venues in your area: **{user_area}**")
     
-    # Get venues suitable for concerts in user's area with fresh capacity data
-    cursor.execute("""
-        SELECT venue_id, name, area, venue_type, capacity, available_capacity, base_price, address, facilities
-        FROM venues 
-        WHERE (venue_type LIKE '%Concert%' OR venue_type LIKE '%Music%') AND area = %s
-        ORDER BY available_capacity DESC, name
-    """, (user_area,))
-    venues = cursor.fetchall()
+    # Get venues suitable for concerts in user's area from the catalog cache
+    venues = get_catalog(cursor).concert_venues(user_area)
     
     if not venues:
         st.warning(f"⚠️ No concert venues found in {user_area} area. Showing all available venues:")
         # Fallback to show all concert venues if none in user's area
-        cursor.execute("""
-            SELECT venue_id, name, area, venue_type, capacity, available_capacity, base_price, address, facilities
-            FROM venues WHERE venue_type LIKE '%Concert%' OR venue_type LIKE '%Music%' 
-            ORDER BY available_capacity DESC, name
-        """)
-        venues = cursor.fetchall()
+        venues = get_catalog(cursor).concert_venues()
     
     if not venues:
         st.error("❌ No concert venues available in the system!")
@@ -3041,27 +5219,25 @@ def concert_venue_selection():
             st.rerun()
         return
     
+    # Seats left for this show across its upcoming dates and times
+    get_venue_show_availability(cursor, "concert", st.session_state.selected_concert['concert_id'], venues,
+                                [day['date'] for day in get_next_few_days(3)])
+    
     for venue in venues:
-        # Get real-time available capacity
-        cursor.execute("SELECT available_capacity FROM venues WHERE venue_id = %s", (venue['venue_id'],))
-        current_capacity = cursor.fetchone()
-        if current_capacity:
-            venue['available_capacity'] = current_capacity['available_capacity']
-        
         with st.expander(f"🏢 {venue['name']} - {venue['area']} ({'Available' if venue['available_capacity'] > 0 else 'SOLD OUT'})"):
             col1, col2 = st.columns([3, 1])
             with col1:
                 st.write(f"**Type:** {venue['venue_type']}")
-                st.write(f"**Total Capacity:** {venue['capacity']} seats")
+                st.write(f"**Total Capacity:** {venue['total_show_capacity']} seats across {venue['show_count']} shows")
                 st.write(f"**Available Seats:** {venue['available_capacity']} seats")
                 st.write(f"**Address:** {venue['address']}")
                 st.write(f"**Facilities:** {venue['facilities']}")
                 
                 # Show booking status
-                if venue['available_capacity'] == venue['capacity']:
+                if venue['available_capacity'] == venue['total_show_capacity']:
                     st.success("✅ No bookings yet - Full availability!")
                 elif venue['available_capacity'] > 0:
-                    booked = venue['capacity'] - venue['available_capacity']
+                    booked = venue['total_show_capacity'] - venue['available_capacity']
                     st.info(f"📊 {booked} seats already booked")
                 else:
                     st.error("❌ Completely sold out!")
@@ -3096,16 +5272,9 @@ def concert_date_time_selection():
     )
     
     if selected_date:
-        # Different show times for different concerts
-        concert_show_times = {
-            1: ["7:00 PM", "9:30 PM"],   # Arijit Singh
-            2: ["6:30 PM", "9:00 PM"],   # A.R. Rahman
-            3: ["8:00 PM", "10:30 PM"],  # Nucleya
-            4: ["6:45 PM", "9:15 PM"],   # Rahat Fateh Ali Khan
-            5: ["7:15 PM", "9:45 PM"]    # Sunidhi Chauhan
-        }
-        
-        show_times = concert_show_times.get(st.session_state.selected_concert['concert_id'], ["7:00 PM", "9:30 PM"])
+        show_times = get_upcoming_show_times(st.session_state.cursor, 'concert',
+                                             st.session_state.selected_concert['concert_id'],
+                                             st.session_state.selected_concert_venue['venue_id'], selected_date['date'])
         
         st.write("### ⏰ Available Show Times")
         
@@ -3141,13 +5310,20 @@ def concert_ticket_selection():
     concert = st.session_state.selected_concert
     cursor = st.session_state.cursor
     
-    # Get real-time available capacity
-    cursor.execute("SELECT available_capacity FROM venues WHERE venue_id = %s", (venue['venue_id'],))
-    current_capacity = cursor.fetchone()
-    if current_capacity:
-        available_seats = current_capacity['available_capacity']
-    else:
-        available_seats = venue['available_capacity']
+    # High-demand shows admit buyers through the waiting room
+    if not waiting_room_gate("concert", concert['concert_id'], venue['venue_id'],
+                             st.session_state.selected_concert_date, st.session_state.selected_concert_time):
+        if st.button("← Leave Queue"):
+            get_waiting_room().leave(get_queue_token())
+            st.session_state.current_step = "concert_date_time_selection"
+            st.rerun()
+        return
+    
+    # Get real-time available capacity for this show
+    show_capacity = get_cached_show_capacity(cursor, "concert", venue['venue_id'], concert['concert_id'],
+                                             str(st.session_state.selected_concert_date),
+                                             str(st.session_state.selected_concert_time))
+    available_seats = show_capacity['available_capacity']
     
     # Show pricing
     ticket_price = concert['ticket_price']
@@ -3193,9 +5369,9 @@ def concert_ticket_selection():
         
         if st.button("🛒 Proceed to Payment", type="primary"):
             # Double-check availability before proceeding
-            cursor.execute("SELECT available_capacity FROM venues WHERE venue_id = %s", (venue['venue_id'],))
-            final_check = cursor.fetchone()
-            if final_check and final_check['available_capacity'] >= num_tickets:
+            final_check = get_show_capacity(cursor, "concert", venue['venue_id'], concert['concert_id'],
+                                            st.session_state.selected_concert_date, st.session_state.selected_concert_time)
+            if final_check['available_capacity'] >= num_tickets:
                 # Prepare booking details
                 seat_numbers = [f"C{i+1}" for i in range(num_tickets)]
                 
@@ -3210,7 +5386,8 @@ def concert_ticket_selection():
                     'booked_seats': num_tickets,
                     'total_amount': total_amount,
                     'seat_numbers': ', '.join(seat_numbers),
-                    'row_details': f"General Seating x {num_tickets} tickets"
+                    'row_details': f"General Seating x {num_tickets} tickets",
+                    'idempotency_key': generate_idempotency_key()
                 }
                 
                 st.session_state.current_step = "payment_method_selection"
@@ -3223,6 +5400,7 @@ def concert_ticket_selection():
         st.warning("⚠️ This concert is completely sold out!")
     
     if st.button("← Back to Date/Time"):
+        get_waiting_room().leave(get_queue_token())
         st.session_state.current_step = "concert_date_time_selection"
         st.rerun()
 # Payment Functions
@@ -3230,12 +5408,19 @@ def payment_method_selection():
     """Payment method selection"""
     booking = st.session_state.booking_details
     
+    # Comedy/concert buyers keep their waiting room checkout slot alive while paying
+    if booking['event_type'] != 'movie' and not waiting_room_gate(
+            booking['event_type'], booking['event_id'], booking['venue_id'], booking['show_date'], booking['show_time']):
+        return
+    
     st.title("💳 Payment")
     st.write(f"### 🎫 {booking['event_name']}")
     st.write(f"🏢 {booking['venue_name']}")
     st.write(f"📅 {booking['show_date']} at {booking['show_time']}")
     st.write(f"🎫 {booking['booked_seats']} tickets")
     st.write(f"💰 **Total Amount: ₹{booking['total_amount']}**")
+    if booking.get('hold_expires_at'):
+        st.info(f"⏳ Seats held for you until {booking['hold_expires_at'].strftime('%I:%M:%S %p')}")
     
     st.write("---")
     st.write("### 💳 Select Payment Method")
@@ -3277,6 +5462,11 @@ def payment_processing():
     booking = st.session_state.booking_details
     payment_method = st.session_state.selected_payment_method
     
+    # Comedy/concert buyers keep their waiting room checkout slot alive while paying
+    if booking['event_type'] != 'movie' and not waiting_room_gate(
+            booking['event_type'], booking['event_id'], booking['venue_id'], booking['show_date'], booking['show_time']):
+        return
+    
     st.title(f"💳 {payment_method} Payment")
     st.write(f"### 🎫 {booking['event_name']}")
     st.write(f"💰 **Amount to Pay: ₹{booking['total_amount']}**")
@@ -3307,11 +5497,18 @@ def payment_processing():
                 booking['show_date'], booking['show_time'],
                 booking['booked_seats'], booking['total_amount'],
                 booking['seat_numbers'], booking['row_details'],
-                payment_method, payment_data
+                payment_method, payment_data,
+                row_quantities=booking.get('row_quantities'),
+                hold_session_id=get_seat_hold_session_id(),
+                idempotency_key=booking.get('idempotency_key')
             )
             
             if success:
                 # Store booking details for success page
+                if booking['event_type'] == 'movie':
+                    st.session_state.cursor.execute(
+                        "SELECT seat_numbers FROM bookings WHERE booking_id = %s", (booking_id,))
+                    booking['seat_numbers'] = st.session_state.cursor.fetchone()['seat_numbers']
                 st.session_state.success_booking_id = booking_id
                 st.session_state.success_transaction_id = transaction_id
                 st.session_state.current_step = "payment_success"
@@ -3331,6 +5528,9 @@ def payment_success():
     
     booking = st.session_state.booking_details
     
+    # Checkout finished - free the waiting room slot for the next buyer
+    get_waiting_room().leave(get_queue_token())
+    
     st.success("✅ Your booking has been confirmed!")
     
     # Show booking details
@@ -3341,6 +5541,7 @@ def payment_success():
     st.write(f"**Venue:** {booking['venue_name']}")
     st.write(f"**Date & Time:** {booking['show_date']} at {booking['show_time']}")
     st.write(f"**Tickets:** {booking['booked_seats']}")
+    st.write(f"**Seats:** {booking['seat_numbers']}")
     st.write(f"**Total Paid:** ₹{booking['total_amount']}")
     
     st.info("🎫 Your ticket details have been saved!")
@@ -3423,6 +5624,107 @@ def my_bookings():
         st.session_state.current_step = "main_menu"
         st.rerun()
 # Admin Dashboard Functions
+# 🔥 ADMIN DASHBOARD CACHE - Section query results shared by admin sessions for a short TTL
+@memoize(maxsize=CONFIG['ADMIN_CACHE_SIZE'], ttl=CONFIG['ADMIN_CACHE_TTL_SECONDS'], with_cursor=True)
+def load_booking_analytics(cursor) -> Dict[str, Tuple[Dict, ...]]:
+    """Booking totals by event type and per day, from the daily rollup"""
+    cursor.execute("""
+        SELECT 
+            event_type,
+            SUM(bookings)::bigint as total_bookings,
+            SUM(tickets)::bigint as total_tickets,
+            SUM(revenue)::bigint as total_revenue
+        FROM booking_daily_rollup
+        GROUP BY event_type
+    """)
+    stats = tuple(dict(row) for row in cursor.fetchall())
+    cursor.execute("""
+        SELECT day as booking_date, SUM(bookings)::bigint as bookings
+        FROM booking_daily_rollup
+        GROUP BY day
+        ORDER BY day
+    """)
+    daily_bookings = tuple(dict(row) for row in cursor.fetchall())
+    return {'stats': stats, 'daily_bookings': daily_bookings}
+
+@memoize(maxsize=CONFIG['ADMIN_CACHE_SIZE'], ttl=CONFIG['ADMIN_CACHE_TTL_SECONDS'], with_cursor=True)
+def load_profit_analytics(cursor, days: int) -> Dict[str, Any]:
+    """Profit totals, the last `days` days of profit and profit by event type, from the daily rollup"""
+    cursor.execute("""
+        SELECT 
+            SUM(revenue)::bigint as total_revenue,
+            SUM(base_amount)::bigint as total_base_amount,
+            SUM(gst_amount)::bigint as total_gst,
+            SUM(platform_fee)::bigint as total_platform_fee,
+            SUM(theatre_share)::bigint as total_theatre_share,
+            SUM(profit_amount)::bigint as total_profit,
+            COALESCE(SUM(bookings), 0)::bigint as total_bookings
+        FROM booking_daily_rollup
+    """)
+    profit_stats = dict(cursor.fetchone())
+    cursor.execute("""
+        SELECT 
+            day as booking_date,
+            SUM(revenue)::bigint as daily_revenue,
+            SUM(profit_amount)::bigint as daily_profit,
+            SUM(bookings)::bigint as daily_bookings
+        FROM booking_daily_rollup
+        GROUP BY day
+        ORDER BY day DESC
+        LIMIT %s
+    """, (days,))
+    daily_profits = tuple(dict(row) for row in cursor.fetchall())
+    cursor.execute("""
+        SELECT 
+            event_type,
+            SUM(revenue)::bigint as revenue,
+            SUM(profit_amount)::bigint as profit,
+            SUM(bookings)::bigint as bookings,
+            (SUM(profit_amount)::float / SUM(bookings)) as avg_profit_per_booking
+        FROM booking_daily_rollup
+        GROUP BY event_type
+        ORDER BY profit DESC
+    """)
+    event_profits = tuple(dict(row) for row in cursor.fetchall())
+    return {'profit_stats': profit_stats, 'daily_profits': daily_profits, 'event_profits': event_profits}
+
+@memoize(maxsize=CONFIG['ADMIN_CACHE_SIZE'], ttl=CONFIG['ADMIN_CACHE_TTL_SECONDS'], with_cursor=True)
+def load_recent_bookings(cursor, event_type: str, limit: int) -> Tuple[Dict, ...]:
+    """Latest bookings, optionally of one event type ('All' for every type)"""
+    cursor.execute("""
+        SELECT booking_id, user_email, event_type, event_name, venue_name, 
+               show_date, show_time, booked_seats, total_amount, booking_date, payment_status
+        FROM bookings 
+        WHERE %s = 'All' OR event_type = %s
+        ORDER BY booking_date DESC
+        LIMIT %s
+    """, (event_type, event_type, limit))
+    return tuple(dict(row) for row in cursor.fetchall())
+
+@memoize(maxsize=CONFIG['ADMIN_CACHE_SIZE'], ttl=CONFIG['ADMIN_CACHE_TTL_SECONDS'], with_cursor=True)
+def load_user_stats(cursor, recent: int) -> Dict[str, Any]:
+    """Active user count, users per area and the `recent` newest registrations"""
+    cursor.execute("""
+        SELECT COUNT(*) as total_users FROM users WHERE otp IS NULL
+    """)
+    total_users = cursor.fetchone()['total_users']
+    cursor.execute("""
+        SELECT area, COUNT(*) as user_count 
+        FROM users WHERE otp IS NULL
+        GROUP BY area 
+        ORDER BY user_count DESC
+    """)
+    area_stats = tuple(dict(row) for row in cursor.fetchall())
+    cursor.execute("""
+        SELECT name, email, area, created_at 
+        FROM users 
+        WHERE otp IS NULL 
+        ORDER BY created_at DESC 
+        LIMIT %s
+    """, (recent,))
+    recent_users = tuple(dict(row) for row in cursor.fetchall())
+    return {'total_users': total_users, 'area_stats': area_stats, 'recent_users': recent_users}
+
 def admin_dashboard():
     """Admin dashboard with analytics and management"""
     admin = st.session_state.admin_logged_in
@@ -3430,23 +5732,27 @@ def admin_dashboard():
     
     cursor = st.session_state.cursor
     
-    # Admin menu
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📊 Analytics", "💰 Profit Analysis", "🎫 Bookings", "👥 Users", "⚙️ Settings"])
-    
-    with tab1:
-        show_admin_analytics(cursor)
-    
-    with tab2:
-        show_profit_analytics(cursor)
-    
-    with tab3:
-        show_admin_bookings(cursor)
-    
-    with tab4:
-        show_admin_users(cursor)
-    
-    with tab5:
-        show_admin_settings(cursor)
+    # Admin menu - only the selected section runs its queries and builds its charts
+    sections = {
+        "📊 Analytics": (show_admin_analytics, True),
+        "💰 Profit Analysis": (show_profit_analytics, True),
+        "🎫 Bookings": (show_admin_bookings, True),
+        "👥 Users": (show_admin_users, True),
+        "⚙️ Settings": (show_admin_settings, False)
+    }
+    col1, col2 = st.columns([5, 1])
+    with col1:
+        section = st.radio("Admin section", list(sections), horizontal=True,
+                           key="admin_section", label_visibility="collapsed")
+    show_section, cached = sections[section]
+    if cached:
+        with col2:
+            # Refresh reloads this section's figures and overwrites their cache entries for everyone
+            refresh = st.button("🔄 Refresh", use_container_width=True)
+        st.caption(f"⏱️ Figures are cached for up to {CONFIG['ADMIN_CACHE_TTL_SECONDS']}s - Refresh to reload now")
+        show_section(cursor, refresh)
+    else:
+        show_section(cursor)
     
     # Logout button
     if st.button("🚪 Admin Logout"):
@@ -3454,24 +5760,13 @@ def admin_dashboard():
         st.session_state.current_step = "login"
         st.rerun()
 
-def show_profit_analytics(cursor):
+def show_profit_analytics(cursor, refresh: bool = False):
     """Show detailed profit analytics"""
     st.write("### 💰 Profit & Revenue Analysis")
     
-    # Get profit statistics
-    cursor.execute("""
-        SELECT 
-            SUM(total_amount) as total_revenue,
-            SUM(base_amount) as total_base_amount,
-            SUM(gst_amount) as total_gst,
-            SUM(platform_fee) as total_platform_fee,
-            SUM(theatre_share) as total_theatre_share,
-            SUM(profit_amount) as total_profit,
-            COUNT(*) as total_bookings
-        FROM bookings 
-        WHERE payment_status = 'COMPLETED'
-    """)
-    profit_stats = cursor.fetchone()
+    # Get profit statistics (cached, from the daily rollup)
+    profit_data = (load_profit_analytics.refresh if refresh else load_profit_analytics)(cursor, 30)
+    profit_stats = profit_data['profit_stats']
     
     if profit_stats and profit_stats['total_revenue']:
         # Main metrics
@@ -3513,19 +5808,7 @@ def show_profit_analytics(cursor):
         st.plotly_chart(fig, use_container_width=True)
         
         # Daily profit trend
-        cursor.execute("""
-            SELECT 
-                DATE(booking_date) as booking_date,
-                SUM(total_amount) as daily_revenue,
-                SUM(profit_amount) as daily_profit,
-                COUNT(*) as daily_bookings
-            FROM bookings 
-            WHERE payment_status = 'COMPLETED'
-            GROUP BY DATE(booking_date)
-            ORDER BY booking_date DESC
-            LIMIT 30
-        """)
-        daily_profits = cursor.fetchall()
+        daily_profits = profit_data['daily_profits']
         
         if daily_profits:
             st.write("#### 📈 Daily Profit Trend (Last 30 Days)")
@@ -3544,19 +5827,7 @@ def show_profit_analytics(cursor):
                 st.plotly_chart(fig_profit, use_container_width=True)
         
         # Event type profit analysis
-        cursor.execute("""
-            SELECT 
-                event_type,
-                SUM(total_amount) as revenue,
-                SUM(profit_amount) as profit,
-                COUNT(*) as bookings,
-                AVG(profit_amount) as avg_profit_per_booking
-            FROM bookings 
-            WHERE payment_status = 'COMPLETED'
-            GROUP BY event_type
-            ORDER BY profit DESC
-        """)
-        event_profits = cursor.fetchall()
+        event_profits = profit_data['event_profits']
         
         if event_profits:
             st.write("#### 🎭 Profit by Event Type")
@@ -3587,21 +5858,13 @@ def show_profit_analytics(cursor):
     else:
         st.info("📝 No profit data available yet. Complete some bookings to see analytics.")
 
-def show_admin_analytics(cursor):
+def show_admin_analytics(cursor, refresh: bool = False):
     """Show admin analytics"""
     st.write("### 📊 Booking Analytics")
     
-    # Get booking statistics
-    cursor.execute("""
-        SELECT 
-            event_type,
-            COUNT(*) as total_bookings,
-            SUM(booked_seats) as total_tickets,
-            SUM(total_amount) as total_revenue
-        FROM bookings 
-        GROUP BY event_type
-    """)
-    stats = cursor.fetchall()
+    # Get booking statistics (cached, from the daily rollup)
+    analytics = (load_booking_analytics.refresh if refresh else load_booking_analytics)(cursor)
+    stats = analytics['stats']
     
     if stats:
         # Create metrics
@@ -3627,13 +5890,7 @@ def show_admin_analytics(cursor):
         st.plotly_chart(fig, use_container_width=True)
         
         # Bookings over time
-        cursor.execute("""
-            SELECT DATE(booking_date) as booking_date, COUNT(*) as bookings
-            FROM bookings 
-            GROUP BY DATE(booking_date)
-            ORDER BY booking_date
-        """)
-        daily_bookings = cursor.fetchall()
+        daily_bookings = analytics['daily_bookings']
         
         if daily_bookings:
             st.write("#### 📅 Daily Bookings Trend")
@@ -3644,19 +5901,15 @@ def show_admin_analytics(cursor):
     else:
         st.info("📝 No booking data available yet.")
 
-def show_admin_bookings(cursor):
+def show_admin_bookings(cursor, refresh: bool = False):
     """Show all bookings for admin"""
     st.write("### 🎫 All Bookings")
     
-    # Get all bookings
-    cursor.execute("""
-        SELECT booking_id, user_email, event_type, event_name, venue_name, 
-               show_date, show_time, booked_seats, total_amount, booking_date, payment_status
-        FROM bookings 
-        ORDER BY booking_date DESC
-        LIMIT 50
-    """)
-    bookings = cursor.fetchall()
+    event_filter = st.selectbox("Filter by Event Type:", ["All", "movie", "comedy", "concert"],
+                                key="admin_bookings_event_type")
+    
+    # Get latest bookings (cached per filter)
+    bookings = (load_recent_bookings.refresh if refresh else load_recent_bookings)(cursor, event_filter, 50)
     
     if bookings:
         # Convert to DataFrame for better display
@@ -3679,23 +5932,14 @@ def show_admin_bookings(cursor):
     else:
         st.info("📝 No bookings found.")
 
-def show_admin_users(cursor):
+def show_admin_users(cursor, refresh: bool = False):
     """Show user management"""
     st.write("### 👥 User Management")
     
-    # Get user statistics
-    cursor.execute("""
-        SELECT COUNT(*) as total_users FROM users WHERE otp IS NULL
-    """)
-    total_users = cursor.fetchone()['total_users']
-    
-    cursor.execute("""
-        SELECT area, COUNT(*) as user_count 
-        FROM users WHERE otp IS NULL
-        GROUP BY area 
-        ORDER BY user_count DESC
-    """)
-    area_stats = cursor.fetchall()
+    # Get user statistics (cached)
+    user_stats = (load_user_stats.refresh if refresh else load_user_stats)(cursor, 10)
+    total_users = user_stats['total_users']
+    area_stats = user_stats['area_stats']
     
     col1, col2 = st.columns(2)
     
@@ -3711,14 +5955,7 @@ def show_admin_users(cursor):
     
     with col2:
         # Recent registrations
-        cursor.execute("""
-            SELECT name, email, area, created_at 
-            FROM users 
-            WHERE otp IS NULL 
-            ORDER BY created_at DESC 
-            LIMIT 10
-        """)
-        recent_users = cursor.fetchall()
+        recent_users = user_stats['recent_users']
         
         if recent_users:
             st.write("#### 🆕 Recent Registrations")
@@ -3738,8 +5975,9 @@ def show_admin_settings(cursor):
                 # Reset all theatre seats to full capacity
                 cursor.execute("""
                     UPDATE theatre_rows 
-                    SET available_seats = total_seats
+                    SET available_seats = total_seats, seat_map = NULL
                 """)
+                publish_availability_change(cursor, 'reset')
                 st.session_state.conn.commit()
                 st.success("✅ All theatre seats reset to full capacity!")
             except Exception as e:
@@ -3748,83 +5986,118 @@ def show_admin_settings(cursor):
         if st.button("📊 Update Seat Data"):
             try:
                 recreate_theatre_rows_data(cursor, st.session_state.conn)
+                publish_availability_change(cursor, 'reset')
+                st.session_state.conn.commit()
                 st.success("✅ Seat data updated!")
             except Exception as e:
                 st.error(f"❌ Error updating seat data: {e}")
         
-        if st.button("🎬 Create All Theatre Seats"):
-            try:
-                # Create seat data for all theatres, all dates, all show times
-                available_dates = get_next_few_days(3)
-                all_show_times = set()
-                
-                # Get all show times
-                for movie_id in range(1, 41):
-                    show_times = get_movie_show_times(movie_id)
-                    all_show_times.update(show_times)
-                
-                all_show_times = sorted(list(all_show_times))
-                
-                total_created = 0
-                for theatre_id in range(1, 57):  # All 56 theatres
-                    for date_info in available_dates:
-                        for show_time in all_show_times:
-                            created = ensure_seat_data_exists(cursor, st.session_state.conn, 
-                                                            theatre_id, date_info['date'], show_time)
-                            if created:
-                                total_created += 1
-                
-                st.success(f"✅ Created seat data for {total_created} new show combinations!")
-            except Exception as e:
-                st.error(f"❌ Error creating seat data: {e}")
+        seat_job = get_job_registry().get("seat_inventory")
+        if st.button("🎬 Create All Theatre Seats",
+                     disabled=bool(seat_job and seat_job.is_running)):
+            # One set-based upsert per day of the booking horizon, on a worker thread
+            horizon = [date_info['date'] for date_info in get_next_few_days(3)]
+            
+            def create_day(show_date):
+                with db_pool.cursor(commit=True) as job_cursor:
+                    created = upsert_seat_inventory(job_cursor, show_date)
+                    if created:
+                        publish_availability_change(job_cursor, 'reset')
+                    return created
+            
+            seat_job = get_job_registry().start("seat_inventory", horizon, create_day)
+        
+        if seat_job:
+            st.progress(seat_job.progress,
+                        text=f"Seat inventory: {seat_job.completed_steps}/{seat_job.total_steps} days")
+            if seat_job.is_running:
+                st.info(f"⏳ Creating seat data... {seat_job.rows_affected:,} rows so far")
+                if st.button("🔄 Refresh Progress"):
+                    st.rerun()
+            elif seat_job.status == "DONE":
+                st.success(f"✅ Created {seat_job.rows_affected:,} missing seat rows!")
+            else:
+                st.error(f"❌ Error creating seat data: {seat_job.error}")
     
     with col2:
         st.write("#### 🏢 Venue Management")
         if st.button("🔄 Reset Venue Capacity"):
             try:
-                # Reset all venue capacities
+                # Reset all venue and per-show capacities
                 cursor.execute("""
                     UPDATE venues 
                     SET available_capacity = capacity
                 """)
+                cursor.execute("DELETE FROM show_capacity")
+                bump_catalog_version(cursor)
+                publish_availability_change(cursor, 'reset')
                 st.session_state.conn.commit()
                 st.success("✅ All venue capacities reset!")
             except Exception as e:
                 st.error(f"❌ Error resetting capacity: {e}")
         
+        # Flash-sale mode: split each show's capacity across shard rows
+        cursor.execute("SELECT venue_id, name, capacity_shards FROM venues ORDER BY name")
+        shard_venues = cursor.fetchall()
+        if shard_venues:
+            shard_venue = st.selectbox(
+                "Venue capacity mode:",
+                options=shard_venues,
+                format_func=lambda v: f"{v['name']} ({'single row' if v['capacity_shards'] <= 1 else str(v['capacity_shards']) + ' shards'})"
+            )
+            shard_count = st.number_input("Shards per show (1 = single row):", min_value=1, max_value=64,
+                                          value=shard_venue['capacity_shards'] if shard_venue['capacity_shards'] > 1
+                                          else CONFIG['CAPACITY_SHARDS_DEFAULT'])
+            if st.button("⚡ Apply Capacity Mode"):
+                try:
+                    converted = set_venue_capacity_shards(cursor, shard_venue['venue_id'], shard_count)
+                    st.session_state.conn.commit()
+                    st.success(f"✅ {shard_venue['name']} now uses {shard_count} shard(s); {converted} shows converted")
+                except Exception as e:
+                    st.session_state.conn.rollback()
+                    st.error(f"❌ Error changing capacity mode: {e}")
+        
         # Show current venue status
         if st.button("📊 Show Venue Status"):
             st.write("##### 🎭 Comedy Venues Status")
             cursor.execute("""
-                SELECT name, area, capacity, available_capacity,
-                       (capacity - available_capacity) as booked_seats
-                FROM venues 
-                WHERE venue_type LIKE '%Comedy%'
-                ORDER BY area, name
+                SELECT v.name, v.area, v.capacity,
+                       COUNT(sc.show_id) as shows_booked,
+                       COUNT(sc.show_id) FILTER (WHERE sc.available_capacity = 0) as shows_sold_out,
+                       COALESCE(SUM(sc.capacity - sc.available_capacity), 0) as booked_seats
+                FROM venues v
+                LEFT JOIN show_availability sc ON sc.venue_id = v.venue_id
+                WHERE v.venue_type LIKE '%Comedy%'
+                GROUP BY v.venue_id, v.name, v.area, v.capacity
+                ORDER BY v.area, v.name
             """)
             comedy_venues = cursor.fetchall()
             
             for venue in comedy_venues:
-                booked_pct = (venue['booked_seats'] / venue['capacity']) * 100 if venue['capacity'] > 0 else 0
-                status = "🟢 Available" if venue['available_capacity'] > 0 else "🔴 Sold Out"
+                status = f"🔴 {venue['shows_sold_out']} shows sold out" if venue['shows_sold_out'] else "🟢 Available"
                 st.write(f"**{venue['name']}** ({venue['area']}) - {status}")
-                st.write(f"   📊 {venue['booked_seats']}/{venue['capacity']} booked ({booked_pct:.1f}%)")
+                st.write(f"   📊 {venue['booked_seats']} seats booked across {venue['shows_booked']} shows "
+                         f"({venue['capacity']} seats per show)")
             
             st.write("##### 🎵 Concert Venues Status")
             cursor.execute("""
-                SELECT name, area, capacity, available_capacity,
-                       (capacity - available_capacity) as booked_seats
-                FROM venues 
-                WHERE venue_type LIKE '%Concert%' OR venue_type LIKE '%Music%'
-                ORDER BY area, name
+                SELECT v.name, v.area, v.capacity,
+                       COUNT(sc.show_id) as shows_booked,
+                       COUNT(sc.show_id) FILTER (WHERE sc.available_capacity = 0) as shows_sold_out,
+                       COALESCE(SUM(sc.capacity - sc.available_capacity), 0) as booked_seats
+                FROM venues v
+                LEFT JOIN show_availability sc ON sc.venue_id = v.venue_id
+                WHERE v.venue_type LIKE '%Concert%' OR v.venue_type LIKE '%Music%'
+                GROUP BY v.venue_id, v.name, v.area, v.capacity
+                ORDER BY v.area, v.name
             """)
             concert_venues = cursor.fetchall()
             
             for venue in concert_venues:
-                booked_pct = (venue['booked_seats'] / venue['capacity']) * 100 if venue['capacity'] > 0 else 0
-                status = "🟢 Available" if venue['available_capacity'] > 0 else "🔴 Sold Out"
+                status = f"🔴 {venue['shows_sold_out']} shows sold out" if venue['shows_sold_out'] else "🟢 Available"
                 st.write(f"**{venue['name']}** ({venue['area']}) - {status}")
-                st.write(f"   📊 {venue['booked_seats']}/{venue['capacity']} booked ({booked_pct:.1f}%)")
+                st.write(f"   📊 {venue['booked_seats']} seats booked across {venue['shows_booked']} shows "
+                         f"({venue['capacity']} seats per show)")
     
     st.write("---")
     st.write("#### 🗄️ Database Management")
@@ -3835,7 +6108,18 @@ def show_admin_settings(cursor):
             if reset_and_create_database():
                 st.success("✅ Database reset successfully!")
                 st.rerun()
-    
+
+        if st.button("📊 Rebuild Analytics Rollup"):
+            try:
+                rollup_rows = rebuild_booking_rollup(cursor)
+                st.session_state.conn.commit()
+                load_booking_analytics.cache_clear()
+                load_profit_analytics.cache_clear()
+                st.success(f"✅ Analytics rollup rebuilt: {rollup_rows:,} day/venue rows")
+            except Exception as e:
+                st.session_state.conn.rollback()
+                st.error(f"❌ Error rebuilding analytics rollup: {e}")
+
     with col2:
         # Database statistics
         cursor.execute("SELECT COUNT(*) as count FROM users WHERE otp IS NULL")
@@ -3848,6 +6132,58 @@ def show_admin_settings(cursor):
         st.write(f"**Users:** {user_count}")
         st.write(f"**Bookings:** {booking_count}")
         st.write(f"**Transactions:** {transaction_count}")
+        
+        queue_stats = get_waiting_room().stats()
+        st.write(f"**Waiting Room:** {queue_stats['waiting']} waiting, {queue_stats['checking_out']} checking out")
+        st.write(f"**Admission Rate:** {queue_stats['admission_rate']}/s per show "
+                 f"(DB latency {queue_stats['db_latency_ms']} ms)")
+    
+    st.write("#### ⚡ Cache Statistics")
+    cache_stats = get_memo_cache_stats()
+    if cache_stats:
+        st.dataframe(pd.DataFrame(cache_stats), use_container_width=True)
+    else:
+        st.info("📝 No cached lookups yet.")
+    listener = get_availability_listener()
+    st.caption(f"📡 Availability listener: {'connected' if listener.connected else 'reconnecting'} | "
+               f"{listener.notifications:,} changes applied"
+               + (f" | last at {listener.last_notification:%H:%M:%S}" if listener.last_notification else ""))
+    outbox_stats = get_outbox_dispatcher().stats(cursor)
+    st.caption(f"📤 Outbox: {outbox_stats['pending']:,} pending (oldest {outbox_stats['oldest_pending_seconds']}s) | "
+               f"{outbox_stats['events_per_second']}/s | lag {outbox_stats['last_lag_seconds']}s | "
+               f"{outbox_stats['retries']:,} retries | {outbox_stats['dead']:,} dead")
+    if st.button("🧹 Clear Caches"):
+        for cache in get_memo_caches().values():
+            cache.clear()
+        st.success("✅ All cached lookups cleared!")
+    
+    # Support desk: reprint any archived ticket straight from the ticket log
+    st.write("#### 🔎 Ticket Lookup")
+    archive_stats = get_ticket_log().stats()
+    st.caption(f"🗄️ Ticket archive: {archive_stats['tickets_indexed']:,} tickets in {archive_stats['segments']} segments")
+    lookup = st.text_input("Booking ID or Transaction ID:", placeholder="1042 or TXN0237688595308089344").strip()
+    if lookup:
+        ticket = (get_ticket_log().reprint(booking_id=int(lookup)) if lookup.isdigit()
+                  else get_ticket_log().reprint(transaction_id=lookup.upper()))
+        if ticket:
+            st.code(ticket.strip(), language=None)
+        else:
+            st.warning(f"⚠️ No archived ticket for {lookup}")
+
+# 🔥 CONTEXT MANAGER - One pooled connection per script run
+@contextmanager
+def request_connection():
+    """Borrow a pooled connection for this rerun and expose it to the page functions"""
+    with db_pool.connection() as conn:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        st.session_state.conn = conn
+        st.session_state.cursor = cursor
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+            st.session_state.conn = None
+            st.session_state.cursor = None
 
 # 🎯 MAIN APPLICATION - CLEAN PROFESSIONAL UI
 def main():
@@ -3857,11 +6193,21 @@ def main():
     if 'current_step' not in st.session_state:
         st.session_state.current_step = "database_setup"
     
-    # Database setup first
+    # Database setup first - every session passes the password gate, then shares the process-wide pool
     if not st.session_state.db_ready:
         database_setup()
         return
     
+    get_seat_hold_sweeper()
+    get_availability_listener()
+    get_outbox_dispatcher()
+    ensure_schedule_horizon(get_next_few_days(3)[-1]['date'])
+    
+    with request_connection():
+        route_current_step()
+
+def route_current_step():
+    """Dispatch to the page function for the current step"""
     # Route to appropriate function based on current step
     if st.session_state.current_step == "login":
         login_user()
@@ -3937,7 +6283,7 @@ if __name__ == "__main__":
    - FileManager class with pathlib
 
 ✅ CONCEPT 4: MODULES AND DIRECTORIES
-   - DatabaseModule: Database operations
+   - DatabaseModule: Shared, thread-safe connection pool
    - UtilityModule: Static utility functions  
    - FileManager: File operation management
 
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Stress test for the SmartShow Ultimate transaction ID generator
+Generates millions of IDs from many threads in many processes, each leasing its worker id
+from the database, and checks that none repeat and that every thread saw its IDs strictly increase
+"""
+
+import multiprocessing
+import sys
+import threading
+import time
+
+import numpy as np
+
+import smartshow_ultimate_complete as app
+
+PROCESSES = 8            # server processes, each leasing its own worker id
+THREADS_PER_PROCESS = 4  # Streamlit sessions booking at once inside one process
+IDS_PER_THREAD = 125_000
+
+def generate(password):
+    """Run one process: lease a worker id, then every thread draws IDs from the shared per-process generator"""
+    if not app.db_pool.connect(password):
+        raise RuntimeError("Could not connect to the 'cinebook' database")
+    lease = app.claim_worker_id()
+    generator = app.SnowflakeIdGenerator(lease.worker_id)
+    results = [None] * THREADS_PER_PROCESS
+
+    def draw(slot):
+        ids = np.empty(IDS_PER_THREAD, dtype=np.int64)
+        for i in range(IDS_PER_THREAD):
+            ids[i] = generator.next_id()
+        results[slot] = ids
+
+    threads = [threading.Thread(target=draw, args=(slot,)) for slot in range(THREADS_PER_PROCESS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Hold the lease until every process has finished drawing, as live server processes would
+    barrier.wait()
+    lease.release()
+    return results
+
+def start_process(shared_barrier):
+    """Pool initializer: hand each process the barrier they all meet at before releasing leases"""
+    global barrier
+    barrier = shared_barrier
+
+def main():
+    """Generate, then verify uniqueness, per-thread ordering and how far IDs ran ahead of the clock"""
+    print("🆔 SmartShow Ultimate - Snowflake ID Stress Test")
+    print("=" * 50)
+    password = sys.argv[1] if len(sys.argv) > 1 else input("Enter PostgreSQL password for 'postgres' user: ")
+    total = PROCESSES * THREADS_PER_PROCESS * IDS_PER_THREAD
+    print(f"{PROCESSES} processes x {THREADS_PER_PROCESS} threads x {IDS_PER_THREAD:,} IDs = {total:,} IDs")
+
+    start = time.perf_counter()
+    with multiprocessing.Pool(PROCESSES, initializer=start_process,
+                              initargs=(multiprocessing.Barrier(PROCESSES),)) as pool:
+        per_process = pool.map(generate, [password] * PROCESSES, chunksize=1)
+    seconds = time.perf_counter() - start
+    finished_ms = time.time_ns() // 1_000_000 - app.CONFIG['ID_EPOCH_MS']
+
+    thread_ids = [ids for threads in per_process for ids in threads]
+    all_ids = np.concatenate(thread_ids)
+    duplicates = len(all_ids) - len(np.unique(all_ids))
+    unordered = sum(int(np.count_nonzero(np.diff(ids) <= 0)) for ids in thread_ids)
+    workers = {int(worker) for worker in np.unique((all_ids >> app.SnowflakeIdGenerator.SEQUENCE_BITS)
+                                                    & app.SnowflakeIdGenerator.MAX_WORKER_ID)}
+    lead_ms = int((all_ids.max() >> (app.SnowflakeIdGenerator.WORKER_BITS
+                                     + app.SnowflakeIdGenerator.SEQUENCE_BITS)) - finished_ms)
+
+    print(f"⏱️  {seconds:.2f}s ({total / seconds:,.0f} IDs/s)")
+    print(f"🔁 Duplicates: {duplicates:,}")
+    print(f"📉 Out-of-order IDs within a thread: {unordered:,}")
+    print(f"👷 Worker ids seen: {len(workers)} of {PROCESSES}")
+    print(f"🕒 Newest ID ahead of the wall clock by: {max(lead_ms, 0)} ms")
+    print(f"🔎 Sample: TXN{int(all_ids[-1]):019d} -> {app.SnowflakeIdGenerator.parse(int(all_ids[-1]))}")
+
+    print("\n" + "=" * 50)
+    if duplicates == 0 and unordered == 0 and len(workers) == PROCESSES:
+        print("✅ ALL IDS UNIQUE AND ORDERED!")
+    else:
+        print("❌ ID GENERATOR CHECK FAILED!")
+
+if __name__ == "__main__":
+    main()